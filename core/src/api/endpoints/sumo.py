@@ -1,4 +1,5 @@
 from fastapi import APIRouter
+from src.core.sumo_manager import sumo_manager
 from src.controllers.traffic_controller import (
     set_traffic_light_phase,
     get_traffic_light_phase
@@ -22,3 +23,15 @@ async def get_traffic_light_phase_api(light_id: str):
         return {"status": "error", "message": "Could not fetch current phase"}
     return {"status": "ok", "light_id": light_id, "current_phase": current_phase}
 
+@router.post("/simulation/run-mode/{run_mode}", tags=["sumo"])
+async def change_run_mode(run_mode: str, speed_factor: float = None):
+    print(f"Changing run mode to {run_mode} (speed factor {speed_factor})")
+    try:
+        sumo_manager.set_run_mode(run_mode, speed_factor)
+    except ValueError as e:
+        return {"status": "error", "message": str(e)}
+    return {"status": "ok", **sumo_manager.get_stats()}
+
+@router.get("/simulation/stats", tags=["sumo"])
+async def get_simulation_stats():
+    return {"status": "ok", **sumo_manager.get_stats()}
@@ -1,6 +1,12 @@
 from fastapi import APIRouter, HTTPException, Depends
+from fastapi.responses import StreamingResponse
 from ...controllers.traffic_controller import TrafficController
-from ...models.traffic_models import TrafficSimulationRequest, TrafficSimulationResponse
+from ...models.traffic_model import (
+    BatchStepMetrics,
+    BatchStepRequest,
+    TrafficSimulationRequest,
+    TrafficSimulationResponse
+)
 
 router = APIRouter()
 traffic_controller = TrafficController()
@@ -35,4 +41,39 @@ async def step_simulation(simulation_id: str, action: int = None):
     try:
         return await traffic_controller.sumo_service.step_simulation(simulation_id, action)
     except Exception as e:
-        raise HTTPException(status_code=400, detail=str(e))
\ No newline at end of file
+        raise HTTPException(status_code=400, detail=str(e))
+
+@router.post("/simulations/{simulation_id}/steps", response_model=BatchStepMetrics)
+async def step_simulation_batch(simulation_id: str, request: BatchStepRequest):
+    """Execute many simulation steps in one request.
+
+    per_step="columnar" adds per-step metric arrays to the response,
+    per_step="ndjson" streams one JSON line per step instead.
+    """
+    sumo_service = traffic_controller.sumo_service
+
+    if request.per_step == "ndjson":
+        if not await sumo_service.get_simulation_status(simulation_id):
+            raise HTTPException(status_code=404, detail="Simulation not found")
+        return StreamingResponse(
+            sumo_service.stream_simulation_steps(simulation_id, request.steps, request.actions),
+            media_type="application/x-ndjson"
+        )
+
+    try:
+        return await sumo_service.step_simulation_batch(
+            simulation_id,
+            request.steps,
+            request.actions,
+            include_per_step=request.per_step == "columnar"
+        )
+    except Exception as e:
+        raise HTTPException(status_code=400, detail=str(e))
+
+@router.delete("/simulations/{simulation_id}")
+async def close_simulation(simulation_id: str):
+    """Close simulation and free its worker slot"""
+    closed = await traffic_controller.sumo_service.close_simulation(simulation_id)
+    if not closed:
+        raise HTTPException(status_code=404, detail="Simulation not found")
+    return {"status": "ok", "simulation_id": simulation_id}
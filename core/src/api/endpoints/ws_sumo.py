@@ -292,12 +292,13 @@
 
 from fastapi import APIRouter, WebSocket, WebSocketDisconnect
 from concurrent.futures import ThreadPoolExecutor
-from io import BytesIO
-import pyautogui
-import traci
-import asyncio, json, base64, uuid, time
-from io import BytesIO
-import os
+import asyncio, json
+
+from src.core.sumo_manager import sumo_manager
+from src.core.sumo_broadcaster import broadcaster
+from src.core.frame_codec import VehicleFrameEncoder
+from src.core.screenshot_service import ScreenshotService
+from src.core.config import settings
 
 router = APIRouter()
 
@@ -306,129 +307,113 @@ VIEW_ID = "View #0"
 # Thêm thread pool cho blocking operations
 executor = ThreadPoolExecutor(max_workers=2)
 
+# Một lần chụp mỗi interval cho tất cả viewers
+screenshot_service = ScreenshotService(
+    sumo_manager,
+    broadcaster,
+    executor,
+    VIEW_ID,
+    interval=settings.SCREENSHOT_INTERVAL,
+    image_format=settings.SCREENSHOT_FORMAT,
+    quality=settings.SCREENSHOT_QUALITY,
+    directory=settings.SCREENSHOT_DIR
+)
+
+
+def move_camera(junction_id: str):
+    """Center the GUI view on a junction (SUMO worker thread)"""
+    sim = sumo_manager.sim
+    pos = sim.junction.getPosition(junction_id)
+    sim.gui.setOffset(VIEW_ID, pos[0], pos[1])
+    sim.gui.setZoom(VIEW_ID, 550)  # Zoom bạn đã chỉnh
+
+
+async def receive_selection(websocket: WebSocket, subscription, options: dict):
+    """Đọc message từ FE (chọn junction, định dạng stream) cho tới khi client ngắt kết nối"""
+    try:
+        while True:
+            message = await websocket.receive_text()
+            try:
+                data = json.loads(message)
+            except json.JSONDecodeError:
+                print("Invalid JSON received")
+                continue
+
+            # {"format": "binary"} bật frame nhị phân (xem src/core/frame_codec.py)
+            if data.get("format") in ("json", "binary"):
+                options["format"] = data["format"]
+
+            if "junction_id" in data:
+                junction_id = str(data["junction_id"]).strip()
+                if junction_id and len(junction_id) < 50 and junction_id != subscription.junction_id:
+                    await broadcaster.select(subscription, junction_id)
+                    print(f"🔄 Selected junction: {junction_id}")
+
+                    # Di chuyển camera
+                    if not sumo_manager.use_gui:
+                        continue
+                    try:
+                        await sumo_manager.call(move_camera, junction_id)
+                    except Exception as e:
+                        print(f"Error moving camera: {e}")
+
+    except WebSocketDisconnect:
+        print("🔌 WebSocket client disconnected")
+    finally:
+        subscription.close()
+
+
 @router.websocket("/ws/sumo-stream")
 async def websocket_sumo_stream(websocket: WebSocket):
     await websocket.accept()
     print("📡 WebSocket client connected")
 
-    selected_junction = None
-    last_screenshot_time = 0
+    # Frames đến từ broadcaster chung, không query TraCI theo từng socket
+    subscription = broadcaster.subscribe()
+    options = {"format": "json"}
+    receiver = asyncio.create_task(receive_selection(websocket, subscription, options))
+    encoder = VehicleFrameEncoder()
+    encoded_junction = None
+    screenshot_service.ensure_started()
+    if screenshot_service.latest is not None:
+        subscription.put({"image": screenshot_service.latest})
 
     try:
         while True:
-            # 1. Nhận message từ FE (chọn junction)
-            try:
-                message = await asyncio.wait_for(websocket.receive_text(), timeout=0.1)
-                data = json.loads(message)
-
-                if "junction_id" in data:
-                    junction_id = str(data["junction_id"]).strip()
-                    if junction_id and len(junction_id) < 50:
-                        selected_junction = junction_id
-                        print(f"🔄 Selected junction: {selected_junction}")
-
-                        # Di chuyển camera
-                        try:
-                            pos = traci.junction.getPosition(selected_junction)
-                            traci.gui.setOffset(VIEW_ID, pos[0], pos[1])
-                            traci.gui.setZoom(VIEW_ID, 550)  # Zoom bạn đã chỉnh
-                        except Exception as e:
-                            print(f"Error moving camera: {e}")
-
-            except asyncio.TimeoutError:
-                pass
-            except json.JSONDecodeError:
-                print("Invalid JSON received")
+            frame = await subscription.get()
+            if frame is None:
+                break
+
+            # Ảnh screenshot dùng chung cho mọi viewer
+            if "image" in frame:
+                if options["format"] == "binary":
+                    await websocket.send_bytes(frame["image"].binary())
+                else:
+                    await websocket.send_text(frame["image"].text())
                 continue
 
-            # 2. Thu thập dữ liệu traffic
-            vehicle_data = []
-            avg_speed = 0.0
-            traffic_status = "N/A"
-
-            if selected_junction:
-                try:
-                    phase = traci.trafficlight.getPhase(selected_junction)
-                    traffic_light_info = {
-                        "id": selected_junction,
-                        "phase": phase
-                    }
-
-                    controlled_lanes = traci.trafficlight.getControlledLanes(selected_junction)
-                    total_speed = 0.0
-                    vehicle_count = 0
-
-                    for lane_id in controlled_lanes:
-                        veh_ids = traci.lane.getLastStepVehicleIDs(lane_id)
-                        for veh_id in veh_ids:
-                            speed = traci.vehicle.getSpeed(veh_id)
-                            pos = traci.vehicle.getPosition(veh_id)
-
-                            total_speed += speed
-                            vehicle_count += 1
-
-                            vehicle_data.append({
-                                "id": veh_id,
-                                "position": pos,
-                                "speed": speed
-                            })
-
-                    avg_speed = total_speed / vehicle_count if vehicle_count > 0 else 0.0
-
-                    if avg_speed < 5:
-                        traffic_status = "heavy traffic"
-                    elif avg_speed < 15:
-                        traffic_status = "moderate traffic"
-                    else:
-                        traffic_status = "light traffic"
-
-                except Exception as e:
-                    traffic_light_info = {
-                        "id": selected_junction,
-                        "error": f"Junction not found: {e}"
-                    }
+            payload = subscription.payload(frame)
+            binary = (
+                options["format"] == "binary"
+                and subscription.watching
+                and "error" not in payload["traffic_light"]
+            )
+
+            if binary:
+                # Gửi frame nhị phân (keyframe khi đổi junction, sau đó chỉ gửi delta)
+                if subscription.junction_id != encoded_junction:
+                    encoder.reset()
+                    encoded_junction = subscription.junction_id
+                await websocket.send_bytes(encoder.encode(payload, frame["step"]))
             else:
-                traffic_light_info = {}
-
-            # 3. Gửi data JSON
-            await websocket.send_text(json.dumps({
-                "type": "data",
-                "vehicles": vehicle_data,
-                "average_speed": avg_speed,
-                "traffic_status": traffic_status,
-                "traffic_light": traffic_light_info
-            }))
-
-            # 4. Gửi ảnh screenshot (1 FPS)
-            current_time = asyncio.get_event_loop().time()
-            if current_time - last_screenshot_time >= 1.0:
-                try:
-                    # Chụp ảnh bằng traci.gui.screenshot
-                    temp_file = "temp_sumo_screenshot.png"
-                    traci.gui.screenshot(VIEW_ID, temp_file)
-
-                    # Chuyển file ảnh thành base64
-                    with open(temp_file, "rb") as f:
-                        img_str = base64.b64encode(f.read()).decode("utf-8")
-
-                    # Gửi ảnh lên FE
-                    await websocket.send_text(json.dumps({
-                        "type": "image",
-                        "image": img_str
-                    }))
-
-                    # Xóa file tạm để tránh rác
-                    os.remove(temp_file)
-
-                    last_screenshot_time = current_time
-
-                except Exception as e:
-                    print(f"Screenshot error: {e}")
-
-            # Sleep ngắn để responsive
-            await asyncio.sleep(0.1)
+                # Gửi data JSON
+                encoded_junction = None
+                await websocket.send_text(json.dumps({"type": "data", **payload}))
 
     except WebSocketDisconnect:
         print("🔌 WebSocket client disconnected")
     except Exception as e:
         print(f"WebSocket error: {e}")
+    finally:
+        receiver.cancel()
+        await broadcaster.unsubscribe(subscription)
@@ -12,4 +12,4 @@ routers.include_router(Authentication_route)
 routers.include_router(User_route)
 routers.include_router(Sumo_route)
 routers.include_router(SumoWebSocket_route)
-routers.include_router(traffic_simulation.router, prefix="/traffic", tags=["traffic"])
\ No newline at end of file
+routers.include_router(traffic_simulation, prefix="/traffic", tags=["traffic"])
\ No newline at end of file
@@ -0,0 +1,99 @@
+"""
+Compare the traci and libsumo backends on the bundled region_1 network.
+
+Each backend runs in its own subprocess with the headless sumo binary:
+
+    python -m src.benchmarks.backend_benchmark --steps 600
+"""
+import os
+import sys
+import json
+import time
+import argparse
+import subprocess
+
+from src.core.sumo_backend import BACKENDS, is_libsumo, load_backend
+
+DEFAULT_CFG = os.path.join(os.path.dirname(os.path.dirname(__file__)), "data", "traffic_simulation.sumocfg")
+
+
+def run_backend(backend: str, sumo_cfg: str, steps: int, sumo_binary: str = "sumo") -> dict:
+    """Step the simulation and read every vehicle's position and speed each step"""
+    sim = load_backend(backend)
+    if backend == "libsumo" and not is_libsumo(sim):
+        return {"backend": backend, "error": "libsumo is not installed"}
+
+    sim.start([sumo_binary, "-c", os.path.abspath(sumo_cfg), "--no-step-log", "true", "--no-warnings", "true"])
+
+    step_time = 0.0
+    query_time = 0.0
+    queries = 0
+    steps_run = 0
+    try:
+        for _ in range(steps):
+            if sim.simulation.getMinExpectedNumber() <= 0:
+                break
+
+            start = time.perf_counter()
+            sim.simulationStep()
+            step_time += time.perf_counter() - start
+            steps_run += 1
+
+            start = time.perf_counter()
+            vehicle_ids = sim.vehicle.getIDList()
+            for veh_id in vehicle_ids:
+                sim.vehicle.getPosition(veh_id)
+                sim.vehicle.getSpeed(veh_id)
+            query_time += time.perf_counter() - start
+            queries += 1 + 2 * len(vehicle_ids)
+    finally:
+        sim.close()
+
+    return {
+        "backend": backend,
+        "steps": steps_run,
+        "steps_per_sec": steps_run / step_time if step_time else 0.0,
+        "queries": queries,
+        "queries_per_sec": queries / query_time if query_time else 0.0
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark SUMO backends (steps/sec and queries/sec).")
+    parser.add_argument("--sumo-cfg", default=DEFAULT_CFG, help="SUMO config to run (default: bundled region_1)")
+    parser.add_argument("--steps", type=int, default=600, help="Simulation steps per backend")
+    parser.add_argument("--sumo-binary", default="sumo", help="Headless SUMO binary")
+    parser.add_argument("--backend", choices=BACKENDS, help="Run a single backend in this process and print JSON")
+    args = parser.parse_args()
+
+    if args.backend:
+        print(json.dumps(run_backend(args.backend, args.sumo_cfg, args.steps, args.sumo_binary)))
+        return
+
+    results = []
+    for backend in BACKENDS:
+        completed = subprocess.run(
+            [sys.executable, "-m", "src.benchmarks.backend_benchmark",
+             "--backend", backend,
+             "--sumo-cfg", args.sumo_cfg,
+             "--steps", str(args.steps),
+             "--sumo-binary", args.sumo_binary],
+            capture_output=True, text=True
+        )
+        lines = completed.stdout.strip().splitlines()
+        if completed.returncode != 0 or not lines:
+            results.append({"backend": backend, "error": completed.stderr.strip().splitlines()[-1:]})
+            continue
+        results.append(json.loads(lines[-1]))
+
+    print(f"{'backend':<10}{'steps':>8}{'steps/s':>12}{'queries':>12}{'queries/s':>14}")
+    for result in results:
+        if "error" in result:
+            print(f"{result['backend']:<10}  error: {result['error']}")
+            continue
+        print(f"{result['backend']:<10}{result['steps']:>8}{result['steps_per_sec']:>12.1f}"
+              f"{result['queries']:>12}{result['queries_per_sec']:>14.0f}")
+
+
+if __name__ == "__main__":
+    main()
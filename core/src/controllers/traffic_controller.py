@@ -1,10 +1,11 @@
-import traci
-from ..services.sumo_service import SUMOService
-from ..models.traffic_models import TrafficSimulationRequest, TrafficSimulationResponse
+from ..core.sumo_manager import sumo_manager
+from ..core.sumo_telemetry import telemetry
+from ..services.sumo_services import SUMOService
+from ..models.traffic_model import TrafficSimulationRequest, TrafficSimulationResponse
 
 async def set_traffic_light_phase(light_id: str, phase_index: int) -> bool:
     try:
-        traci.trafficlight.setPhase(light_id, phase_index)
+        await sumo_manager.call(sumo_manager.sim.trafficlight.setPhase, light_id, phase_index)
         return True
     except Exception as e:
         print(f"[ERROR] set_traffic_light_phase: {e}")
@@ -12,7 +13,7 @@ async def set_traffic_light_phase(light_id: str, phase_index: int) -> bool:
 
 async def get_traffic_light_phase(light_id: str) -> int:
     try:
-        return traci.trafficlight.getPhase(light_id)
+        return await sumo_manager.call(telemetry.phase, light_id)
     except Exception as e:
         print(f"[ERROR] get_traffic_light_phase: {e}")
         return -1
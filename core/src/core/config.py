@@ -16,6 +16,18 @@ class Settings(BaseSettings):
     REFRESH_TOKEN_EXPIRED_TIME: int = 60 * 24 * 7 # token last one week
     ACCESSS_TOKEN_EXPIRED_TIME: int = 30 # token last 30 minutes
     JWT_TOKEN_PREFIX: str = "Token"
+    SUMO_GUI: bool = True # False runs the headless sumo binary
+    SUMO_BACKEND: str = "traci" # traci or libsumo (libsumo is headless only)
+    SUMO_STEP_LENGTH: float = 1.0 # simulated seconds per step
+    SUMO_RUN_MODE: str = "realtime" # realtime, speedup or fast
+    SUMO_SPEED_FACTOR: float = 1.0 # used by the speedup mode, e.g. 60 = one hour per minute
+    SCREENSHOT_INTERVAL: float = 1.0 # seconds between SUMO GUI captures
+    SCREENSHOT_FORMAT: str = "JPEG" # JPEG or WEBP
+    SCREENSHOT_QUALITY: int = 70
+    SCREENSHOT_DIR: str = "/dev/shm" if os.path.isdir("/dev/shm") else "" # empty = system temp dir
+    SIMULATION_WORKERS: int = 0 # worker processes for what-if simulations, 0 = one per CPU
+    MAX_SIMULATIONS: int = 32
+    SIMULATION_IDLE_TIMEOUT: float = 600.0 # seconds before an idle simulation is closed
     
     class Config:
         env_file = ".env"
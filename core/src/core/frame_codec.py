@@ -0,0 +1,179 @@
+"""
+Compact binary frames for /ws/sumo-stream.
+
+Clients opt in by sending {"format": "binary"}. Every frame is a binary
+WebSocket message, little-endian:
+
+    header   B  frame type (FRAME_KEYFRAME | FRAME_DELTA)
+             I  simulation step
+             f  average speed (m/s)
+             h  traffic light phase (-1 if unknown)
+             B  traffic status code (see TRAFFIC_STATUS_CODES)
+             f  origin x, f origin y (junction center, metres)
+             H  number of new ids, H number of removed ids, H number of vehicle records
+    new ids  per id: H index, B length, utf-8 bytes
+    removed  H index per removed vehicle
+    records  per vehicle: H index, h dx, h dy (POSITION_SCALE metres from origin),
+             H speed (SPEED_SCALE m/s)
+
+A keyframe clears the client's id dictionary and carries every vehicle.
+A delta frame only carries new ids, removed vehicles and vehicles whose
+quantized position or speed changed since the previous frame.
+
+Binary clients receive SUMO GUI screenshots as binary messages too
+(JSON clients keep getting {"type": "image", "image": <base64>}):
+
+    header   B  frame type (FRAME_IMAGE)
+             I  simulation step
+             B  image format code (see IMAGE_FORMAT_CODES)
+    payload  encoded image bytes
+"""
+import struct
+import numpy as np
+
+FRAME_KEYFRAME = 1
+FRAME_DELTA = 2
+FRAME_IMAGE = 3
+
+POSITION_SCALE = 0.1  # 1 unit = 10 cm
+SPEED_SCALE = 0.01  # 1 unit = 1 cm/s
+
+TRAFFIC_STATUS_CODES = {
+    "N/A": 0,
+    "heavy traffic": 1,
+    "moderate traffic": 2,
+    "light traffic": 3
+}
+
+IMAGE_FORMAT_CODES = {
+    "JPEG": 1,
+    "WEBP": 2,
+    "PNG": 3
+}
+
+HEADER = struct.Struct("<BIfhBffHHH")
+IMAGE_HEADER = struct.Struct("<BIB")
+ID_ENTRY = struct.Struct("<HB")
+RECORD_DTYPE = np.dtype([("index", "<u2"), ("x", "<i2"), ("y", "<i2"), ("speed", "<u2")])
+
+MAX_VEHICLE_IDS = 0xFFFF
+
+
+def encode_image_frame(step: int, image_format: str, data: bytes) -> bytes:
+    """Prefix an encoded screenshot with the image frame header"""
+    return IMAGE_HEADER.pack(FRAME_IMAGE, step, IMAGE_FORMAT_CODES.get(image_format, 0)) + data
+
+
+class VehicleFrameEncoder:
+    """Per-connection encoder keeping the vehicle id dictionary and last sent state"""
+
+    def __init__(self, keyframe_interval: int = 50):
+        self.keyframe_interval = keyframe_interval
+        self.reset()
+
+    def reset(self):
+        """Forget client state; the next frame is a keyframe"""
+        self.ids = {}
+        self.free_indices = []
+        self.next_index = 0
+        self.origin = (0.0, 0.0)
+        # index -> quantized (x, y, speed) last sent to the client
+        self.sent = np.zeros((0, 3), dtype=np.int32)
+        self.frames_since_keyframe = None
+
+    def encode(self, snapshot: dict, step: int) -> bytes:
+        keyframe = (
+            self.frames_since_keyframe is None
+            or self.frames_since_keyframe >= self.keyframe_interval
+            or len(self.ids) + len(snapshot["vehicles"]) > MAX_VEHICLE_IDS
+        )
+        if keyframe:
+            self.reset()
+            self.origin = tuple(snapshot["traffic_light"].get("position", (0.0, 0.0)))
+            self.frames_since_keyframe = 0
+        else:
+            self.frames_since_keyframe += 1
+
+        vehicles = snapshot["vehicles"]
+        new_ids = []
+        indices = np.empty(len(vehicles), dtype=np.int64)
+        current = set()
+        for i, vehicle in enumerate(vehicles):
+            veh_id = vehicle["id"]
+            index = self.ids.get(veh_id)
+            if index is None:
+                index = self._assign(veh_id)
+                new_ids.append((index, veh_id))
+            indices[i] = index
+            current.add(veh_id)
+
+        removed = [veh_id for veh_id in self.ids if veh_id not in current]
+        removed_indices = [self._release(veh_id) for veh_id in removed]
+
+        quantized = self._quantize(vehicles)
+        if len(self.sent) < self.next_index:
+            grown = np.full((self.next_index, 3), np.iinfo(np.int32).min, dtype=np.int32)
+            grown[:len(self.sent)] = self.sent
+            self.sent = grown
+
+        if keyframe:
+            changed = np.ones(len(vehicles), dtype=bool)
+        else:
+            changed = np.any(self.sent[indices] != quantized, axis=1)
+        self.sent[indices] = quantized
+
+        records = np.empty(int(changed.sum()), dtype=RECORD_DTYPE)
+        records["index"] = indices[changed]
+        records["x"] = quantized[changed, 0]
+        records["y"] = quantized[changed, 1]
+        records["speed"] = quantized[changed, 2]
+
+        traffic_light = snapshot["traffic_light"]
+        parts = [HEADER.pack(
+            FRAME_KEYFRAME if keyframe else FRAME_DELTA,
+            step,
+            snapshot["average_speed"],
+            traffic_light.get("phase", -1),
+            TRAFFIC_STATUS_CODES.get(snapshot["traffic_status"], 0),
+            self.origin[0],
+            self.origin[1],
+            len(new_ids),
+            len(removed_indices),
+            len(records)
+        )]
+        for index, veh_id in new_ids:
+            encoded = veh_id.encode("utf-8")[:255]
+            parts.append(ID_ENTRY.pack(index, len(encoded)))
+            parts.append(encoded)
+        parts.append(np.asarray(removed_indices, dtype="<u2").tobytes())
+        parts.append(records.tobytes())
+        return b"".join(parts)
+
+    def _quantize(self, vehicles) -> np.ndarray:
+        if not vehicles:
+            return np.zeros((0, 3), dtype=np.int32)
+        raw = np.array(
+            [(v["position"][0], v["position"][1], v["speed"]) for v in vehicles],
+            dtype=np.float64
+        )
+        quantized = np.empty((len(vehicles), 3), dtype=np.int32)
+        quantized[:, 0] = np.clip(np.rint((raw[:, 0] - self.origin[0]) / POSITION_SCALE), -32768, 32767)
+        quantized[:, 1] = np.clip(np.rint((raw[:, 1] - self.origin[1]) / POSITION_SCALE), -32768, 32767)
+        quantized[:, 2] = np.clip(np.rint(raw[:, 2] / SPEED_SCALE), 0, 65535)
+        return quantized
+
+    def _assign(self, veh_id: str) -> int:
+        if self.free_indices:
+            index = self.free_indices.pop()
+        else:
+            index = self.next_index
+            self.next_index += 1
+        self.ids[veh_id] = index
+        return index
+
+    def _release(self, veh_id: str) -> int:
+        index = self.ids.pop(veh_id)
+        self.free_indices.append(index)
+        if index < len(self.sent):
+            self.sent[index] = np.iinfo(np.int32).min
+        return index
@@ -0,0 +1,119 @@
+import io
+import os
+import json
+import uuid
+import base64
+import asyncio
+import hashlib
+import tempfile
+from PIL import Image
+from concurrent.futures import Executor
+
+from .frame_codec import encode_image_frame
+from .sumo_manager import SUMOManager
+from .sumo_broadcaster import SimulationBroadcaster
+
+
+class ImageFrame:
+    """One encoded capture shared by every viewer, serialized lazily per wire format"""
+
+    def __init__(self, step: int, image_format: str, data: bytes):
+        self.step = step
+        self.image_format = image_format
+        self.data = data
+        self._binary = None
+        self._text = None
+
+    def binary(self) -> bytes:
+        if self._binary is None:
+            self._binary = encode_image_frame(self.step, self.image_format, self.data)
+        return self._binary
+
+    def text(self) -> str:
+        if self._text is None:
+            self._text = json.dumps({
+                "type": "image",
+                "format": self.image_format.lower(),
+                "image": base64.b64encode(self.data).decode("utf-8")
+            })
+        return self._text
+
+
+class ScreenshotService:
+    """
+    Captures the SUMO GUI view once per interval for all stream viewers.
+
+    The capture is written under a unique name in a memory-backed directory,
+    transcoded to JPEG/WebP on the executor and pushed to every subscriber
+    of the broadcaster. Captures identical to the previous one are skipped.
+    """
+
+    def __init__(self, manager: SUMOManager, broadcaster: SimulationBroadcaster,
+                 executor: Executor, view_id: str, interval: float = 1.0,
+                 image_format: str = "JPEG", quality: int = 70, directory: str = ""):
+        self.manager = manager
+        self.broadcaster = broadcaster
+        self.executor = executor
+        self.view_id = view_id
+        self.interval = interval
+        self.image_format = image_format.upper()
+        self.quality = quality
+        self.directory = directory or tempfile.gettempdir()
+        self.last_digest = None
+        self.latest = None
+        self.skipped = 0
+        self._task = None
+
+    def ensure_started(self):
+        """Start the capture loop on the running event loop if it is not already running"""
+        if not self.manager.use_gui:
+            return
+        if self._task is None or self._task.done():
+            self._task = asyncio.create_task(self.run())
+
+    async def run(self):
+        while True:
+            await asyncio.sleep(self.interval)
+            if not self.broadcaster.subscribers or not self.manager.is_running():
+                continue
+            try:
+                frame = await self.capture()
+            except Exception as e:
+                print(f"Screenshot error: {e}")
+                continue
+            if frame is not None:
+                self.latest = frame
+                self.broadcaster.broadcast({"image": frame})
+
+    async def capture(self):
+        """Take one screenshot; returns None when the view has not changed"""
+        path = os.path.join(self.directory, f"sumo_screenshot_{uuid.uuid4().hex}.png")
+        try:
+            await self.manager.call(self.manager.sim.gui.screenshot, self.view_id, path)
+            # SUMO writes the file while rendering the next simulation step
+            step = await self.manager.next_step()
+            loop = asyncio.get_running_loop()
+            data = await loop.run_in_executor(self.executor, self._encode, path)
+        finally:
+            if os.path.exists(path):
+                os.remove(path)
+
+        if data is None:
+            self.skipped += 1
+            return None
+        return ImageFrame(step, self.image_format, data)
+
+    def _encode(self, path: str):
+        """Read and transcode a capture (executor thread)"""
+        with open(path, "rb") as f:
+            raw = f.read()
+
+        digest = hashlib.blake2b(raw, digest_size=16).digest()
+        if digest == self.last_digest:
+            return None
+        self.last_digest = digest
+
+        image = Image.open(io.BytesIO(raw)).convert("RGB")
+        buffer = io.BytesIO()
+        image.save(buffer, format=self.image_format, quality=self.quality)
+        return buffer.getvalue()
@@ -0,0 +1,35 @@
+import traci
+
+# "traci": SUMO runs as a separate process, every call is a TCP round trip.
+# "libsumo": SUMO runs inside this process, calls are plain function calls
+# (headless only, one simulation per process).
+BACKENDS = ("traci", "libsumo")
+
+
+def load_backend(name: str = "traci", use_gui: bool = False):
+    """Return the module implementing the TraCI API for the requested backend"""
+    if name not in BACKENDS:
+        raise ValueError(f"Unknown SUMO backend '{name}', expected one of {BACKENDS}")
+
+    if name == "traci":
+        return traci
+
+    if use_gui:
+        print("[WARN] libsumo cannot drive sumo-gui, using the traci backend")
+        return traci
+
+    try:
+        import libsumo
+    except ImportError:
+        print("[WARN] libsumo is not installed, using the traci backend")
+        return traci
+    return libsumo
+
+
+def is_libsumo(sim) -> bool:
+    return sim is not traci
+
+
+def fatal_error_types(sim) -> tuple:
+    """Exception types meaning the simulation is gone for this backend"""
+    return tuple({traci.FatalTraCIError, getattr(sim, "FatalTraCIError", traci.FatalTraCIError)})
@@ -0,0 +1,157 @@
+import time
+import asyncio
+from typing import Optional
+
+from .sumo_manager import SUMOManager, sumo_manager
+from .sumo_telemetry import SUMOTelemetry, telemetry
+
+
+def empty_snapshot(junction_id: Optional[str] = None, error: Optional[str] = None) -> dict:
+    """Stream payload used when no data is available for a subscriber"""
+    traffic_light = {}
+    if junction_id:
+        traffic_light = {"id": junction_id}
+        if error:
+            traffic_light["error"] = error
+    return {
+        "vehicles": [],
+        "average_speed": 0.0,
+        "traffic_status": "N/A",
+        "traffic_light": traffic_light
+    }
+
+
+class Subscription:
+    """One stream consumer: a bounded frame queue plus the junction it follows"""
+
+    def __init__(self, maxsize: int):
+        self.queue = asyncio.Queue(maxsize=maxsize)
+        self.junction_id = None
+        self.watching = False
+        self.error = None
+        self.dropped = 0
+        self.closed = False
+
+    def put(self, frame: dict):
+        """Enqueue a frame, dropping the oldest one when the consumer lags behind"""
+        if self.closed:
+            return
+        if self.queue.full():
+            self.queue.get_nowait()
+            self.dropped += 1
+        self.queue.put_nowait(frame)
+
+    async def get(self) -> Optional[dict]:
+        """Next frame, or None once the subscription is closed"""
+        return await self.queue.get()
+
+    def close(self):
+        """Wake the consumer with an end-of-stream marker that later frames cannot evict"""
+        if self.closed:
+            return
+        self.closed = True
+        while not self.queue.empty():
+            self.queue.get_nowait()
+        self.queue.put_nowait(None)
+
+    def payload(self, frame: dict) -> dict:
+        """Extract this subscriber's junction data from a broadcast frame"""
+        if not self.junction_id:
+            return empty_snapshot()
+        snapshot = frame["junctions"].get(self.junction_id)
+        if snapshot is None:
+            return empty_snapshot(self.junction_id, self.error or "Junction not found")
+        return snapshot
+
+
+class SimulationBroadcaster:
+    """
+    Single producer of simulation state for every stream subscriber.
+
+    Registered as a step listener on the SUMO worker thread: after each
+    simulation step it snapshots all watched junctions once and hands the
+    frame to the event loop, which fans it out to the subscriber queues.
+    TraCI load does not grow with the number of connected viewers.
+    Frames are capped at max_fps, so fast-forward runs do not snapshot
+    every step.
+    """
+
+    def __init__(self, manager: SUMOManager, telemetry: SUMOTelemetry, queue_size: int = 4,
+                 max_fps: float = 20.0):
+        self.manager = manager
+        self.telemetry = telemetry
+        self.queue_size = queue_size
+        self.min_frame_interval = 1.0 / max_fps
+        self._last_frame_time = 0.0
+        self.subscribers = set()
+        self.latest_frame = None
+        self._loop = None
+
+    def attach(self, loop: asyncio.AbstractEventLoop):
+        """Start receiving frames from the simulation worker on the given loop"""
+        self._loop = loop
+        self.manager.add_step_listener(self.on_step)
+
+    def subscribe(self) -> Subscription:
+        subscription = Subscription(self.queue_size)
+        self.subscribers.add(subscription)
+        if self.latest_frame is not None:
+            subscription.put(self.latest_frame)
+        return subscription
+
+    async def unsubscribe(self, subscription: Subscription):
+        self.subscribers.discard(subscription)
+        await self._release(subscription)
+
+    async def select(self, subscription: Subscription, junction_id: str):
+        """Point a subscriber at a junction, watching it through the telemetry layer"""
+        if junction_id == subscription.junction_id:
+            return
+        await self._release(subscription)
+        subscription.junction_id = junction_id
+        subscription.error = None
+        try:
+            await self.manager.call(self.telemetry.watch, junction_id)
+            subscription.watching = True
+        except Exception as e:
+            subscription.error = f"Junction not found: {e}"
+
+    def on_step(self, step: int):
+        """Step listener (SUMO worker thread): snapshot once, publish on the event loop"""
+        if self._loop is None or not self.subscribers:
+            return
+        now = time.monotonic()
+        if now - self._last_frame_time < self.min_frame_interval:
+            return
+        self._last_frame_time = now
+        frame = self.snapshot(step)
+        self._loop.call_soon_threadsafe(self.publish, frame)
+
+    def publish(self, frame: dict):
+        self.latest_frame = frame
+        self.broadcast(frame)
+
+    def broadcast(self, frame: dict):
+        """Fan a frame out to every subscriber queue"""
+        for subscription in list(self.subscribers):
+            subscription.put(frame)
+
+    def snapshot(self, step: int) -> dict:
+        junctions = {}
+        for junction_id in list(self.telemetry.junctions):
+            try:
+                junctions[junction_id] = self.telemetry.snapshot(junction_id)
+            except Exception as e:
+                junctions[junction_id] = empty_snapshot(junction_id, f"Junction not found: {e}")
+        return {"step": step, "junctions": junctions}
+
+    async def _release(self, subscription: Subscription):
+        if subscription.watching:
+            subscription.watching = False
+            try:
+                await self.manager.call(self.telemetry.unwatch, subscription.junction_id)
+            except Exception as e:
+                print(f"[WARN] release {subscription.junction_id}: {e}")
+
+
+broadcaster = SimulationBroadcaster(sumo_manager, telemetry)
@@ -1,13 +1,56 @@
+import os
+import time
+import queue
+import asyncio
+import threading
 import traci
 import subprocess
+from concurrent.futures import Future
+
+from .config import settings
+from .sumo_backend import fatal_error_types, is_libsumo, load_backend
+
+# realtime: one step per step_length of wall time
+# speedup:  speed_factor times faster than real time
+# fast:     as fast as SUMO can step
+RUN_MODES = ("realtime", "speedup", "fast")
 
 class SUMOManager:
-    def __init__(self, sumo_cfg_path: str, sumo_binary="sumo-gui", port=8813):
+    """
+    Owns the SUMO process and the TraCI connection.
+
+    `sim` is the module implementing the TraCI API for the configured
+    backend (traci over TCP, or in-process libsumo for headless runs).
+    After start() every call on it happens on a single worker thread, which
+    advances the simulation and executes queued commands between steps.
+    Other threads (including the asyncio event loop) go through submit()
+    or call() and never touch `sim` directly.
+
+    Pacing follows the run mode: each step is scheduled against a wall-clock
+    deadline, so the measured step cost is absorbed instead of added to the
+    interval, and a slow step never builds up a backlog of late steps.
+    """
+
+    def __init__(self, sumo_cfg_path: str, sumo_binary="sumo-gui", port=8813, backend="traci",
+                 step_length=1.0, run_mode="realtime", speed_factor=1.0):
         self.sumo_cfg_path = sumo_cfg_path
         self.sumo_binary = sumo_binary
+        self.use_gui = os.path.basename(sumo_binary).startswith("sumo-gui")
+        self.sim = load_backend(backend, use_gui=self.use_gui)
         self.port = port
+        self.step_length = step_length
+        self.run_mode = "realtime"
+        self.speed_factor = 1.0
+        self.set_run_mode(run_mode, speed_factor)
+        self.step_cost = 0.0  # moving average of simulationStep wall time (s)
+        self.real_time_factor = 0.0  # simulated seconds per wall second, last window
         self.process = None
         self.running = False
+        self.current_step = 0
+        self._commands = queue.Queue()
+        self._thread = None
+        self._step_listeners = []
+        self._step_waiters = []
 
     def start(self):
         if self.running:
@@ -18,27 +61,183 @@ class SUMOManager:
         sumo_cmd = [
             self.sumo_binary,
             "-c", self.sumo_cfg_path,
-            "--remote-port", str(self.port),
-            "--start",                
-            "--step-length", "1",  
-            "--delay", "1000"
-            # "--start"        
+            "--start",
+            "--step-length", str(self.step_length),
+            # Pacing is done by the worker loop, not by the GUI delay
+            "--delay", "0"
         ]
-        self.process = subprocess.Popen(sumo_cmd)
-        traci.init(self.port)
+        if is_libsumo(self.sim):
+            self.sim.start(sumo_cmd)
+        else:
+            self.process = subprocess.Popen(sumo_cmd + ["--remote-port", str(self.port)])
+            traci.init(self.port)
         self.running = True
-        print("SUMO started and connected via TraCI.")
+        self._thread = threading.Thread(target=self._run, name="sumo-worker", daemon=True)
+        self._thread.start()
+        print(f"SUMO started ({self.sim.__name__} backend).")
 
     def stop(self):
-        if self.running:
-            traci.close()
+        if not self.running:
+            return
+        self.running = False
+        self._commands.put(None)  # wake the worker
+        if self._thread is not None and self._thread is not threading.current_thread():
+            self._thread.join(timeout=5)
+        self._fail_pending(RuntimeError("SUMO stopped"))
+        try:
+            self.sim.close()
+        except Exception as e:
+            print(f"[WARN] {self.sim.__name__}.close: {e}")
+        if self.process is not None:
             self.process.terminate()
-            self.running = False
-            print("SUMO stopped.")
+            self.process = None
+        print("SUMO stopped.")
 
     def step(self):
+        """Advance one simulation step (worker thread only)"""
         if self.running:
-            traci.simulationStep()
+            self.sim.simulationStep()
+            self.current_step += 1
+            for listener in self._step_listeners:
+                try:
+                    listener(self.current_step)
+                except Exception as e:
+                    print(f"[ERROR] step listener: {e}")
+            waiters, self._step_waiters = self._step_waiters, []
+            for waiter in waiters:
+                if waiter.set_running_or_notify_cancel():
+                    waiter.set_result(self.current_step)
 
     def is_running(self):
         return self.running
+
+    @property
+    def step_interval(self) -> float:
+        """Target wall time between two steps for the current run mode"""
+        if self.run_mode == "fast":
+            return 0.0
+        if self.run_mode == "speedup":
+            return self.step_length / self.speed_factor
+        return self.step_length
+
+    def set_run_mode(self, run_mode: str, speed_factor: float = None):
+        """Switch pacing; safe to call while the simulation is running"""
+        if run_mode not in RUN_MODES:
+            raise ValueError(f"Unknown run mode '{run_mode}', expected one of {RUN_MODES}")
+        if speed_factor is not None:
+            if speed_factor <= 0:
+                raise ValueError("speed_factor must be positive")
+            self.speed_factor = speed_factor
+        self.run_mode = run_mode
+
+    def get_stats(self) -> dict:
+        return {
+            "running": self.running,
+            "backend": self.sim.__name__,
+            "run_mode": self.run_mode,
+            "speed_factor": self.speed_factor,
+            "step": self.current_step,
+            "simulation_time": self.current_step * self.step_length,
+            "step_cost_ms": self.step_cost * 1000,
+            "real_time_factor": self.real_time_factor
+        }
+
+    def add_step_listener(self, listener):
+        """Register a callback run on the worker thread after each step"""
+        self._step_listeners.append(listener)
+
+    def submit(self, fn, *args, **kwargs) -> Future:
+        """Queue fn to run on the worker thread between simulation steps"""
+        future = Future()
+        if not self.running:
+            future.set_exception(RuntimeError("SUMO is not running"))
+            return future
+        self._commands.put((fn, args, kwargs, future))
+        return future
+
+    async def call(self, fn, *args, **kwargs):
+        """Await the result of fn executed on the worker thread"""
+        return await asyncio.wrap_future(self.submit(fn, *args, **kwargs))
+
+    async def next_step(self) -> int:
+        """Wait until the worker has completed the next simulation step"""
+        waiter = await self.call(self._wait_next_step)
+        return await asyncio.wrap_future(waiter)
+
+    def _wait_next_step(self):
+        future = Future()
+        self._step_waiters.append(future)
+        return future
+
+    def _run(self):
+        next_step = time.monotonic()
+        window_start, window_steps = next_step, 0
+        while self.running:
+            self._execute_commands(until=next_step)
+            if not self.running:
+                break
+
+            started = time.monotonic()
+            try:
+                self.step()
+            except fatal_error_types(self.sim) as e:
+                print(f"[ERROR] SUMO connection lost: {e}")
+                self.running = False
+                break
+            now = time.monotonic()
+
+            cost = now - started
+            self.step_cost = cost if not self.step_cost else 0.9 * self.step_cost + 0.1 * cost
+            window_steps += 1
+            if now - window_start >= 1.0:
+                self.real_time_factor = window_steps * self.step_length / (now - window_start)
+                window_start, window_steps = now, 0
+
+            # Deadline pacing: sleep only for what is left of the interval after
+            # the step itself; when SUMO is slower than the target, run flat out
+            next_step = max(next_step + self.step_interval, now)
+        self._fail_pending(RuntimeError("SUMO is not running"))
+
+    def _execute_commands(self, until: float):
+        """Run queued commands until the next step is due"""
+        while True:
+            timeout = until - time.monotonic()
+            try:
+                command = self._commands.get(timeout=timeout) if timeout > 0 else self._commands.get_nowait()
+            except queue.Empty:
+                return
+            if command is None:
+                return
+            fn, args, kwargs, future = command
+            if not future.set_running_or_notify_cancel():
+                continue
+            try:
+                future.set_result(fn(*args, **kwargs))
+            except Exception as e:
+                future.set_exception(e)
+
+    def _fail_pending(self, error: Exception):
+        waiters, self._step_waiters = self._step_waiters, []
+        for waiter in waiters:
+            if waiter.set_running_or_notify_cancel():
+                waiter.set_exception(error)
+        while True:
+            try:
+                command = self._commands.get_nowait()
+            except queue.Empty:
+                return
+            if command is not None and command[3].set_running_or_notify_cancel():
+                command[3].set_exception(error)
+
+
+# sumo_manager = SUMOManager(sumo_cfg_path="data/traffic_simulation.sumocfg")
+sumo_cfg_path = os.path.join(os.path.dirname(os.path.dirname(__file__)), "data", "traffic_simulation.sumocfg")
+print(f"Using SUMO config path: {sumo_cfg_path}")
+sumo_manager = SUMOManager(
+    sumo_cfg_path=os.path.abspath(sumo_cfg_path),
+    sumo_binary="sumo-gui" if settings.SUMO_GUI else "sumo",
+    backend=settings.SUMO_BACKEND,
+    step_length=settings.SUMO_STEP_LENGTH,
+    run_mode=settings.SUMO_RUN_MODE,
+    speed_factor=settings.SUMO_SPEED_FACTOR
+)
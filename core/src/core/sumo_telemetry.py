@@ -0,0 +1,146 @@
+import math
+import traci.constants as tc
+
+from .sumo_manager import sumo_manager
+
+# Variables fetched for every vehicle around a watched junction
+VEHICLE_VARIABLES = [tc.VAR_POSITION, tc.VAR_SPEED]
+
+
+def classify_traffic(avg_speed: float) -> str:
+    """Map an average speed (m/s) to a traffic status label"""
+    if avg_speed < 5:
+        return "heavy traffic"
+    elif avg_speed < 15:
+        return "moderate traffic"
+    return "light traffic"
+
+
+class SUMOTelemetry:
+    """
+    Live vehicle state for watched junctions, read through TraCI subscriptions.
+
+    Watching a junction subscribes once to its traffic light phase, to the
+    vehicle list of every controlled lane and to a vehicle context around the
+    junction. SUMO then pushes all of those values with each simulationStep,
+    so reading a snapshot costs no extra TraCI round trips.
+    """
+
+    def __init__(self, sim, min_context_range: float = 50.0):
+        # TraCI API module of the running backend (traci or libsumo)
+        self.sim = sim
+        self.min_context_range = min_context_range
+        # junction_id -> {"lanes": [...], "center": (x, y), "range": float, "watchers": int}
+        self.junctions = {}
+
+    def watch(self, junction_id: str):
+        """Subscribe to a junction (reference counted across callers)"""
+        entry = self.junctions.get(junction_id)
+        if entry is not None:
+            entry["watchers"] += 1
+            return
+
+        # Controlled lanes repeat once per link, keep the first occurrence
+        lanes = list(dict.fromkeys(self.sim.trafficlight.getControlledLanes(junction_id)))
+
+        self.sim.trafficlight.subscribe(junction_id, [tc.TL_CURRENT_PHASE])
+        for lane_id in lanes:
+            self.sim.lane.subscribe(lane_id, [tc.LAST_STEP_VEHICLE_ID_LIST])
+        center = self.sim.junction.getPosition(junction_id)
+        context_range = self._context_range(center, lanes)
+        self.sim.junction.subscribeContext(
+            junction_id, tc.CMD_GET_VEHICLE_VARIABLE, context_range, VEHICLE_VARIABLES
+        )
+
+        self.junctions[junction_id] = {
+            "lanes": lanes,
+            "center": center,
+            "range": context_range,
+            "watchers": 1
+        }
+
+    def unwatch(self, junction_id: str):
+        """Drop one watcher; unsubscribe when nobody watches the junction anymore"""
+        entry = self.junctions.get(junction_id)
+        if entry is None:
+            return
+
+        entry["watchers"] -= 1
+        if entry["watchers"] > 0:
+            return
+
+        del self.junctions[junction_id]
+        still_used = {lane for other in self.junctions.values() for lane in other["lanes"]}
+        try:
+            self.sim.trafficlight.unsubscribe(junction_id)
+            self.sim.junction.unsubscribeContext(
+                junction_id, tc.CMD_GET_VEHICLE_VARIABLE, entry["range"]
+            )
+            for lane_id in entry["lanes"]:
+                if lane_id not in still_used:
+                    self.sim.lane.unsubscribe(lane_id)
+        except self.sim.TraCIException as e:
+            print(f"[WARN] unwatch {junction_id}: {e}")
+
+    def clear(self):
+        """Forget all junctions (the TraCI connection is gone or restarted)"""
+        self.junctions.clear()
+
+    def snapshot(self, junction_id: str) -> dict:
+        """Build the stream payload for a watched junction from cached subscription results"""
+        entry = self.junctions.get(junction_id)
+        if entry is None:
+            raise KeyError(f"Junction {junction_id} is not watched")
+
+        tl_results = self.sim.trafficlight.getSubscriptionResults(junction_id)
+        lane_results = self.sim.lane.getAllSubscriptionResults()
+        context = self.sim.junction.getContextSubscriptionResults(junction_id) or {}
+
+        vehicle_data = []
+        total_speed = 0.0
+        for lane_id in entry["lanes"]:
+            veh_ids = lane_results.get(lane_id, {}).get(tc.LAST_STEP_VEHICLE_ID_LIST, ())
+            for veh_id in veh_ids:
+                values = context.get(veh_id)
+                if values is None:
+                    continue
+                speed = values[tc.VAR_SPEED]
+                total_speed += speed
+                vehicle_data.append({
+                    "id": veh_id,
+                    "position": values[tc.VAR_POSITION],
+                    "speed": speed
+                })
+
+        avg_speed = total_speed / len(vehicle_data) if vehicle_data else 0.0
+
+        return {
+            "vehicles": vehicle_data,
+            "average_speed": avg_speed,
+            "traffic_status": classify_traffic(avg_speed),
+            "traffic_light": {
+                "id": junction_id,
+                "phase": tl_results.get(tc.TL_CURRENT_PHASE, -1),
+                "position": entry["center"]
+            }
+        }
+
+    def phase(self, junction_id: str) -> int:
+        """Current phase of a traffic light, from the subscription when available"""
+        if junction_id in self.junctions:
+            results = self.sim.trafficlight.getSubscriptionResults(junction_id)
+            if tc.TL_CURRENT_PHASE in results:
+                return results[tc.TL_CURRENT_PHASE]
+        return self.sim.trafficlight.getPhase(junction_id)
+
+    def _context_range(self, center, lanes) -> float:
+        """Radius around the junction center that covers every controlled lane"""
+        cx, cy = center
+        radius = self.min_context_range
+        for lane_id in lanes:
+            for x, y in self.sim.lane.getShape(lane_id):
+                radius = max(radius, math.hypot(x - cx, y - cy))
+        return radius
+
+
+telemetry = SUMOTelemetry(sumo_manager.sim)
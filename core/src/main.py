@@ -1,4 +1,3 @@
-import os
 import asyncio
 from fastapi import FastAPI, status
 from contextlib import asynccontextmanager
@@ -7,32 +6,28 @@ from starlette.exceptions import HTTPException as StarletteHTTPException
 
 from src.api.routers import routers
 from src.core.config import settings
-from src.core.sumo_manager import SUMOManager
+from src.core.sumo_manager import sumo_manager
+from src.core.sumo_telemetry import telemetry
+from src.core.sumo_broadcaster import broadcaster
+from src.api.endpoints.traffic_simulation import traffic_controller
 from src.core.errors import http_422_error_handler, http_error_handler
 from src.db.mongodb_utils import close_mongo_connection, open_mongo_connection
 
-# sumo_manager = SUMOManager(sumo_cfg_path="data/traffic_simulation.sumocfg")
-sumo_cfg_path = os.path.join(os.path.dirname(__file__), "data", "traffic_simulation.sumocfg")
-print(f"Using SUMO config path: {sumo_cfg_path}")
-sumo_manager = SUMOManager(sumo_cfg_path=os.path.abspath(sumo_cfg_path))
-
-
-async def run_sumo_steps():
-    while sumo_manager.is_running():
-        sumo_manager.step()
-        await asyncio.sleep(0.05)  
 
 @asynccontextmanager
 async def lifespan(app: FastAPI):
     await open_mongo_connection()
-    sumo_manager.start()
-    step_task = asyncio.create_task(run_sumo_steps())
+    # SUMO steps on its own worker thread; frames come back through the broadcaster
+    broadcaster.attach(asyncio.get_running_loop())
+    await asyncio.to_thread(sumo_manager.start)
 
     yield
     
-    step_task.cancel()
     await close_mongo_connection()
-    sumo_manager.stop()
+    await asyncio.to_thread(sumo_manager.stop)
+    telemetry.clear()
+    # What-if simulation worker processes
+    traffic_controller.sumo_service.pool.shutdown()
 
 app = FastAPI(
     title=settings.PROJECT_NAME,
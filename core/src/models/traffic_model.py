@@ -1,5 +1,5 @@
-from pydantic import BaseModel
-from typing import List, Dict, Optional
+from pydantic import BaseModel, Field, model_validator
+from typing import List, Dict, Literal, Optional
 from enum import Enum
 
 class SimulationStatus(str, Enum):
@@ -29,4 +29,34 @@ class TrafficMetrics(BaseModel):
     queue_length: int
     throughput: int
     reward: float
-    timestamp: str
\ No newline at end of file
+    timestamp: str
+
+class BatchStepRequest(BaseModel):
+    steps: Optional[int] = Field(default=None, ge=1, le=86400)
+    actions: Optional[List[int]] = Field(default=None, min_length=1, max_length=86400)
+    per_step: Optional[Literal["columnar", "ndjson"]] = None
+
+    @model_validator(mode="after")
+    def check_steps(self):
+        if self.steps is None and self.actions is None:
+            raise ValueError("Either steps or actions is required")
+        if self.actions is not None:
+            if self.steps is None:
+                self.steps = len(self.actions)
+            elif len(self.actions) != self.steps:
+                raise ValueError("actions must contain exactly one action per step")
+        return self
+
+class BatchStepMetrics(BaseModel):
+    simulation_id: str
+    start_step: int
+    end_step: int
+    steps: int
+    done: bool
+    total_reward: float
+    mean_reward: float
+    mean_waiting_time: float
+    max_queue_length: int
+    total_throughput: int
+    timestamp: str
+    per_step: Optional[Dict[str, List[float]]] = None
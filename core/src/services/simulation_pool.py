@@ -0,0 +1,288 @@
+import os
+import time
+import asyncio
+import itertools
+import threading
+import multiprocessing as mp
+from typing import Callable, Dict, List, Optional
+from concurrent.futures import Future
+
+
+# ---------------------------------------------------------------------------
+# Worker process side
+# ---------------------------------------------------------------------------
+
+def _create(envs: dict, simulation_id: str, **env_kwargs):
+    import gym
+    import sumo_rl  # noqa: F401  (registers sumo-rl-v0)
+
+    envs[simulation_id] = gym.make('sumo-rl-v0', **env_kwargs)
+    return True
+
+
+def _reset(envs: dict, simulation_id: str):
+    envs[simulation_id].reset()
+    return True
+
+
+def _step(envs: dict, simulation_id: str, action: Optional[int] = None):
+    env = envs[simulation_id]
+    if action is None:
+        action = env.action_space.sample()
+    _, reward, done, info = env.step(action)
+    return {'reward': float(reward), 'done': bool(done), 'info': dict(info)}
+
+
+def _step_batch(envs: dict, simulation_id: str, steps: int, actions: Optional[List[int]] = None):
+    """Advance up to `steps` steps in one request; returns per-step columns"""
+    env = envs[simulation_id]
+    columns = {'reward': [], 'waiting_time': [], 'queue_length': [], 'throughput': []}
+    done = False
+    for i in range(steps):
+        action = actions[i] if actions is not None else env.action_space.sample()
+        _, reward, done, info = env.step(action)
+        columns['reward'].append(float(reward))
+        columns['waiting_time'].append(float(info.get('waiting_time', 0)))
+        columns['queue_length'].append(int(info.get('queue_length', 0)))
+        columns['throughput'].append(int(info.get('throughput', 0)))
+        if done:
+            break
+    return {'done': bool(done), 'columns': columns}
+
+
+def _close(envs: dict, simulation_id: str):
+    env = envs.pop(simulation_id, None)
+    if env is not None:
+        env.close()
+    return True
+
+
+WORKER_COMMANDS = {
+    'create': _create,
+    'reset': _reset,
+    'step': _step,
+    'step_batch': _step_batch,
+    'close': _close,
+}
+
+
+def _worker_main(conn, backend: str):
+    """Serve commands for the simulations pinned to this process until told to stop"""
+    if backend == 'libsumo':
+        # sumo-rl reads this when it is first imported
+        os.environ['LIBSUMO_AS_TRACI'] = '1'
+    envs = {}
+    while True:
+        try:
+            message = conn.recv()
+        except EOFError:
+            break
+        if message is None:
+            break
+
+        request_id, command, simulation_id, kwargs = message
+        try:
+            result = WORKER_COMMANDS[command](envs, simulation_id, **kwargs)
+            conn.send((request_id, True, result))
+        except Exception as e:
+            conn.send((request_id, False, f"{type(e).__name__}: {e}"))
+
+    for simulation_id in list(envs):
+        _close(envs, simulation_id)
+    conn.close()
+
+
+# ---------------------------------------------------------------------------
+# API process side
+# ---------------------------------------------------------------------------
+
+class SimulationWorker:
+    """Handle on one worker process; requests are matched to replies by id"""
+
+    def __init__(self, context, index: int, backend: str = 'traci'):
+        self.index = index
+        self.simulations = set()
+        self._conn, child_conn = context.Pipe()
+        self.process = context.Process(
+            target=_worker_main, args=(child_conn, backend), name=f"sumo-sim-worker-{index}", daemon=True
+        )
+        self.process.start()
+        child_conn.close()
+
+        self._ids = itertools.count()
+        self._pending: Dict[int, Future] = {}
+        self._send_lock = threading.Lock()
+        self._reader = threading.Thread(target=self._read_replies, daemon=True)
+        self._reader.start()
+
+    def request(self, command: str, simulation_id: str, **kwargs) -> Future:
+        future = Future()
+        with self._send_lock:
+            request_id = next(self._ids)
+            self._pending[request_id] = future
+            try:
+                self._conn.send((request_id, command, simulation_id, kwargs))
+            except (OSError, ValueError) as e:
+                self._pending.pop(request_id, None)
+                future.set_exception(Exception(f"Simulation worker {self.index} unavailable: {e}"))
+        return future
+
+    def stop(self):
+        with self._send_lock:
+            try:
+                self._conn.send(None)
+            except (OSError, ValueError):
+                pass
+        self.process.join(timeout=10)
+        if self.process.is_alive():
+            self.process.terminate()
+
+    def _read_replies(self):
+        while True:
+            try:
+                request_id, ok, result = self._conn.recv()
+            except (EOFError, OSError):
+                break
+            future = self._pending.pop(request_id, None)
+            # A request cancelled by its caller (e.g. a disconnected client) is skipped
+            if future is None or not future.set_running_or_notify_cancel():
+                continue
+            if ok:
+                future.set_result(result)
+            else:
+                future.set_exception(Exception(result))
+
+        for future in list(self._pending.values()):
+            if future.set_running_or_notify_cancel():
+                future.set_exception(Exception(f"Simulation worker {self.index} exited"))
+        self._pending.clear()
+
+
+class SimulationPool:
+    """
+    Pool of worker processes running SUMO environments.
+
+    Every simulation is pinned to one worker for its lifetime (session
+    affinity by simulation_id); new simulations go to the least loaded
+    worker. The pool caps the number of live simulations and closes the
+    ones that stay idle longer than idle_timeout seconds; a simulation
+    with a command still running is never idle.
+
+    With the libsumo backend SUMO runs inside the worker and a process can
+    only host one simulation at a time.
+    """
+
+    def __init__(self, num_workers: int = 0, max_simulations: int = 32, idle_timeout: float = 600.0,
+                 on_evict: Optional[Callable[[str], None]] = None, backend: str = 'traci'):
+        self.num_workers = num_workers or os.cpu_count() or 1
+        self.backend = backend
+        self.max_per_worker = 1 if backend == 'libsumo' else 0
+        self.max_simulations = max_simulations
+        self.idle_timeout = idle_timeout
+        self.on_evict = on_evict
+        self.workers = []
+        self.assignments: Dict[str, SimulationWorker] = {}
+        self.last_used: Dict[str, float] = {}
+        self.in_flight: Dict[str, int] = {}
+        self._context = mp.get_context('spawn')
+        self._reaper = None
+
+    def _ensure_workers(self):
+        if not self.workers:
+            self.workers = [
+                SimulationWorker(self._context, i, self.backend) for i in range(self.num_workers)
+            ]
+
+    def _ensure_reaper(self):
+        if self.idle_timeout and (self._reaper is None or self._reaper.done()):
+            self._reaper = asyncio.create_task(self._reap_idle())
+
+    async def create(self, simulation_id: str, **env_kwargs):
+        """Start a simulation on the least loaded worker"""
+        self._ensure_workers()
+        self._ensure_reaper()
+
+        if len(self.assignments) >= self.max_simulations:
+            await self.evict_idle()
+        if len(self.assignments) >= self.max_simulations:
+            raise Exception(f"Simulation limit reached ({self.max_simulations} running)")
+
+        worker = min(self.workers, key=lambda w: len(w.simulations))
+        if self.max_per_worker and len(worker.simulations) >= self.max_per_worker:
+            raise Exception(f"All {len(self.workers)} simulation workers are busy")
+        self.assignments[simulation_id] = worker
+        worker.simulations.add(simulation_id)
+        try:
+            await self.call(simulation_id, 'create', **env_kwargs)
+        except Exception:
+            self._forget(simulation_id)
+            raise
+
+    async def call(self, simulation_id: str, command: str, **kwargs):
+        """Run a command on the worker that owns the simulation"""
+        worker = self.assignments.get(simulation_id)
+        if worker is None:
+            raise Exception("Simulation not found")
+        self.last_used[simulation_id] = time.monotonic()
+        self.in_flight[simulation_id] = self.in_flight.get(simulation_id, 0) + 1
+        try:
+            return await asyncio.wrap_future(worker.request(command, simulation_id, **kwargs))
+        finally:
+            remaining = self.in_flight.get(simulation_id, 0) - 1
+            if remaining > 0:
+                self.in_flight[simulation_id] = remaining
+            else:
+                self.in_flight.pop(simulation_id, None)
+            # Idle time counts from the end of the last command
+            if simulation_id in self.assignments:
+                self.last_used[simulation_id] = time.monotonic()
+
+    async def release(self, simulation_id: str):
+        """Close a simulation and free its slot"""
+        if simulation_id not in self.assignments:
+            return
+        try:
+            await self.call(simulation_id, 'close')
+        finally:
+            self._forget(simulation_id)
+
+    async def evict_idle(self) -> list:
+        """Close simulations idle for longer than idle_timeout"""
+        if not self.idle_timeout:
+            return []
+        deadline = time.monotonic() - self.idle_timeout
+        idle = [
+            sid for sid, used in self.last_used.items()
+            if used < deadline and not self.in_flight.get(sid)
+        ]
+        for simulation_id in idle:
+            try:
+                await self.release(simulation_id)
+            except Exception as e:
+                print(f"[WARN] evict {simulation_id}: {e}")
+            if self.on_evict is not None:
+                self.on_evict(simulation_id)
+        return idle
+
+    def shutdown(self):
+        if self._reaper is not None:
+            self._reaper.cancel()
+        for worker in self.workers:
+            worker.stop()
+        self.workers = []
+        self.assignments.clear()
+        self.last_used.clear()
+        self.in_flight.clear()
+
+    async def _reap_idle(self):
+        while True:
+            await asyncio.sleep(max(self.idle_timeout / 4, 1.0))
+            evicted = await self.evict_idle()
+            if evicted:
+                print(f"Evicted idle simulations: {evicted}")
+
+    def _forget(self, simulation_id: str):
+        worker = self.assignments.pop(simulation_id, None)
+        if worker is not None:
+            worker.simulations.discard(simulation_id)
+        self.last_used.pop(simulation_id, None)
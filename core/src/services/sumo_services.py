@@ -1,15 +1,29 @@
 import os
 import sys
-import gym
-import sumo_rl
+import json
 import uuid
-from typing import Dict, Optional
-from ..models.traffic_models import SimulationStatus, TrafficMetrics
+import numpy as np
+from datetime import datetime
+from typing import AsyncIterator, Dict, List, Optional
+from ..core.config import settings
+from ..models.traffic_model import BatchStepMetrics, SimulationStatus, TrafficMetrics
+from .simulation_pool import SimulationPool
+
+# Steps run per worker request when streaming NDJSON
+STREAM_CHUNK_SIZE = 100
 
 class SUMOService:
     def __init__(self):
+        # Bookkeeping only; the environments live in the worker processes of the pool
         self.active_simulations: Dict[str, dict] = {}
         self._setup_sumo_home()
+        self.pool = SimulationPool(
+            num_workers=settings.SIMULATION_WORKERS,
+            max_simulations=settings.MAX_SIMULATIONS,
+            idle_timeout=settings.SIMULATION_IDLE_TIMEOUT,
+            on_evict=self._forget_simulation,
+            backend=settings.SUMO_BACKEND
+        )
     
     def _setup_sumo_home(self):
         """Setup SUMO environment"""
@@ -18,26 +32,32 @@ class SUMOService:
             sys.path.append(tools)
         else:
             raise Exception("SUMO_HOME environment variable not set")
+
+    def _forget_simulation(self, simulation_id: str):
+        self.active_simulations.pop(simulation_id, None)
     
     async def create_simulation(self, network_file: str, route_file: str, 
                               simulation_time: int = 3600, use_gui: bool = False) -> str:
         """Create new traffic simulation"""
         simulation_id = str(uuid.uuid4())
+
+        if use_gui and self.pool.backend == 'libsumo':
+            raise Exception("use_gui requires the traci backend")
         
         try:
-            env = gym.make('sumo-rl-v0',
-                          net_file=f"sumo_data/networks/{network_file}",
-                          route_file=f"sumo_data/routes/{route_file}",
-                          out_csv_name=f'outputs/simulation_{simulation_id}',
-                          use_gui=use_gui,
-                          num_seconds=simulation_time)
+            await self.pool.create(
+                simulation_id,
+                net_file=f"sumo_data/networks/{network_file}",
+                route_file=f"sumo_data/routes/{route_file}",
+                out_csv_name=f'outputs/simulation_{simulation_id}',
+                use_gui=use_gui,
+                num_seconds=simulation_time
+            )
             
             self.active_simulations[simulation_id] = {
-                'env': env,
                 'status': SimulationStatus.STOPPED,
                 'current_step': 0,
-                'total_reward': 0.0,
-                'obs': None
+                'total_reward': 0.0
             }
             
             return simulation_id
@@ -51,7 +71,7 @@ class SUMOService:
             return False
             
         sim = self.active_simulations[simulation_id]
-        sim['obs'] = sim['env'].reset()
+        await self.pool.call(simulation_id, 'reset')
         sim['status'] = SimulationStatus.RUNNING
         return True
     
@@ -62,12 +82,9 @@ class SUMOService:
             
         sim = self.active_simulations[simulation_id]
         
-        if action is None:
-            action = sim['env'].action_space.sample()
+        result = await self.pool.call(simulation_id, 'step', action=action)
+        reward, done, info = result['reward'], result['done'], result['info']
         
-        obs, reward, done, info = sim['env'].step(action)
-        
-        sim['obs'] = obs
         sim['current_step'] += 1
         sim['total_reward'] += reward
         
@@ -83,6 +100,79 @@ class SUMOService:
             reward=reward,
             timestamp=str(datetime.now())
         )
+
+    async def step_simulation_batch(self, simulation_id: str, steps: int,
+                                    actions: Optional[List[int]] = None,
+                                    include_per_step: bool = False) -> BatchStepMetrics:
+        """Execute several simulation steps server-side and aggregate the metrics"""
+        if simulation_id not in self.active_simulations:
+            raise Exception("Simulation not found")
+
+        sim = self.active_simulations[simulation_id]
+        start_step = sim['current_step']
+
+        result = await self.pool.call(simulation_id, 'step_batch', steps=steps, actions=actions)
+        columns = result['columns']
+        self._record_steps(sim, columns, result['done'])
+
+        rewards = np.asarray(columns['reward'], dtype=np.float64)
+        return BatchStepMetrics(
+            simulation_id=simulation_id,
+            start_step=start_step,
+            end_step=sim['current_step'],
+            steps=len(rewards),
+            done=result['done'],
+            total_reward=float(rewards.sum()),
+            mean_reward=float(rewards.mean()) if len(rewards) else 0.0,
+            mean_waiting_time=float(np.mean(columns['waiting_time'])) if len(rewards) else 0.0,
+            max_queue_length=int(max(columns['queue_length'], default=0)),
+            total_throughput=int(sum(columns['throughput'])),
+            timestamp=str(datetime.now()),
+            per_step=columns if include_per_step else None
+        )
+
+    async def stream_simulation_steps(self, simulation_id: str, steps: int,
+                                      actions: Optional[List[int]] = None) -> AsyncIterator[str]:
+        """Execute several steps, yielding one NDJSON line of metrics per step"""
+        if simulation_id not in self.active_simulations:
+            raise Exception("Simulation not found")
+
+        sim = self.active_simulations[simulation_id]
+        completed = 0
+        while completed < steps:
+            count = min(STREAM_CHUNK_SIZE, steps - completed)
+            chunk_actions = actions[completed:completed + count] if actions is not None else None
+            result = await self.pool.call(simulation_id, 'step_batch', steps=count, actions=chunk_actions)
+
+            columns = result['columns']
+            start_step = sim['current_step']
+            self._record_steps(sim, columns, result['done'])
+
+            for i in range(len(columns['reward'])):
+                yield json.dumps({
+                    'simulation_id': simulation_id,
+                    'step': start_step + i + 1,
+                    **{name: values[i] for name, values in columns.items()}
+                }) + "\n"
+
+            completed += count
+            if result['done']:
+                break
+
+    def _record_steps(self, sim: dict, columns: Dict[str, list], done: bool):
+        sim['current_step'] += len(columns['reward'])
+        sim['total_reward'] += float(sum(columns['reward']))
+        if done:
+            sim['status'] = SimulationStatus.COMPLETED
+
+    async def close_simulation(self, simulation_id: str) -> bool:
+        """Stop a simulation and free its worker slot"""
+        if simulation_id not in self.active_simulations:
+            return False
+
+        await self.pool.release(simulation_id)
+        self._forget_simulation(simulation_id)
+        return True
     
     async def get_simulation_status(self, simulation_id: str) -> dict:
         """Get current simulation status"""
@@ -95,4 +185,4 @@ class SUMOService:
             'status': sim['status'],
             'current_step': sim['current_step'],
             'total_reward': sim['total_reward']
-        }
\ No newline at end of file
+        }
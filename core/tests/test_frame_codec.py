@@ -0,0 +1,135 @@
+import numpy as np
+
+from src.core.frame_codec import (
+    FRAME_DELTA,
+    FRAME_IMAGE,
+    FRAME_KEYFRAME,
+    HEADER,
+    ID_ENTRY,
+    IMAGE_FORMAT_CODES,
+    IMAGE_HEADER,
+    POSITION_SCALE,
+    RECORD_DTYPE,
+    SPEED_SCALE,
+    VehicleFrameEncoder,
+    encode_image_frame,
+)
+
+
+class FrameDecoder:
+    """Client side of the protocol: rebuilds the vehicle list from keyframes and deltas"""
+
+    def __init__(self):
+        self.names = {}
+        self.state = {}
+
+    def decode(self, frame: bytes) -> dict:
+        (frame_type, step, average_speed, phase, status, origin_x, origin_y,
+         num_new, num_removed, num_records) = HEADER.unpack_from(frame)
+        offset = HEADER.size
+        if frame_type == FRAME_KEYFRAME:
+            self.names.clear()
+            self.state.clear()
+
+        for _ in range(num_new):
+            index, length = ID_ENTRY.unpack_from(frame, offset)
+            offset += ID_ENTRY.size
+            self.names[index] = frame[offset:offset + length].decode("utf-8")
+            offset += length
+
+        removed = np.frombuffer(frame, dtype="<u2", count=num_removed, offset=offset)
+        offset += removed.nbytes
+        for index in removed.tolist():
+            self.names.pop(index, None)
+            self.state.pop(index, None)
+
+        records = np.frombuffer(frame, dtype=RECORD_DTYPE, count=num_records, offset=offset)
+        assert offset + records.nbytes == len(frame)
+        for record in records:
+            self.state[int(record["index"])] = (
+                origin_x + int(record["x"]) * POSITION_SCALE,
+                origin_y + int(record["y"]) * POSITION_SCALE,
+                int(record["speed"]) * SPEED_SCALE,
+            )
+
+        return {
+            "type": frame_type,
+            "step": step,
+            "phase": phase,
+            "records": num_records,
+            "vehicles": {self.names[index]: value for index, value in self.state.items()},
+        }
+
+
+def snapshot(vehicles: dict, phase: int = 2) -> dict:
+    return {
+        "vehicles": [
+            {"id": veh_id, "position": position, "speed": speed}
+            for veh_id, (position, speed) in vehicles.items()
+        ],
+        "average_speed": 5.0,
+        "traffic_status": "light traffic",
+        "traffic_light": {"id": "J1", "phase": phase, "position": (100.0, 200.0)},
+    }
+
+
+def assert_decoded(decoded: dict, vehicles: dict):
+    assert set(decoded["vehicles"]) == set(vehicles)
+    for veh_id, ((x, y), speed) in vehicles.items():
+        dx, dy, dspeed = decoded["vehicles"][veh_id]
+        assert abs(dx - x) <= POSITION_SCALE / 2 + 1e-6
+        assert abs(dy - y) <= POSITION_SCALE / 2 + 1e-6
+        assert abs(dspeed - speed) <= SPEED_SCALE / 2 + 1e-6
+
+
+def test_round_trip_keyframe_then_deltas():
+    encoder, decoder = VehicleFrameEncoder(), FrameDecoder()
+    frames = [
+        {"car_a": ((101.0, 205.0), 3.0), "car_b": ((95.5, 190.25), 0.0)},
+        # car_a moves, car_b unchanged, car_c appears
+        {"car_a": ((102.0, 205.0), 3.5), "car_b": ((95.5, 190.25), 0.0), "car_c": ((110.0, 210.0), 8.0)},
+        # car_b leaves, its index is reused by car_d
+        {"car_a": ((103.0, 205.0), 4.0), "car_c": ((110.0, 210.0), 8.0), "car_d": ((99.0, 199.0), 1.25)},
+    ]
+
+    for step, vehicles in enumerate(frames):
+        decoded = decoder.decode(encoder.encode(snapshot(vehicles), step))
+        assert decoded["type"] == (FRAME_KEYFRAME if step == 0 else FRAME_DELTA)
+        assert decoded["step"] == step
+        assert decoded["phase"] == 2
+        assert_decoded(decoded, vehicles)
+
+
+def test_delta_carries_only_changed_vehicles():
+    encoder, decoder = VehicleFrameEncoder(), FrameDecoder()
+    vehicles = {f"veh_{i}": ((100.0 + i, 200.0), 2.0) for i in range(20)}
+    decoder.decode(encoder.encode(snapshot(vehicles), 0))
+
+    vehicles["veh_3"] = ((150.0, 200.0), 2.0)
+    decoded = decoder.decode(encoder.encode(snapshot(vehicles), 1))
+    assert decoded["type"] == FRAME_DELTA
+    assert decoded["records"] == 1
+    assert_decoded(decoded, vehicles)
+
+    # Nothing moved: header only
+    frame = encoder.encode(snapshot(vehicles), 2)
+    assert len(frame) == HEADER.size
+
+
+def test_keyframe_interval_and_reset():
+    encoder, decoder = VehicleFrameEncoder(keyframe_interval=2), FrameDecoder()
+    vehicles = {"car": ((100.0, 200.0), 1.0)}
+    types = [decoder.decode(encoder.encode(snapshot(vehicles), step))["type"] for step in range(5)]
+    assert types == [FRAME_KEYFRAME, FRAME_DELTA, FRAME_DELTA, FRAME_KEYFRAME, FRAME_DELTA]
+
+    encoder.reset()
+    decoded = decoder.decode(encoder.encode(snapshot(vehicles), 5))
+    assert decoded["type"] == FRAME_KEYFRAME
+    assert_decoded(decoded, vehicles)
+
+
+def test_image_frame_header():
+    frame = encode_image_frame(7, "WEBP", b"image-bytes")
+    frame_type, step, image_format = IMAGE_HEADER.unpack_from(frame)
+    assert (frame_type, step, image_format) == (FRAME_IMAGE, 7, IMAGE_FORMAT_CODES["WEBP"])
+    assert frame[IMAGE_HEADER.size:] == b"image-bytes"
@@ -0,0 +1,48 @@
+import asyncio
+
+import pytest
+
+from src.services.simulation_pool import SimulationPool
+
+
+@pytest.fixture
+def pool():
+    # 'close' on an unknown simulation runs in the worker without starting SUMO
+    pool = SimulationPool(num_workers=1, idle_timeout=0)
+    pool._ensure_workers()
+    worker = pool.workers[0]
+    for simulation_id in ('cancelled', 'live'):
+        pool.assignments[simulation_id] = worker
+        worker.simulations.add(simulation_id)
+    yield pool
+    pool.shutdown()
+
+
+def test_worker_keeps_answering_after_cancelled_requests(pool):
+    async def scenario():
+        cancelled = 0
+        for _ in range(5):
+            task = asyncio.create_task(pool.call('cancelled', 'close'))
+            await asyncio.sleep(0)  # request sent, reply not read yet
+            task.cancel()
+            try:
+                await task
+            except asyncio.CancelledError:
+                cancelled += 1
+            # The reply to the cancelled request must not stop the reader thread
+            assert await asyncio.wait_for(pool.call('live', 'close'), timeout=10) is True
+        return cancelled
+
+    assert asyncio.run(scenario()) > 0
+    assert pool.workers[0]._reader.is_alive()
+    assert not pool.in_flight
+
+
+def test_worker_exit_fails_pending_requests_and_skips_cancelled_ones(pool):
+    worker = pool.workers[0]
+    cancelled = worker.request('close', 'cancelled')
+    cancelled.cancel()
+    worker.stop()
+    worker._reader.join(timeout=10)
+    assert not worker._reader.is_alive()
+    assert cancelled.cancelled()
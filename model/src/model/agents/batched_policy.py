@@ -0,0 +1,231 @@
+import torch
+import torch.nn as nn
+import torch.nn.functional as F
+from torch.distributions import Categorical
+from typing import Dict, List, Optional, Tuple
+
+from .lstm_policy import LSTMPolicyNetwork, policy_signature
+
+
+def _linear_layers(module: nn.Module) -> List[nn.Linear]:
+    return [layer for layer in module.modules() if isinstance(layer, nn.Linear)]
+
+
+def _batched_linear(x, weight, bias):
+    """x [G, B, in] @ weight[G].T + bias[G] -> [G, B, out]"""
+    return torch.baddbmm(bias.unsqueeze(1), x, weight.transpose(1, 2))
+
+
+class BatchedPolicyGroup:
+    """
+    Single-step inference for a group of LSTMPolicyNetworks with the same
+    architecture, in one forward pass.
+
+    The parameters of every network are stacked along a leading agent
+    dimension, so each layer is one batched matmul over all agents instead
+    of one small forward pass per agent. The LSTM cell is unrolled by hand
+    (nn.LSTM has no batched-weights form). The stacked copies are inference
+    only (no dropout, no grad): call sync() after the networks are updated.
+    """
+
+    def __init__(self, agent_ids: List[str], networks: List[LSTMPolicyNetwork]):
+        self.agent_ids = list(agent_ids)
+        self.networks = list(networks)
+        self.index = {agent_id: i for i, agent_id in enumerate(self.agent_ids)}
+
+        first = self.networks[0]
+        self.hidden_size = first.config.hidden_size
+        self.num_layers = first.config.num_layers
+        self.action_space_size = first.action_space_size
+        self.norm_eps = first.input_norm.eps
+        self.device = next(first.parameters()).device
+        self.sync()
+
+    def __len__(self):
+        return len(self.agent_ids)
+
+    @torch.no_grad()
+    def sync(self):
+        """Re-stack the parameters from the member networks"""
+        def stack(get):
+            return torch.stack([get(network).detach() for network in self.networks])
+
+        self.norm_weight = stack(lambda n: n.input_norm.weight)
+        self.norm_bias = stack(lambda n: n.input_norm.bias)
+        self.input_weight = stack(lambda n: n.input_fc.weight)
+        self.input_bias = stack(lambda n: n.input_fc.bias)
+
+        self.lstm_layers = []
+        for layer in range(self.num_layers):
+            self.lstm_layers.append((
+                stack(lambda n: getattr(n.lstm, f'weight_ih_l{layer}')),
+                stack(lambda n: getattr(n.lstm, f'weight_hh_l{layer}')),
+                stack(lambda n: getattr(n.lstm, f'bias_ih_l{layer}') + getattr(n.lstm, f'bias_hh_l{layer}'))
+            ))
+
+        self.policy_layers = self._stack_head(lambda n: n.policy_head)
+        self.value_layers = self._stack_head(lambda n: n.value_head)
+
+    def _stack_head(self, get_head):
+        heads = [_linear_layers(get_head(network)) for network in self.networks]
+        return [
+            (torch.stack([head[i].weight.detach() for head in heads]),
+             torch.stack([head[i].bias.detach() for head in heads]))
+            for i in range(len(heads[0]))
+        ]
+
+    def zero_hidden(self, num_agents: int) -> Tuple[torch.Tensor, torch.Tensor]:
+        h = torch.zeros(self.num_layers, num_agents, self.hidden_size, device=self.device)
+        return h, h.clone()
+
+    @torch.no_grad()
+    def forward(self, states: torch.Tensor, hidden_state: Optional[Tuple[torch.Tensor, torch.Tensor]] = None,
+                rows: Optional[torch.Tensor] = None):
+        """
+        states: [G, input_size], one observation per agent.
+        hidden_state: (h, c) each [num_layers, G, hidden_size].
+        rows: indices of the member agents the states belong to (default all).
+        """
+        def select(param):
+            return param if rows is None else param.index_select(0, rows)
+
+        num_agents = states.size(0)
+        if hidden_state is None:
+            hidden_state = self.zero_hidden(num_agents)
+        h_prev, c_prev = hidden_state
+
+        # [G, 1, input_size]: the agent dimension is the bmm batch
+        x = F.layer_norm(states.unsqueeze(1), states.shape[-1:], eps=self.norm_eps)
+        x = x * select(self.norm_weight).unsqueeze(1) + select(self.norm_bias).unsqueeze(1)
+        x = F.relu(_batched_linear(x, select(self.input_weight), select(self.input_bias)))
+
+        h_next, c_next = [], []
+        for layer, (weight_ih, weight_hh, bias) in enumerate(self.lstm_layers):
+            h = h_prev[layer].unsqueeze(1)
+            gates = _batched_linear(x, select(weight_ih), select(bias))
+            gates = torch.baddbmm(gates, h, select(weight_hh).transpose(1, 2))
+            i, f, g, o = gates.chunk(4, dim=-1)
+            c = torch.sigmoid(f) * c_prev[layer].unsqueeze(1) + torch.sigmoid(i) * torch.tanh(g)
+            h = torch.sigmoid(o) * torch.tanh(c)
+            h_next.append(h.squeeze(1))
+            c_next.append(c.squeeze(1))
+            x = h
+
+        logits = self._run_head(x, self.policy_layers, select).squeeze(1)
+        value = self._run_head(x, self.value_layers, select).squeeze(1)
+        return logits, value, (torch.stack(h_next), torch.stack(c_next))
+
+    @staticmethod
+    def _run_head(x, layers, select):
+        for i, (weight, bias) in enumerate(layers):
+            x = _batched_linear(x, select(weight), select(bias))
+            if i < len(layers) - 1:
+                x = F.relu(x)
+        return x
+
+    @torch.no_grad()
+    def get_actions(self, agent_ids: List[str], states: torch.Tensor,
+                    hidden_states: Dict[str, Tuple[torch.Tensor, torch.Tensor]],
+                    valid_mask: Optional[torch.Tensor] = None) -> Dict[str, dict]:
+        """
+        Sample one action per agent. The result has the same per-agent layout
+        as LSTMPolicyNetwork.get_action_and_value with a batch of one.
+        valid_mask: optional bool [G, num_actions], True for allowed actions.
+        """
+        rows = None
+        if agent_ids != self.agent_ids:
+            rows = torch.tensor([self.index[agent_id] for agent_id in agent_ids], device=self.device)
+
+        zero = None
+        h, c = [], []
+        for agent_id in agent_ids:
+            hidden = hidden_states.get(agent_id)
+            if hidden is None:
+                if zero is None:
+                    zero = torch.zeros(self.num_layers, 1, self.hidden_size, device=self.device)
+                hidden = (zero, zero)
+            h.append(hidden[0])
+            c.append(hidden[1])
+        hidden_state = (torch.cat(h, dim=1), torch.cat(c, dim=1))
+
+        logits, value, (h_next, c_next) = self.forward(states.to(self.device), hidden_state, rows)
+        if valid_mask is not None:
+            logits = logits.masked_fill(~valid_mask.to(self.device), -1e8)
+
+        probs = F.softmax(logits, dim=-1)
+        dist = Categorical(probs)
+        action = dist.sample()
+        log_prob = dist.log_prob(action)
+        entropy = dist.entropy()
+
+        return {
+            agent_id: {
+                'action': action[i:i + 1],
+                'log_prob': log_prob[i:i + 1],
+                'value': value[i],
+                'entropy': entropy[i:i + 1],
+                'hidden_state': (h_next[:, i:i + 1], c_next[:, i:i + 1]),
+                'action_probs': probs[i:i + 1]
+            }
+            for i, agent_id in enumerate(agent_ids)
+        }
+
+
+class SharedPolicyGroup(BatchedPolicyGroup):
+    """
+    Single-step inference for the agents of one parameter-shared
+    LSTMPolicyNetwork: the network already takes the whole group as a
+    batch, with each row's agent embedding. Same interface as
+    BatchedPolicyGroup; there are no stacked copies to sync.
+    """
+
+    def __init__(self, network: LSTMPolicyNetwork):
+        self.network = network
+        self.agent_ids = list(network.agent_ids)
+        self.networks = [network]
+        self.index = {agent_id: i for i, agent_id in enumerate(self.agent_ids)}
+
+        self.hidden_size = network.config.hidden_size
+        self.num_layers = network.config.num_layers
+        self.action_space_size = network.action_space_size
+        self.device = next(network.parameters()).device
+        self.all_rows = torch.arange(len(self.agent_ids), device=self.device)
+
+    def sync(self):
+        pass
+
+    @torch.no_grad()
+    def forward(self, states: torch.Tensor, hidden_state: Optional[Tuple[torch.Tensor, torch.Tensor]] = None,
+                rows: Optional[torch.Tensor] = None):
+        if hidden_state is None:
+            hidden_state = self.zero_hidden(states.size(0))
+        # Inference pass: no dropout even while the shared network is training
+        training = self.network.training
+        self.network.eval()
+        try:
+            logits, value, hidden_state = self.network(
+                states, hidden_state, agent_indices=self.all_rows if rows is None else rows
+            )
+        finally:
+            self.network.train(training)
+        return logits, value, hidden_state
+
+
+def build_policy_groups(policy_networks: Dict[str, LSTMPolicyNetwork]) -> List[BatchedPolicyGroup]:
+    """
+    Group agents for batched inference: one group per parameter-shared
+    network, and agents with separate networks grouped by architecture.
+    """
+    shared = {}
+    members = {}
+    for agent_id, network in policy_networks.items():
+        if network.agent_embedding is not None:
+            shared.setdefault(id(network), network)
+            continue
+        signature = policy_signature(network.config, network.action_space_size)
+        members.setdefault(signature, []).append(agent_id)
+
+    return [SharedPolicyGroup(network) for network in shared.values()] + [
+        BatchedPolicyGroup(agent_ids, [policy_networks[agent_id] for agent_id in agent_ids])
+        for agent_ids in members.values()
+    ]
@@ -0,0 +1,156 @@
+import threading
+import torch
+import torch.nn.functional as F
+from torch.distributions import Categorical
+from typing import Dict, List, Optional
+
+from .lstm_policy import LSTMPolicyNetwork, action_mask
+from .batched_policy import build_policy_groups
+
+
+class InferenceSession:
+    """
+    Streaming single-step inference for live control.
+
+    The LSTM state of every junction lives in one preallocated pair of
+    tensors (h, c) of shape [num_layers, num_junctions, hidden_size],
+    indexed by the junction's position in junction_ids. A decision tick
+    advances the junctions that reported by exactly one step, with one
+    batched forward pass per policy group, so live decisions never replay
+    a history window. reset() clears single junctions (e.g. after a
+    detector fault) and leaves the others running. Calls are serialized
+    with a lock, so one session can serve concurrent API requests.
+    """
+
+    def __init__(self, policy_networks: Dict[str, LSTMPolicyNetwork], junction_ids: Optional[List[str]] = None):
+        junction_ids = list(junction_ids) if junction_ids is not None else list(policy_networks)
+        self._setup(build_policy_groups({junction_id: policy_networks[junction_id] for junction_id in junction_ids}),
+                    junction_ids)
+
+    @classmethod
+    def from_groups(cls, groups: list, junction_ids: Optional[List[str]] = None) -> 'InferenceSession':
+        """Session over prebuilt policy groups (e.g. exported graphs loaded by deploy.runtime)"""
+        session = cls.__new__(cls)
+        if junction_ids is None:
+            junction_ids = [junction_id for group in groups for junction_id in group.agent_ids]
+        session._setup(groups, list(junction_ids))
+        return session
+
+    def _setup(self, groups: list, junction_ids: List[str]):
+        self.junction_ids = junction_ids
+        self.index = {junction_id: i for i, junction_id in enumerate(self.junction_ids)}
+        self.groups = [group for group in groups if any(junction_id in self.index for junction_id in group.agent_ids)]
+
+        shapes = {(group.num_layers, group.hidden_size) for group in self.groups}
+        if len(shapes) != 1:
+            raise ValueError("All junctions of a session need the same LSTM layers and hidden size")
+        num_layers, hidden_size = shapes.pop()
+        missing = set(self.junction_ids) - {junction_id for group in self.groups for junction_id in group.agent_ids}
+        if missing:
+            raise ValueError(f"No policy for junctions: {sorted(missing)}")
+
+        self.device = self.groups[0].device
+        self.num_actions = max(group.action_space_size for group in self.groups)
+
+        # Junction -> (group, row of the junction inside the group)
+        num_junctions = len(self.junction_ids)
+        self.group_of = torch.empty(num_junctions, dtype=torch.long, device=self.device)
+        self.row_in_group = torch.empty(num_junctions, dtype=torch.long, device=self.device)
+        for g, group in enumerate(self.groups):
+            for junction_id in group.agent_ids:
+                if junction_id in self.index:
+                    self.group_of[self.index[junction_id]] = g
+                    self.row_in_group[self.index[junction_id]] = group.index[junction_id]
+        self.all_rows = [torch.arange(len(group), device=self.device) for group in self.groups]
+
+        self.h = torch.zeros(num_layers, num_junctions, hidden_size, device=self.device)
+        self.c = torch.zeros_like(self.h)
+        self.lock = threading.Lock()
+
+    @classmethod
+    def from_coordinator(cls, coordinator, junction_ids: Optional[List[str]] = None) -> 'InferenceSession':
+        junction_ids = junction_ids or coordinator.agent_ids
+        coordinator.load_pending_policies(junction_ids)
+        return cls(coordinator.policy_networks, junction_ids)
+
+    def sync(self):
+        """Pick up updated network weights (the hidden states are kept)"""
+        for group in self.groups:
+            group.sync()
+
+    def _positions(self, junction_ids: Optional[List[str]]) -> torch.Tensor:
+        if junction_ids is None:
+            return torch.arange(len(self.junction_ids), device=self.device)
+        return torch.tensor([self.index[junction_id] for junction_id in junction_ids], device=self.device)
+
+    @torch.no_grad()
+    def step(self, observations, valid_masks=None, junction_ids: Optional[List[str]] = None,
+             deterministic: bool = False) -> Dict[str, torch.Tensor]:
+        """
+        Advance the given junctions (default all, in session order) by one step.
+
+        observations: [n, state_size]; valid_masks: optional bool
+        [n, num_actions] (columns beyond a junction's action space are
+        ignored). Returns actions, log_probs and values, each [n].
+        """
+        positions = self._positions(junction_ids)
+        observations = torch.as_tensor(observations, dtype=torch.float32, device=self.device)
+        if valid_masks is not None:
+            valid_masks = torch.as_tensor(valid_masks, dtype=torch.bool, device=self.device)
+
+        count = len(positions)
+        actions = torch.zeros(count, dtype=torch.long, device=self.device)
+        log_probs = torch.zeros(count, device=self.device)
+        values = torch.zeros(count, device=self.device)
+
+        with self.lock:
+            group_of = self.group_of[positions]
+            for g, group in enumerate(self.groups):
+                members = (group_of == g).nonzero().squeeze(1)
+                if not len(members):
+                    continue
+                junctions = positions[members]
+                rows = self.row_in_group[junctions]
+                if len(rows) == len(group) and torch.equal(rows, self.all_rows[g]):
+                    rows = None  # whole group in member order: no weight gather
+
+                hidden = (self.h[:, junctions], self.c[:, junctions])
+                logits, value, (h_next, c_next) = group.forward(observations[members], hidden, rows)
+                if valid_masks is not None:
+                    logits = logits.masked_fill(~valid_masks[members, :group.action_space_size], -1e8)
+
+                dist = Categorical(probs=F.softmax(logits, dim=-1))
+                action = logits.argmax(dim=-1) if deterministic else dist.sample()
+                actions[members] = action
+                log_probs[members] = dist.log_prob(action)
+                values[members] = value.squeeze(-1)
+
+                self.h.index_copy_(1, junctions, h_next)
+                self.c.index_copy_(1, junctions, c_next)
+
+        return {'actions': actions, 'log_probs': log_probs, 'values': values}
+
+    def decide(self, observations: Dict[str, torch.Tensor], valid_actions: Optional[Dict[str, List[int]]] = None,
+               deterministic: bool = True) -> Dict[str, int]:
+        """One decision per reporting junction, keyed by junction id (for API handlers)"""
+        junction_ids = list(observations)
+        states = torch.stack([torch.as_tensor(observations[junction_id], dtype=torch.float32)
+                              for junction_id in junction_ids])
+        valid_masks = None
+        if valid_actions:
+            valid_masks = action_mask(
+                [valid_actions.get(junction_id) for junction_id in junction_ids], self.num_actions
+            )
+        actions = self.step(states, valid_masks, junction_ids, deterministic)['actions'].tolist()
+        return dict(zip(junction_ids, actions))
+
+    def reset(self, junction_ids: Optional[List[str]] = None):
+        """Zero the LSTM state of the given junctions (default all)"""
+        with self.lock:
+            if junction_ids is None:
+                self.h.zero_()
+                self.c.zero_()
+                return
+            positions = self._positions(junction_ids)
+            self.h[:, positions] = 0.0
+            self.c[:, positions] = 0.0
@@ -1,22 +1,67 @@
+import numpy as np
 import torch
 import torch.nn as nn
 import torch.nn.functional as F
 from torch.distributions import Categorical
+from typing import Dict, List, Optional
 from ..configs.network_config import NetworkConfig
 
+
+def action_mask(valid_actions, num_actions: int, device=None) -> torch.Tensor:
+    """
+    Normalize valid actions to a bool tensor [batch, num_actions] (True = allowed).
+
+    Accepts a bool tensor/array [batch, num_actions] (e.g. from
+    TrafficActionSpace.get_valid_action_masks), used as is, or a sequence
+    with one entry per row: a list of valid action indices, a bool row, or
+    None for "all actions allowed".
+    """
+    if isinstance(valid_actions, torch.Tensor):
+        return valid_actions.to(device=device, dtype=torch.bool)
+    if isinstance(valid_actions, np.ndarray) and valid_actions.dtype == np.bool_:
+        return torch.as_tensor(valid_actions, device=device)
+
+    mask = torch.ones(len(valid_actions), num_actions, dtype=torch.bool)
+    for i, valid_acts in enumerate(valid_actions):
+        if valid_acts is None:
+            continue
+        if isinstance(valid_acts, (torch.Tensor, np.ndarray)) and valid_acts.dtype in (torch.bool, np.bool_):
+            mask[i] = torch.as_tensor(valid_acts)
+        else:
+            mask[i] = False
+            mask[i, list(valid_acts)] = True
+    return mask.to(device)
+
+
 class LSTMPolicyNetwork(nn.Module):
-    """LSTM-based Policy Network cho mỗi agent"""
+    """
+    LSTM-based Policy Network cho mỗi agent.
+
+    With agent_ids the network is parameter-shared by those agents: a
+    learned agent embedding (row i for agent_ids[i]) is concatenated to the
+    normalized input, and forward() takes the embedding rows of the batch
+    as agent_indices.
+    """
     
-    def __init__(self, config: NetworkConfig, action_space_size: int):
+    def __init__(self, config: NetworkConfig, action_space_size: int,
+                 agent_ids: Optional[List[str]] = None, agent_embedding_dim: int = 16):
         super(LSTMPolicyNetwork, self).__init__()
         
         self.config = config
         self.action_space_size = action_space_size
         self.device = config.device
         
+        # Agent embedding (parameter-shared mode only)
+        self.agent_ids = list(agent_ids) if agent_ids is not None else None
+        self.agent_embedding = None
+        embedding_dim = 0
+        if self.agent_ids is not None:
+            self.agent_embedding = nn.Embedding(len(self.agent_ids), agent_embedding_dim)
+            embedding_dim = agent_embedding_dim
+        
         # Input processing layers
         self.input_norm = nn.LayerNorm(config.input_size)
-        self.input_fc = nn.Linear(config.input_size, config.hidden_size)
+        self.input_fc = nn.Linear(config.input_size + embedding_dim, config.hidden_size)
         
         # LSTM layers
         self.lstm = nn.LSTM(
@@ -71,7 +116,7 @@ class LSTMPolicyNetwork(nn.Module):
                 elif 'bias' in name:
                     torch.nn.init.zeros_(param)
     
-    def forward(self, state, hidden_state=None, mask=None):
+    def forward(self, state, hidden_state=None, mask=None, agent_indices=None):
         """Forward pass through network"""
         batch_size = state.size(0)
         seq_len = state.size(1) if len(state.shape) == 3 else 1
@@ -82,6 +127,11 @@ class LSTMPolicyNetwork(nn.Module):
         
         # Input processing
         state = self.input_norm(state)
+        if self.agent_embedding is not None:
+            if agent_indices is None:
+                raise ValueError("A parameter-shared policy needs the agent_indices of the batch")
+            embedding = self.agent_embedding(agent_indices.to(state.device).long())
+            state = torch.cat([state, embedding.unsqueeze(1).expand(-1, state.size(1), -1)], dim=-1)
         processed_input = F.relu(self.input_fc(state))
         
         # LSTM forward pass
@@ -110,9 +160,9 @@ class LSTMPolicyNetwork(nn.Module):
         return logits, value, hidden_state
     
     def get_action_and_value(self, state, hidden_state=None, mask=None, 
-                           valid_actions=None):
+                           valid_actions=None, agent_indices=None):
         """Get action distribution and value estimate"""
-        logits, value, new_hidden_state = self.forward(state, hidden_state, mask)
+        logits, value, new_hidden_state = self.forward(state, hidden_state, mask, agent_indices)
         
         # Apply valid action mask if provided
         if valid_actions is not None:
@@ -137,23 +187,65 @@ class LSTMPolicyNetwork(nn.Module):
         }
     
     def _apply_action_mask(self, logits, valid_actions):
-        """Apply mask for invalid actions"""
-        masked_logits = logits.clone()
+        """Apply mask for invalid actions (see action_mask for accepted forms)"""
+        valid_mask = action_mask(valid_actions, self.action_space_size, logits.device)
         
         # Set invalid actions to large negative value
-        for i, valid_acts in enumerate(valid_actions):
-            invalid_mask = torch.ones(self.action_space_size, dtype=torch.bool)
-            invalid_mask[valid_acts] = False
-            masked_logits[i, invalid_mask] = -1e8
-        
-        return masked_logits
+        return logits.masked_fill(~valid_mask, -1e8)
     
-    def evaluate_actions(self, states, actions, hidden_states=None, masks=None):
+    def evaluate_actions(self, states, actions, hidden_states=None, masks=None,
+                         valid_actions=None, agent_indices=None):
         """Evaluate actions for training"""
-        logits, values, _ = self.forward(states, hidden_states, masks)
+        logits, values, _ = self.forward(states, hidden_states, masks, agent_indices)
+        
+        # Same masking as at action selection, so log-probs match the behaviour policy
+        if valid_actions is not None:
+            logits = self._apply_action_mask(logits, valid_actions)
         
         dist = Categorical(logits=logits)
         log_probs = dist.log_prob(actions)
         entropy = dist.entropy()
         
-        return log_probs, values.squeeze(-1), entropy
\ No newline at end of file
+        return log_probs, values.squeeze(-1), entropy
+
+
+def policy_signature(config: NetworkConfig, action_space_size: int) -> tuple:
+    """Agents with the same signature can share (or batch) one policy architecture"""
+    return (config.input_size, config.hidden_size, config.num_layers, action_space_size)
+
+
+def build_policy_networks(agent_configs: Dict[str, NetworkConfig], action_space_sizes: Dict[str, int],
+                          parameter_sharing: bool = False,
+                          agent_embedding_dim: int = 16) -> Dict[str, LSTMPolicyNetwork]:
+    """
+    One policy network per agent, or with parameter_sharing one network per
+    signature shared by all its agents (the same module object appears
+    under each of their ids).
+    """
+    if not parameter_sharing:
+        return {
+            agent_id: LSTMPolicyNetwork(config, action_space_sizes[agent_id]).to(config.device)
+            for agent_id, config in agent_configs.items()
+        }
+
+    members = {}
+    for agent_id, config in agent_configs.items():
+        members.setdefault(policy_signature(config, action_space_sizes[agent_id]), []).append(agent_id)
+
+    policy_networks = {}
+    for agent_ids in members.values():
+        config = agent_configs[agent_ids[0]]
+        network = LSTMPolicyNetwork(
+            config, action_space_sizes[agent_ids[0]], agent_ids=agent_ids, agent_embedding_dim=agent_embedding_dim
+        ).to(config.device)
+        for agent_id in agent_ids:
+            policy_networks[agent_id] = network
+    return {agent_id: policy_networks[agent_id] for agent_id in agent_configs}
+
+
+def unique_policy_networks(policy_networks: Dict[str, LSTMPolicyNetwork]) -> Dict[str, LSTMPolicyNetwork]:
+    """One entry per distinct network, keyed by the first agent using it"""
+    unique = {}
+    for agent_id, network in policy_networks.items():
+        unique.setdefault(id(network), (agent_id, network))
+    return dict(unique.values())
@@ -18,6 +18,9 @@ SUMO_DIR = os.path.join(BASE_DIR, 'sumo_files')
 NETWORK_DIR = os.path.join(SUMO_DIR, 'network')
 DISTRICT_1_NET = os.path.join(NETWORK_DIR, 'region_1.net.xml')
 
+ROUTES_DIR = os.path.join(SUMO_DIR, 'routes')
+DISTRICT_1_ROUTES = os.path.join(ROUTES_DIR, 'region_1.rou.xml')
+
 GOOGLE_MAP_DIRECTIONS_API_KEY = os.environ.get("GOOGLE_MAP_DIRECTIONS_API_KEY")
 BASE_GOOGLE_MAP_URL = "https://maps.googleapis.com/maps/api/directions/json"
 
@@ -0,0 +1,72 @@
+import torch
+import sumolib
+from collections import deque
+from typing import Dict, List, Set
+
+
+def _agent_nodes(net, agent_ids: List[str]) -> Dict[str, Set[str]]:
+    """Junction ids controlled by each agent (a traffic light may span joined junctions)"""
+    nodes = {}
+    for agent_id in agent_ids:
+        controlled = set()
+        if net.hasNode(agent_id):
+            controlled.add(agent_id)
+        try:
+            tls = net.getTLS(agent_id)
+        except KeyError:
+            tls = None
+        if tls is not None:
+            for in_lane, _, _ in tls.getConnections():
+                controlled.add(in_lane.getEdge().getToNode().getID())
+        nodes[agent_id] = controlled
+    return nodes
+
+
+def build_junction_graph(net_file: str, agent_ids: List[str], max_hops: int = 3) -> torch.Tensor:
+    """
+    Neighbouring agents on the road network, as an edge index [2, num_edges].
+
+    Two agents are neighbours when a path of at most max_hops road edges
+    (in either direction) connects their junctions without crossing another
+    agent's junction. Edges are symmetric and refer to positions in agent_ids.
+    """
+    net = sumolib.net.readNet(net_file)
+    agent_index = {agent_id: i for i, agent_id in enumerate(agent_ids)}
+    owner = {}
+    for agent_id, nodes in _agent_nodes(net, agent_ids).items():
+        for node_id in nodes:
+            owner[node_id] = agent_id
+
+    def adjacent(node):
+        for edge in node.getOutgoing():
+            yield edge.getToNode()
+        for edge in node.getIncoming():
+            yield edge.getFromNode()
+
+    pairs = set()
+    for node_id, agent_id in owner.items():
+        queue = deque([(net.getNode(node_id), 0)])
+        seen = {node_id}
+        while queue:
+            node, hops = queue.popleft()
+            if hops == max_hops:
+                continue
+            for neighbour in adjacent(node):
+                neighbour_id = neighbour.getID()
+                if neighbour_id in seen:
+                    continue
+                seen.add(neighbour_id)
+                neighbour_agent = owner.get(neighbour_id)
+                if neighbour_agent is None:
+                    queue.append((neighbour, hops + 1))
+                elif neighbour_agent != agent_id:
+                    i, j = agent_index[agent_id], agent_index[neighbour_agent]
+                    pairs.add((i, j))
+                    pairs.add((j, i))
+                else:
+                    # Another junction of the same traffic light
+                    queue.append((neighbour, hops))
+
+    if not pairs:
+        return torch.zeros(2, 0, dtype=torch.long)
+    return torch.tensor(sorted(pairs), dtype=torch.long).t().contiguous()
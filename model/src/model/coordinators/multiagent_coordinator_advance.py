@@ -5,15 +5,25 @@ import torch.nn.functional as F
 from torch.distributions import Categorical
 from typing import Dict, List, Tuple, Any, Optional
 from collections import deque, namedtuple
+import os
 import threading
 import time
 from dataclasses import dataclass
 import pickle
 
 from ..configs.network_config import NetworkConfig
-from ..agents.lstm_policy import LSTMPolicyNetwork
+from ..agents.lstm_policy import LSTMPolicyNetwork, action_mask, build_policy_networks, unique_policy_networks
 from ..agents.share_critic_network import SharedCriticNetwork
+from ..agents.batched_policy import build_policy_groups
+from .global_state_aggregator import GlobalStateAggregator
+from .junction_graph import build_junction_graph
+from ..config import DISTRICT_1_NET
 from ..utils.experience_buffer import ExperienceBuffer, Experience
+from ..utils.disk_replay_store import DiskReplayStore
+from ..utils.prioritized_buffer import PrioritizedExperienceBuffer
+from ..utils.trajectory_buffer import TrajectoryBuffer
+from ..utils.checkpoint_compression import load_checkpoint
+from ..utils.sharded_checkpoint import ShardedCheckpoint, is_sharded_checkpoint, save_sharded_checkpoint
 
 class MultiAgentCoordinatorAdvanced:
     """Advanced Multi-Agent Coordinator với centralized training"""
@@ -28,19 +38,48 @@ class MultiAgentCoordinatorAdvanced:
         self.coordination_config = coordination_config
         self.device = list(agent_configs.values())[0].device # take the the device of the first agent config as the default for system
 
-        # Initialize networks
-        self.policy_networks = {}
+        # Initialize networks: one per agent, or (parameter_sharing) one per
+        # phase/lane signature shared by its agents through an agent embedding
+        self.agent_ids = list(agent_configs.keys())
+        self.agent_index = {agent_id: i for i, agent_id in enumerate(self.agent_ids)}
+        self.parameter_sharing = coordination_config.get('parameter_sharing', False)
+        self.agent_embedding_dim = coordination_config.get('agent_embedding_dim', 16)
+        self.policy_networks = build_policy_networks(
+            agent_configs, action_space_sizes, self.parameter_sharing, self.agent_embedding_dim
+        )
         self.optimizers = {}
-        
-        for agent_id, config in agent_configs.items():
-            self.policy_networks[agent_id] = LSTMPolicyNetwork(
-                config, action_space_sizes[agent_id]
-            ).to(self.device)
-            
-            self.optimizers[agent_id] = torch.optim.Adam(
-                self.policy_networks[agent_id].parameters(),
-                lr=config.learning_rate
+        self.policy_optimizer = None
+        
+        if self.parameter_sharing:
+            # A single optimizer over the shared networks
+            self.policy_optimizer = torch.optim.Adam(
+                [param for network in unique_policy_networks(self.policy_networks).values()
+                 for param in network.parameters()],
+                lr=list(agent_configs.values())[0].learning_rate
             )
+        else:
+            for agent_id, config in agent_configs.items():
+                self.optimizers[agent_id] = torch.optim.Adam(
+                    self.policy_networks[agent_id].parameters(),
+                    lr=config.learning_rate
+                )
+        
+        # Training batches are split per network: the owner is the first agent
+        # of an agent's network, the embedding row its row in a shared network
+        owners, embedding_rows = {}, {}
+        for owner_id, network in unique_policy_networks(self.policy_networks).items():
+            for row, agent_id in enumerate(network.agent_ids or [owner_id]):
+                owners[agent_id] = self.agent_index[owner_id]
+                embedding_rows[agent_id] = row
+        self.policy_owners = torch.tensor([owners[agent_id] for agent_id in self.agent_ids])
+        self.embedding_rows = torch.tensor([embedding_rows[agent_id] for agent_id in self.agent_ids])
+        
+        # Agents with the same architecture (or network) share one batched inference pass
+        self.policy_groups = build_policy_groups(self.policy_networks)
+        
+        # Sharded checkpoint loaded lazily: networks (by owner) not read from it yet
+        self.pending_checkpoint = None
+        self.pending_owners = set()
         
         # Shared critic for centralized training
         num_agents = len(agent_configs)
@@ -55,10 +94,31 @@ class MultiAgentCoordinatorAdvanced:
             lr=shared_config.learning_rate
         )
         
-        # Experience buffer
-        self.experience_buffer = ExperienceBuffer(
-            coordination_config.get('buffer_size', 10000)
-        )
+        # Experience buffer: in memory, or on disk when a replay directory is
+        # configured (resumed runs keep sampling the experience already stored there)
+        if coordination_config.get('replay_dir'):
+            self.experience_buffer = DiskReplayStore(
+                coordination_config['replay_dir'],
+                writer=coordination_config.get('replay_writer', 'main'),
+                segment_size=coordination_config.get('replay_segment_size', 1_000_000),
+                num_agents=num_agents
+            )
+        elif coordination_config.get('prioritized_replay', False):
+            self.experience_buffer = PrioritizedExperienceBuffer(
+                coordination_config.get('buffer_size', 10000),
+                num_agents=num_agents,
+                alpha=coordination_config.get('priority_alpha', 0.6),
+                beta=coordination_config.get('priority_beta', 0.4)
+            )
+        else:
+            self.experience_buffer = ExperienceBuffer(
+                coordination_config.get('buffer_size', 10000),
+                num_agents=num_agents
+            )
+        
+        # Decision step counter (one per get_actions call); experiences are
+        # stored with it so the critic can line up all agents at a step
+        self.decision_step = -1
         
         # Hidden states for LSTM
         self.agent_hidden_states = {}
@@ -72,23 +132,87 @@ class MultiAgentCoordinatorAdvanced:
             'coordination_rewards': deque(maxlen=1000)
         }
         
-        # Coordination mechanisms
+        # Coordination mechanisms: dense over all agent pairs, or sparse over
+        # neighbouring junctions of the road network
+        self.neighbour_edges = None
+        if coordination_config.get('coordination_graph', 'dense') == 'sparse':
+            self.neighbour_edges = build_junction_graph(
+                coordination_config.get('net_file', DISTRICT_1_NET),
+                self.agent_ids,
+                max_hops=coordination_config.get('neighbour_hops', 3)
+            ).to(self.device)
         self.coordination_matrix = self._initialize_coordination_matrix()
         self.global_state_aggregator = GlobalStateAggregator(num_agents)
         
     def _initialize_coordination_matrix(self) -> torch.Tensor:
         """Initialize coordination matrix for agent interactions"""
         num_agents = len(self.agent_configs)
+        if self.neighbour_edges is not None:
+            # Only neighbouring junctions interact: one weight per graph edge,
+            # the operator itself is a sparse CSR matrix
+            self.coordination_values = torch.randn(self.neighbour_edges.size(1), device=self.device) * 0.1
+            return self._sparse_coordination_matrix()
+        
         # Initialize with small random values
         matrix = torch.randn(num_agents, num_agents) * 0.1
         # Zero diagonal (agent doesn't coordinate with itself)
         matrix.fill_diagonal_(0)
         return matrix.to(self.device)
     
+    def _sparse_coordination_matrix(self) -> torch.Tensor:
+        num_agents = len(self.agent_configs)
+        return torch.sparse_coo_tensor(
+            self.neighbour_edges, self.coordination_values, (num_agents, num_agents),
+            check_invariants=False
+        ).coalesce().to_sparse_csr()
+    
     def get_actions(self, observations: Dict[str, torch.Tensor], 
                    valid_actions: Optional[Dict[str, List[int]]] = None,
                    training: bool = True) -> Dict[str, Dict[str, Any]]:
         """Get actions from all agents"""
+        self.decision_step += 1
+        self.load_pending_policies(list(observations))
+        
+        if training and not self.parameter_sharing:
+            actions_info = self._get_actions_per_agent(observations, valid_actions)
+        else:
+            actions_info = self._get_actions_batched(observations, valid_actions)
+        
+        # Apply coordination if enabled
+        if self.coordination_config.get('enable_coordination', True):
+            actions_info = self._apply_coordination(actions_info, observations, valid_actions)
+        
+        return actions_info
+    
+    def _get_actions_batched(self, observations: Dict[str, torch.Tensor],
+                             valid_actions: Optional[Dict[str, List[int]]] = None) -> Dict[str, Dict[str, Any]]:
+        """Inference: one forward pass per group of same-architecture agents"""
+        actions_info = {}
+        
+        for group in self.policy_groups:
+            agent_ids = [agent_id for agent_id in group.agent_ids if agent_id in observations]
+            if not agent_ids:
+                continue
+            
+            states = torch.stack([observations[agent_id] for agent_id in agent_ids])
+            
+            valid_mask = None
+            if valid_actions:
+                valid_mask = action_mask(
+                    [valid_actions.get(agent_id) for agent_id in agent_ids], group.action_space_size
+                )
+            
+            group_info = group.get_actions(agent_ids, states, self.agent_hidden_states, valid_mask)
+            for agent_id, action_info in group_info.items():
+                self.agent_hidden_states[agent_id] = action_info['hidden_state']
+            actions_info.update(group_info)
+        
+        # Keep the caller's agent order
+        return {agent_id: actions_info[agent_id] for agent_id in observations if agent_id in actions_info}
+    
+    def _get_actions_per_agent(self, observations: Dict[str, torch.Tensor],
+                               valid_actions: Optional[Dict[str, List[int]]] = None) -> Dict[str, Dict[str, Any]]:
+        """Training: separate forward pass per agent so gradients reach each network"""
         actions_info = {}
         
         # Get individual agent actions
@@ -99,10 +223,12 @@ class MultiAgentCoordinatorAdvanced:
             # Get or initialize hidden state
             hidden_state = self.agent_hidden_states.get(agent_id, None)
             
-            # Get valid actions for this agent
+            # Get valid actions for this agent (one row: batch of one)
             agent_valid_actions = valid_actions.get(agent_id) if valid_actions else None
+            if agent_valid_actions is not None:
+                agent_valid_actions = [agent_valid_actions]
             
-            with torch.no_grad() if not training else torch.enable_grad():
+            with torch.enable_grad():
                 action_info = self.policy_networks[agent_id].get_action_and_value(
                     obs.unsqueeze(0).to(self.device),
                     hidden_state,
@@ -114,49 +240,53 @@ class MultiAgentCoordinatorAdvanced:
             
             actions_info[agent_id] = action_info
         
-        # Apply coordination if enabled
-        if self.coordination_config.get('enable_coordination', True):
-            actions_info = self._apply_coordination(actions_info, observations)
-        
         return actions_info
     
     def _apply_coordination(self, actions_info: Dict[str, Dict[str, Any]], 
-                          observations: Dict[str, torch.Tensor]) -> Dict[str, Dict[str, Any]]:
-        """Apply coordination mechanism to actions"""
+                          observations: Dict[str, torch.Tensor],
+                          valid_actions: Optional[Dict[str, List[int]]] = None) -> Dict[str, Dict[str, Any]]:
+        """Apply coordination mechanism to actions (resampled within each agent's valid actions)"""
         agent_ids = list(actions_info.keys())
         
         if len(agent_ids) < 2:
             return actions_info
         
-        # Get action probabilities
-        action_probs = torch.stack([
-            actions_info[agent_id]['action_probs'] 
+        # Get action probabilities, scattered to matrix rows (absent agents stay zero)
+        rows = torch.tensor([self.agent_index[agent_id] for agent_id in agent_ids], device=self.device)
+        agent_probs = torch.cat([
+            actions_info[agent_id]['action_probs'].detach().reshape(1, -1)
             for agent_id in agent_ids
-        ])  # [num_agents, num_actions]
+        ])  # [present agents, num_actions]
+        action_probs = agent_probs.new_zeros(len(self.agent_ids), agent_probs.size(1))
+        action_probs[rows] = agent_probs
         
-        # Apply coordination matrix
-        coordinated_probs = torch.matmul(
-            self.coordination_matrix[:len(agent_ids), :len(agent_ids)], 
-            action_probs
-        )
+        # Apply coordination matrix (sparse-dense matmul in neighbour mode)
+        coordinated_probs = (self.coordination_matrix @ action_probs)[rows]
         
-        # Normalize probabilities
+        # Normalize probabilities over the valid actions only
+        if valid_actions:
+            valid_mask = action_mask(
+                [valid_actions.get(agent_id) for agent_id in agent_ids], agent_probs.size(1), self.device
+            )
+            coordinated_probs = coordinated_probs.masked_fill(~valid_mask, float('-inf'))
         coordinated_probs = F.softmax(coordinated_probs, dim=-1)
         
-        # Update actions based on coordinated probabilities
+        # Update actions based on coordinated probabilities, sampled for all agents at once
+        new_dist = Categorical(coordinated_probs)
+        new_actions = new_dist.sample()
+        new_log_probs = new_dist.log_prob(new_actions)
+        
         for i, agent_id in enumerate(agent_ids):
-            new_dist = Categorical(coordinated_probs[i])
-            new_action = new_dist.sample()
-            
-            actions_info[agent_id]['action'] = new_action
-            actions_info[agent_id]['log_prob'] = new_dist.log_prob(new_action)
+            actions_info[agent_id]['action'] = new_actions[i:i + 1]
+            actions_info[agent_id]['log_prob'] = new_log_probs[i:i + 1]
             actions_info[agent_id]['coordinated'] = True
         
         return actions_info
     
-    def store_experience(self, agent_id: str, experience: Experience):
-        """Store experience in buffer"""
-        self.experience_buffer.push(experience)
+    def store_experience(self, agent_id: str, experience: Experience, step: Optional[int] = None):
+        """Store experience in buffer (step defaults to the last get_actions call)"""
+        step = self.decision_step if step is None else step
+        self.experience_buffer.push(experience, self.agent_index[agent_id], step)
     
     def train_step(self, batch_size: int = 32) -> Dict[str, float]:
         """Perform one training step"""
@@ -164,19 +294,22 @@ class MultiAgentCoordinatorAdvanced:
             return {}
         
         # Sample experiences
-        experiences = self.experience_buffer.sample(batch_size)
+        batch = self.experience_buffer.sample(batch_size)
         
         # Prepare batch data
-        batch_data = self._prepare_batch_data(experiences)
+        batch_data = self._prepare_batch_data(batch)
         
         # Train policy networks
         policy_losses = self._train_policies(batch_data)
         
+        # All agents' transitions at the sampled steps, for the critic and coordination
+        global_states, joint_rewards = self._joint_batch(batch)
+        
         # Train shared critic
-        value_loss = self._train_shared_critic(batch_data)
+        value_loss = self._train_shared_critic(global_states, joint_rewards)
         
         # Update coordination matrix
-        self._update_coordination_matrix(batch_data)
+        self._update_coordination_matrix(joint_rewards)
         
         # Compile training statistics
         training_info = {
@@ -191,67 +324,75 @@ class MultiAgentCoordinatorAdvanced:
         
         return training_info
     
-    def _prepare_batch_data(self, experiences: List[Experience]) -> Dict[str, torch.Tensor]:
-        """Prepare batch data for training"""
-        # Group experiences by agent
-        agent_experiences = {}
-        
-        for exp in experiences:
-            # Assuming experience contains agent_id info
-            # This would need to be added to Experience namedtuple
-            agent_id = getattr(exp, 'agent_id', 'default_agent')
-            
-            if agent_id not in agent_experiences:
-                agent_experiences[agent_id] = []
-            agent_experiences[agent_id].append(exp)
+    def _prepare_batch_data(self, batch: Dict[str, torch.Tensor]) -> Dict[str, Dict[str, torch.Tensor]]:
+        """
+        Split a sampled batch by policy network (one sort, then views per
+        network): per agent, or per shared network keyed by its first agent
+        """
+        agent_indices = batch['agent_indices'].long()
+        owners = self.policy_owners[agent_indices]
+        order = torch.argsort(owners, stable=True)
+        owner_indices, counts = torch.unique_consecutive(owners[order], return_counts=True)
+        
+        columns = ['states', 'actions', 'rewards', 'values', 'log_probs', 'indices']
+        columns += [name for name in ('valid_masks', 'weights', 'advantages', 'returns') if name in batch]
+        sorted_batch = {name: batch[name][order].to(self.device) for name in columns}
+        if self.parameter_sharing:
+            sorted_batch['embedding_rows'] = self.embedding_rows[agent_indices][order].to(self.device)
         
-        # Convert to tensors
         batch_data = {}
-        for agent_id, agent_exps in agent_experiences.items():
-            states = torch.stack([torch.tensor(exp.state) for exp in agent_exps])
-            actions = torch.stack([torch.tensor(exp.action) for exp in agent_exps])
-            rewards = torch.stack([torch.tensor(exp.reward) for exp in agent_exps])
-            values = torch.stack([torch.tensor(exp.value) for exp in agent_exps])
-            log_probs = torch.stack([torch.tensor(exp.log_prob) for exp in agent_exps])
-            
-            batch_data[agent_id] = {
-                'states': states.to(self.device),
-                'actions': actions.to(self.device),
-                'rewards': rewards.to(self.device),
-                'values': values.to(self.device),
-                'log_probs': log_probs.to(self.device)
+        start = 0
+        for owner_index, count in zip(owner_indices.tolist(), counts.tolist()):
+            batch_data[self.agent_ids[owner_index]] = {
+                name: values[start:start + count] for name, values in sorted_batch.items()
             }
+            start += count
         
         return batch_data
     
     def _train_policies(self, batch_data: Dict[str, Dict[str, torch.Tensor]]) -> Dict[str, float]:
-        """Train individual policy networks"""
+        """Train policy networks (shared networks: one step of the single optimizer)"""
+        self.load_pending_policies()
         policy_losses = {}
+        shared_loss = 0.0
         
         for agent_id, data in batch_data.items():
             if agent_id not in self.policy_networks:
                 continue
             
             network = self.policy_networks[agent_id]
-            optimizer = self.optimizers[agent_id]
             
-            # Calculate advantages (simplified)
-            advantages = data['rewards'] - data['values']
-            advantages = (advantages - advantages.mean()) / (advantages.std() + 1e-8)
+            # Advantages: GAE from a trajectory segment, else the one-step
+            # approximation available for replayed transitions
+            if 'advantages' in data:
+                advantages = data['advantages']
+                value_targets = data['returns']
+            else:
+                advantages = data['rewards'] - data['values']
+                value_targets = data['rewards']
+            if advantages.numel() > 1:
+                advantages = (advantages - advantages.mean()) / (advantages.std() + 1e-8)
+            
+            # Importance-sampling weights correct the bias of prioritized sampling
+            weights = data.get('weights')
+            if weights is None:
+                weights = torch.ones_like(advantages)
             
             # Policy loss (PPO-style)
             log_probs, values, entropy = network.evaluate_actions(
-                data['states'], data['actions']
+                data['states'], data['actions'], valid_actions=data.get('valid_masks'),
+                agent_indices=data.get('embedding_rows')
             )
             
             ratio = torch.exp(log_probs - data['log_probs'])
-            policy_loss = -torch.min(
+            policy_loss = -(weights * torch.min(
                 ratio * advantages,
                 torch.clamp(ratio, 0.8, 1.2) * advantages
-            ).mean()
+            )).mean()
             
             # Value loss
-            value_loss = F.mse_loss(values, data['rewards'])
+            value_errors = values - value_targets
+            value_loss = (weights * value_errors.pow(2)).mean()
             
             # Entropy loss
             entropy_loss = -entropy.mean() * 0.01
@@ -260,45 +401,57 @@ class MultiAgentCoordinatorAdvanced:
             total_loss = policy_loss + 0.5 * value_loss + entropy_loss
             
             # Optimize
-            optimizer.zero_grad()
-            total_loss.backward()
-            torch.nn.utils.clip_grad_norm_(network.parameters(), 0.5)
-            optimizer.step()
+            if self.parameter_sharing:
+                shared_loss = shared_loss + total_loss
+            else:
+                optimizer = self.optimizers[agent_id]
+                optimizer.zero_grad()
+                total_loss.backward()
+                torch.nn.utils.clip_grad_norm_(network.parameters(), 0.5)
+                optimizer.step()
             
             policy_losses[agent_id] = total_loss.item()
+            
+            # New priorities: value error of the sampled transitions
+            if 'weights' in data and hasattr(self.experience_buffer, 'update_priorities'):
+                self.experience_buffer.update_priorities(
+                    data['indices'].cpu().numpy(), value_errors.detach().cpu().numpy()
+                )
         
+        if self.parameter_sharing and policy_losses:
+            parameters = [param for group in self.policy_optimizer.param_groups for param in group['params']]
+            self.policy_optimizer.zero_grad()
+            shared_loss.backward()
+            torch.nn.utils.clip_grad_norm_(parameters, 0.5)
+            self.policy_optimizer.step()
+        
+        self._sync_policy_groups()
         return policy_losses
     
-    def _train_shared_critic(self, batch_data: Dict[str, Dict[str, torch.Tensor]]) -> float:
-        """Train shared critic network"""
-        if not batch_data:
+    def _sync_policy_groups(self):
+        """Refresh the stacked inference weights after the networks changed"""
+        for group in self.policy_groups:
+            group.sync()
+    
+    def _joint_batch(self, batch: Dict[str, torch.Tensor]) -> Tuple[torch.Tensor, torch.Tensor]:
+        """Global states [steps, agents * state] and rewards [steps, agents] at the sampled steps"""
+        if 'steps' not in batch or not len(batch['steps']):
+            return torch.zeros(0), torch.zeros(0, len(self.agent_ids))
+        
+        # Index-aligned gather of every agent's row at each sampled step
+        joint = self.experience_buffer.gather_global(batch['steps'])
+        global_states, joint_rewards = joint['states'], joint['rewards']
+        return global_states.to(self.device), joint_rewards.to(self.device)
+    
+    def _train_shared_critic(self, global_states: torch.Tensor, target_values: torch.Tensor) -> float:
+        """Train shared critic on the joint state of all agents at the sampled steps"""
+        if not len(global_states):
             return 0.0
         
-        # Aggregate global states
-        global_states = []
-        target_values = []
-        
-        agent_ids = list(batch_data.keys())
-        min_batch_size = min(len(data['states']) for data in batch_data.values())
-        
-        for i in range(min_batch_size):
-            # Concatenate states from all agents
-            global_state = torch.cat([
-                batch_data[agent_id]['states'][i] 
-                for agent_id in agent_ids
-            ])
-            global_states.append(global_state)
-            
-            # Target value (mean of all agent rewards)
-            target_value = torch.stack([
-                batch_data[agent_id]['rewards'][i] 
-                for agent_id in agent_ids
-            ])
-            target_values.append(target_value)
-        
-        global_states = torch.stack(global_states)
-        target_values = torch.stack(target_values)
-        
+        return self._fit_shared_critic(global_states, target_values)
+    
+    def _fit_shared_critic(self, global_states: torch.Tensor, target_values: torch.Tensor) -> float:
+        """One critic update: global_states [batch, agents * state], targets [batch, agents]"""
         # Forward pass
         predicted_values, _ = self.shared_critic(global_states)
         
@@ -313,62 +466,178 @@ class MultiAgentCoordinatorAdvanced:
         
         return value_loss.item()
     
-    def _update_coordination_matrix(self, batch_data: Dict[str, Dict[str, torch.Tensor]]):
+    def train_on_trajectory(self, trajectory: TrajectoryBuffer, last_values,
+                            epochs: int = 4) -> Dict[str, float]:
+        """PPO update on a complete rollout segment with GAE advantages and returns"""
+        trajectory.compute_returns_and_advantages(last_values)
+        batch_data = self._prepare_batch_data(trajectory.batch())
+        global_batch = trajectory.global_batch()
+        global_states = global_batch['global_states'].to(self.device)
+        returns = global_batch['returns'].to(self.device)
+        
+        policy_losses, value_losses = [], []
+        for _ in range(epochs):
+            policy_losses.append(np.mean(list(self._train_policies(batch_data).values())))
+            value_losses.append(self._fit_shared_critic(global_states, returns))
+        
+        training_info = {
+            'policy_loss': float(np.mean(policy_losses)),
+            'value_loss': float(np.mean(value_losses)),
+            'steps': trajectory.step
+        }
+        self.training_stats['policy_losses'].append(training_info['policy_loss'])
+        self.training_stats['value_losses'].append(training_info['value_loss'])
+        
+        trajectory.reset()
+        return training_info
+    
+    def _update_coordination_matrix(self, joint_rewards: torch.Tensor, learning_rate: float = 0.01):
         """Update coordination matrix based on performance"""
-        if len(batch_data) < 2:
+        if joint_rewards.size(0) < 2 or joint_rewards.size(1) < 2:
             return
         
-        # Simple update rule: increase coordination weights for agents with similar rewards
-        agent_ids = list(batch_data.keys())
-        
-        for i, agent_i in enumerate(agent_ids):
-            for j, agent_j in enumerate(agent_ids):
-                if i != j:
-                    reward_similarity = torch.cosine_similarity(
-                        batch_data[agent_i]['rewards'].unsqueeze(0),
-                        batch_data[agent_j]['rewards'].unsqueeze(0)
-                    )
-                    
-                    # Update coordination matrix
-                    learning_rate = 0.01
-                    self.coordination_matrix[i, j] += learning_rate * reward_similarity
+        # Simple update rule: increase coordination weights for agents with similar rewards.
+        # Cosine similarity of every pair at once: rows of unit-norm reward vectors
+        rewards = F.normalize(joint_rewards.t(), dim=1, eps=1e-8)  # [agents, steps]
+        
+        if self.neighbour_edges is None:
+            reward_similarity = rewards @ rewards.t()
+            reward_similarity.fill_diagonal_(0)
+            self.coordination_matrix += learning_rate * reward_similarity
+        else:
+            # Only neighbouring pairs: O(edges * steps)
+            src, dst = self.neighbour_edges
+            reward_similarity = (rewards[src] * rewards[dst]).sum(dim=1)
+            self.coordination_values = torch.clamp(
+                self.coordination_values + learning_rate * reward_similarity, -1.0, 1.0
+            )
+            self.coordination_matrix = self._sparse_coordination_matrix()
+            return
         
         # Keep matrix values in reasonable range
         self.coordination_matrix = torch.clamp(self.coordination_matrix, -1.0, 1.0)
     
-    def reset_hidden_states(self):
-        """Reset LSTM hidden states"""
+    def reset_hidden_states(self, agent_ids: Optional[List[str]] = None):
+        """Reset LSTM hidden states (of the given agents only, e.g. after a detector fault)"""
+        if agent_ids is not None:
+            for agent_id in agent_ids:
+                self.agent_hidden_states.pop(agent_id, None)
+            return
         self.agent_hidden_states.clear()
         self.critic_hidden_state = None
     
-    def save_models(self, filepath: str):
-        """Save all models"""
+    def save_models(self, filepath: str, sharded: bool = False):
+        """
+        Save all models, to one file or (sharded, or filepath is a
+        directory) to a sharded checkpoint directory; saving into an existing
+        one only rewrites the networks that changed.
+        """
+        self.load_pending_policies()
+        # Experience on disk is part of the resumable state
+        if isinstance(self.experience_buffer, DiskReplayStore):
+            self.experience_buffer.flush()
+        if sharded or os.path.isdir(filepath):
+            networks = unique_policy_networks(self.policy_networks)
+            return save_sharded_checkpoint(
+                filepath,
+                {agent_id: network.state_dict() for agent_id, network in networks.items()},
+                self.shared_critic.state_dict(),
+                {
+                    'coordination_matrix': self.coordination_matrix,
+                    'training_stats': {key: [float(v) for v in values] for key, values in self.training_stats.items()}
+                },
+                {agent_id: network.agent_ids for agent_id, network in networks.items() if network.agent_ids is not None}
+            )
+        
         checkpoint = {
+            # Shared networks are stored once, under their first agent
             'policy_networks': {
                 agent_id: network.state_dict() 
-                for agent_id, network in self.policy_networks.items()
+                for agent_id, network in unique_policy_networks(self.policy_networks).items()
+            },
+            # Agents (embedding rows) of each shared network
+            'policy_agent_ids': {
+                agent_id: network.agent_ids
+                for agent_id, network in unique_policy_networks(self.policy_networks).items()
+                if network.agent_ids is not None
             },
             'shared_critic': self.shared_critic.state_dict(),
             'coordination_matrix': self.coordination_matrix,
-            'training_stats': dict(self.training_stats)
+            # Plain lists so the checkpoint loads with torch.load(weights_only=True)
+            'training_stats': {key: [float(v) for v in values] for key, values in self.training_stats.items()}
         }
         torch.save(checkpoint, filepath)
     
     def load_models(self, filepath: str):
-        """Load all models"""
-        checkpoint = torch.load(filepath, map_location=self.device)
+        """
+        Load all models (compressed checkpoints are restored to float32).
+        From a sharded checkpoint directory only the critic and common state
+        are read here; each policy network is loaded on first use.
+        """
+        if is_sharded_checkpoint(filepath):
+            self.pending_checkpoint = ShardedCheckpoint(filepath, map_location=self.device)
+            self.pending_owners = set(self.pending_checkpoint.owners) & set(self.policy_networks)
+            checkpoint = self.pending_checkpoint.common()
+            self.shared_critic.load_state_dict(self.pending_checkpoint.critic_state_dict())
+            self._load_coordination_matrix(checkpoint['coordination_matrix'])
+            for key, values in checkpoint['training_stats'].items():
+                self.training_stats[key] = deque(values, maxlen=1000)
+            return
+        
+        self.pending_checkpoint = None
+        self.pending_owners = set()
+        checkpoint = load_checkpoint(filepath, map_location=self.device)
         
         for agent_id, state_dict in checkpoint['policy_networks'].items():
             if agent_id in self.policy_networks:
                 self.policy_networks[agent_id].load_state_dict(state_dict)
+        self._sync_policy_groups()
         
         self.shared_critic.load_state_dict(checkpoint['shared_critic'])
-        self.coordination_matrix = checkpoint['coordination_matrix']
+        self._load_coordination_matrix(checkpoint['coordination_matrix'])
         
         if 'training_stats' in checkpoint:
             for key, values in checkpoint['training_stats'].items():
                 self.training_stats[key] = deque(values, maxlen=1000)
     
+    def load_pending_policies(self, agent_ids: Optional[List[str]] = None):
+        """Load the networks of the given agents (default: all) still pending from a sharded checkpoint"""
+        if not self.pending_owners:
+            return
+        owners = self.pending_owners
+        if agent_ids is not None:
+            owners = owners & {
+                self.agent_ids[self.policy_owners[self.agent_index[agent_id]]]
+                for agent_id in agent_ids if agent_id in self.agent_index
+            }
+        if not owners:
+            return
+        
+        for owner_id in owners:
+            self.policy_networks[owner_id].load_state_dict(self.pending_checkpoint.policy_state_dict(owner_id))
+        self.pending_owners = self.pending_owners - owners
+        for group in self.policy_groups:
+            if any(agent_id in owners for agent_id in group.agent_ids):
+                group.sync()
+        if not self.pending_owners:
+            self.pending_checkpoint = None
+    
+    def _load_coordination_matrix(self, matrix: torch.Tensor):
+        """Restore a saved matrix; a sparse one brings its neighbour graph with it"""
+        if matrix.layout == torch.strided:
+            self.neighbour_edges = None
+            self.coordination_matrix = matrix.to(self.device)
+            return
+        matrix = matrix.to_sparse_coo().coalesce()
+        self.neighbour_edges = matrix.indices().to(self.device)
+        self.coordination_values = matrix.values().to(self.device)
+        self.coordination_matrix = self._sparse_coordination_matrix()
+    
+    def close(self):
+        """Flush and close an on-disk replay store; call when training ends"""
+        if isinstance(self.experience_buffer, DiskReplayStore):
+            self.experience_buffer.close()
+    
     def get_training_stats(self) -> Dict[str, float]:
         """Get training statistics"""
         stats = {}
@@ -0,0 +1,81 @@
+import time
+import numpy as np
+import torch
+from typing import Callable, Dict, Optional
+
+from ..agents.inference_session import InferenceSession
+from ..utils.checkpoint_compression import load_checkpoint
+from .export import checkpoint_networks
+from .runtime import load_policy_runtime
+
+
+def _time_ticks(run_tick: Callable[[torch.Tensor], torch.Tensor], inputs: torch.Tensor, warmup: int) -> dict:
+    for t in range(warmup):
+        run_tick(inputs[t % len(inputs)])
+    latencies = []
+    values = []
+    for observations in inputs:
+        start = time.perf_counter()
+        values.append(run_tick(observations))
+        latencies.append((time.perf_counter() - start) * 1000.0)
+    latencies = np.array(latencies)
+    return {
+        'mean_ms': float(latencies.mean()),
+        'p50_ms': float(np.percentile(latencies, 50)),
+        'p99_ms': float(np.percentile(latencies, 99)),
+        'values': torch.stack(values)
+    }
+
+
+def benchmark_policies(checkpoint_path: str, export_dir: str, ticks: int = 200, warmup: int = 20,
+                       num_threads: Optional[int] = None, seed: int = 0) -> Dict[str, dict]:
+    """
+    Per-tick latency of one decision for every junction:
+    - eager: one LSTMPolicyNetwork call per junction (the training model),
+    - eager_batched: InferenceSession over the same networks,
+    - exported: the graphs in export_dir through load_policy_runtime.
+    All runs see the same observations with carried hidden state; the
+    exported run also reports its largest value deviation from eager.
+    """
+    if num_threads:
+        torch.set_num_threads(num_threads)
+    networks = checkpoint_networks(load_checkpoint(checkpoint_path))
+    junction_ids = list(networks)
+    input_size = next(iter(networks.values())).config.input_size
+
+    generator = torch.Generator().manual_seed(seed)
+    inputs = torch.rand(ticks, len(junction_ids), input_size, generator=generator)
+
+    hidden = {}
+
+    @torch.no_grad()
+    def eager_tick(observations):
+        values = []
+        for i, junction_id in enumerate(junction_ids):
+            network = networks[junction_id]
+            agent_indices = None
+            if network.agent_ids is not None:
+                agent_indices = torch.tensor([network.agent_ids.index(junction_id)])
+            _, value, hidden[junction_id] = network(observations[i:i + 1], hidden.get(junction_id),
+                                                    agent_indices=agent_indices)
+            values.append(value.reshape(()))
+        return torch.stack(values)
+
+    results = {'eager': _time_ticks(eager_tick, inputs, warmup)}
+    hidden.clear()
+
+    for name, session in (('eager_batched', InferenceSession(networks, junction_ids)),
+                          ('exported', load_policy_runtime(export_dir, junction_ids, num_threads))):
+        session.reset()
+        results[name] = _time_ticks(lambda observations: session.step(observations)['values'], inputs, warmup)
+
+    # Warmup advanced every run the same way, so the value traces are comparable
+    reference = results['eager']['values']
+    for result in results.values():
+        result['max_value_error'] = float((result.pop('values') - reference).abs().max())
+
+    print(f"{'runtime':<16}{'mean ms':>10}{'p50 ms':>10}{'p99 ms':>10}{'max |dv|':>12}")
+    for name, result in results.items():
+        print(f"{name:<16}{result['mean_ms']:>10.3f}{result['p50_ms']:>10.3f}{result['p99_ms']:>10.3f}"
+              f"{result['max_value_error']:>12.2e}")
+    return results
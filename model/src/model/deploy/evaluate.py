@@ -0,0 +1,121 @@
+import os
+import time
+import tempfile
+import numpy as np
+import torch
+from typing import Callable, Optional
+
+from ..agents.inference_session import InferenceSession
+from ..utils.checkpoint_compression import load_checkpoint, sparsity, state_dict_nbytes
+from ..utils.sharded_checkpoint import checkpoint_nbytes
+from .export import checkpoint_networks, export_policies
+from .runtime import load_policy_runtime
+
+
+def _run_episodes(env, session: InferenceSession, episodes: int, shadow: Optional[InferenceSession] = None):
+    """
+    Total reward per episode of `session` acting greedily; a shadow session
+    sees the same observations and its decisions are compared, not applied.
+    """
+    returns, agreements = [], []
+    for _ in range(episodes):
+        session.reset()
+        if shadow is not None:
+            shadow.reset()
+        observations, valid_masks = env.reset()
+        total, done = 0.0, False
+        while not done:
+            actions = session.step(observations, valid_masks, deterministic=True)['actions']
+            if shadow is not None:
+                shadow_actions = shadow.step(observations, valid_masks, deterministic=True)['actions']
+                agreements.append(float((actions == shadow_actions).float().mean()))
+            observations, rewards, done, valid_masks = env.step(actions.cpu().numpy())
+            total += float(np.sum(rewards))
+        returns.append(total)
+    return returns, agreements
+
+
+def evaluate_compression(original_path: str, compressed_path: str, ticks: int = 200,
+                         env_factory: Optional[Callable] = None, env_kwargs: Optional[dict] = None,
+                         episodes: int = 0, seed: int = 0) -> dict:
+    """
+    Compare a compressed checkpoint with its original.
+
+    The original runs as float networks in an InferenceSession; the
+    compressed one as it would be deployed, exported with deploy.export
+    (int8 quantized when it was compressed with quantize). Reports:
+    - memory: checkpoint files, policy weight storage and sparsity,
+    - action agreement and latency per decision tick on the same
+      observations (uniform in the normalized state range),
+    - with env_factory and episodes: greedy episode rewards of both models
+      and the agreement on the original model's own trajectories.
+    """
+    original = load_checkpoint(original_path)
+    compressed_raw = torch.load(compressed_path, map_location='cpu')
+    options = compressed_raw.get('compression', {})
+    networks = checkpoint_networks(original)
+    junction_ids = list(networks)
+    input_size = next(iter(networks.values())).config.input_size
+
+    compressed_policies = load_checkpoint(compressed_path)['policy_networks'].values()
+    # Networks without matrix weights have no sparsity
+    sparsities = [value for value in (sparsity(sd) for sd in compressed_policies) if value is not None]
+    report = {
+        'compression': options,
+        'memory': {
+            'original_file_bytes': checkpoint_nbytes(original_path),
+            'compressed_file_bytes': os.path.getsize(compressed_path),
+            'original_policy_bytes': sum(state_dict_nbytes(sd) for sd in original['policy_networks'].values()),
+            'compressed_policy_bytes': sum(state_dict_nbytes(sd) for sd in compressed_raw['policy_networks'].values()),
+            'sparsity': float(np.mean(sparsities)) if sparsities else None
+        }
+    }
+
+    with tempfile.TemporaryDirectory() as export_dir:
+        export_policies(compressed_path, export_dir, quantize=options.get('quantize', False))
+        report['memory']['compressed_runtime_bytes'] = sum(
+            os.path.getsize(os.path.join(export_dir, name)) for name in os.listdir(export_dir)
+        )
+        original_session = InferenceSession(networks, junction_ids)
+        compressed_session = load_policy_runtime(export_dir, junction_ids)
+
+    generator = torch.Generator().manual_seed(seed)
+    inputs = torch.rand(ticks, len(junction_ids), input_size, generator=generator)
+    latencies = {'original': [], 'compressed': []}
+    agreement = []
+    for observations in inputs:
+        start = time.perf_counter()
+        original_actions = original_session.step(observations, deterministic=True)['actions']
+        latencies['original'].append((time.perf_counter() - start) * 1000.0)
+        start = time.perf_counter()
+        compressed_actions = compressed_session.step(observations, deterministic=True)['actions']
+        latencies['compressed'].append((time.perf_counter() - start) * 1000.0)
+        agreement.append(float((original_actions == compressed_actions).float().mean()))
+
+    report['action_agreement'] = float(np.mean(agreement))
+    report['latency_ms'] = {name: float(np.mean(values)) for name, values in latencies.items()}
+
+    if env_factory is not None and episodes > 0:
+        env = env_factory(agent_ids=junction_ids, **(env_kwargs or {}))
+        try:
+            original_returns, on_policy_agreement = _run_episodes(env, original_session, episodes, compressed_session)
+            compressed_returns, _ = _run_episodes(env, compressed_session, episodes)
+        finally:
+            env.close()
+        report['reward'] = {
+            'original': float(np.mean(original_returns)),
+            'compressed': float(np.mean(compressed_returns)),
+            'delta': float(np.mean(compressed_returns) - np.mean(original_returns))
+        }
+        report['on_policy_action_agreement'] = float(np.mean(on_policy_agreement))
+
+    memory = report['memory']
+    sparsity_note = f" (sparsity {memory['sparsity']:.1%})" if memory['sparsity'] is not None else ""
+    print(f"[INFO] Policy weights: {memory['original_policy_bytes'] / 1e6:.2f} MB -> "
+          f"{memory['compressed_policy_bytes'] / 1e6:.2f} MB{sparsity_note}")
+    print(f"[INFO] Action agreement: {report['action_agreement']:.1%}, latency "
+          f"{report['latency_ms']['original']:.3f} ms -> {report['latency_ms']['compressed']:.3f} ms per tick")
+    if 'reward' in report:
+        print(f"[INFO] Episode reward: {report['reward']['original']:.3f} -> {report['reward']['compressed']:.3f} "
+              f"(delta {report['reward']['delta']:+.3f})")
+    return report
@@ -0,0 +1,215 @@
+import os
+import json
+import copy
+import torch
+import torch.nn as nn
+import torch.nn.functional as F
+from typing import Dict, List, Optional
+
+from ..configs.network_config import NetworkConfig
+from ..agents.lstm_policy import LSTMPolicyNetwork, policy_signature
+from ..agents.batched_policy import BatchedPolicyGroup
+from ..utils.checkpoint_compression import load_checkpoint
+
+MANIFEST_FILE = 'manifest.json'
+FORMATS = ('torchscript', 'onnx')
+
+
+def network_from_state_dict(state_dict: Dict[str, torch.Tensor],
+                            agent_ids: Optional[List[str]] = None) -> LSTMPolicyNetwork:
+    """Rebuild an LSTMPolicyNetwork from a save_models state_dict (sizes read from the weights)"""
+    num_layers = len([name for name in state_dict if name.startswith('lstm.weight_ih_l')])
+    config = NetworkConfig(
+        input_size=state_dict['input_norm.weight'].shape[0],
+        hidden_size=state_dict['lstm.weight_hh_l0'].shape[1],
+        num_layers=num_layers,
+        dropout=0.0,
+        device='cpu'
+    )
+    head_weights = sorted(name for name in state_dict if name.startswith('policy_head.') and name.endswith('.weight'))
+    action_space_size = state_dict[head_weights[-1]].shape[0]
+    embedding_dim = state_dict['agent_embedding.weight'].shape[1] if agent_ids is not None else 16
+
+    network = LSTMPolicyNetwork(config, action_space_size, agent_ids=agent_ids, agent_embedding_dim=embedding_dim)
+    network.load_state_dict(state_dict)
+    return network.eval()
+
+
+class PolicyStep(nn.Module):
+    """
+    Inference-only single step of an LSTMPolicyNetwork.
+
+    Dropout layers are dropped and the attention block is left out (it only
+    runs on sequences); hidden state goes in and out as explicit tensors so
+    the module traces and exports as a static graph.
+    """
+
+    def __init__(self, network: LSTMPolicyNetwork):
+        super().__init__()
+        config = network.config
+        self.input_norm = copy.deepcopy(network.input_norm)
+        self.input_fc = copy.deepcopy(network.input_fc)
+        self.agent_embedding = copy.deepcopy(network.agent_embedding)
+        self.lstm = nn.LSTM(config.hidden_size, config.hidden_size, config.num_layers, batch_first=True)
+        self.lstm.load_state_dict(network.lstm.state_dict())
+        self.policy_head = nn.Sequential(*[
+            copy.deepcopy(layer) for layer in network.policy_head if not isinstance(layer, nn.Dropout)
+        ])
+        self.value_head = nn.Sequential(*[
+            copy.deepcopy(layer) for layer in network.value_head if not isinstance(layer, nn.Dropout)
+        ])
+
+    def forward(self, state, h, c, agent_indices):
+        x = self.input_norm(state)
+        if self.agent_embedding is not None:
+            x = torch.cat([x, self.agent_embedding(agent_indices)], dim=-1)
+        x = F.relu(self.input_fc(x)).unsqueeze(1)
+        out, (h, c) = self.lstm(x, (h, c))
+        out = out.squeeze(1)
+        return self.policy_head(out), self.value_head(out), h, c
+
+
+class PolicyGroupStep(nn.Module):
+    """
+    One decision step for a policy group: states [G, input], h/c [layers, G,
+    hidden] -> logits [G, actions], values [G, 1], h, c. A parameter-shared
+    network runs the whole group as one batch; separate networks run one
+    row each (unrolled when traced).
+    """
+
+    def __init__(self, networks: List[LSTMPolicyNetwork], num_agents: int):
+        super().__init__()
+        self.shared = networks[0].agent_embedding is not None
+        self.steps = nn.ModuleList([PolicyStep(network) for network in networks])
+        self.register_buffer('rows', torch.arange(num_agents))
+
+    def forward(self, states, h, c):
+        if self.shared:
+            return self.steps[0](states, h, c, self.rows)
+
+        outputs = [
+            step(states[i:i + 1], h[:, i:i + 1], c[:, i:i + 1], self.rows[i:i + 1])
+            for i, step in enumerate(self.steps)
+        ]
+        return (torch.cat([out[0] for out in outputs]), torch.cat([out[1] for out in outputs]),
+                torch.cat([out[2] for out in outputs], dim=1), torch.cat([out[3] for out in outputs], dim=1))
+
+
+class StackedGroupStep(nn.Module):
+    """
+    One decision step for separate networks of the same architecture with
+    their weights stacked (BatchedPolicyGroup's batched matmuls); traced,
+    the stacked weights become constants of the graph. Faster than
+    PolicyGroupStep for float weights, but has no layers to quantize.
+    """
+
+    def __init__(self, group: BatchedPolicyGroup):
+        super().__init__()
+        self.group = group
+
+    def forward(self, states, h, c):
+        logits, value, (h, c) = self.group.forward(states, (h, c))
+        return logits, value, h, c
+
+
+def checkpoint_groups(checkpoint: dict) -> List[tuple]:
+    """(agent_ids, networks) per policy group of a save_models checkpoint"""
+    shared_agents = checkpoint.get('policy_agent_ids', {})
+    groups, members = [], {}
+    for agent_id, state_dict in checkpoint['policy_networks'].items():
+        network = network_from_state_dict(state_dict, shared_agents.get(agent_id))
+        if network.agent_ids is not None:
+            groups.append((network.agent_ids, [network]))
+            continue
+        signature = policy_signature(network.config, network.action_space_size)
+        members.setdefault(signature, ([], []))
+        members[signature][0].append(agent_id)
+        members[signature][1].append(network)
+    return groups + list(members.values())
+
+
+def checkpoint_networks(checkpoint: dict) -> Dict[str, LSTMPolicyNetwork]:
+    """Policy network of every agent (shared networks appear under each of their agents)"""
+    networks = {}
+    for agent_ids, group_networks in checkpoint_groups(checkpoint):
+        for i, agent_id in enumerate(agent_ids):
+            networks[agent_id] = group_networks[0] if group_networks[0].agent_ids is not None else group_networks[i]
+    return networks
+
+
+def _quantize(module: nn.Module) -> nn.Module:
+    """Dynamic int8 quantization of the Linear and LSTM layers"""
+    return torch.ao.quantization.quantize_dynamic(module, {nn.Linear, nn.LSTM}, dtype=torch.qint8)
+
+
+def export_policies(checkpoint_path: str, output_dir: str, export_format: str = 'torchscript',
+                    quantize: bool = False) -> dict:
+    """
+    Export the policies of a save_models checkpoint for CPU inference.
+
+    Writes one graph per policy group (TorchScript .pt or ONNX .onnx) and a
+    manifest.json listing each group's agents and sizes; load it with
+    deploy.runtime.load_policy_runtime. quantize stores the Linear/LSTM
+    weights as dynamic int8 (for ONNX through onnxruntime's quantizer).
+    """
+    if export_format not in FORMATS:
+        raise ValueError(f"Unknown export format {export_format}, expected one of {FORMATS}")
+    os.makedirs(output_dir, exist_ok=True)
+    checkpoint = load_checkpoint(checkpoint_path)
+
+    manifest = {'format': export_format, 'quantized': quantize, 'groups': []}
+    for g, (agent_ids, networks) in enumerate(checkpoint_groups(checkpoint)):
+        config = networks[0].config
+        if networks[0].agent_embedding is None and not quantize:
+            module = StackedGroupStep(BatchedPolicyGroup(agent_ids, networks))
+        else:
+            module = PolicyGroupStep(networks, len(agent_ids)).eval()
+        example = (
+            torch.zeros(len(agent_ids), config.input_size),
+            torch.zeros(config.num_layers, len(agent_ids), config.hidden_size),
+            torch.zeros(config.num_layers, len(agent_ids), config.hidden_size)
+        )
+
+        if export_format == 'torchscript':
+            filename = f"group_{g}.pt"
+            if quantize:
+                module = _quantize(module)
+            with torch.no_grad():
+                traced = torch.jit.trace(module, example)
+            torch.jit.save(torch.jit.freeze(traced.eval()), os.path.join(output_dir, filename))
+        else:
+            filename = f"group_{g}.onnx"
+            _export_onnx(module, example, os.path.join(output_dir, filename), quantize)
+
+        manifest['groups'].append({
+            'file': filename,
+            'agent_ids': list(agent_ids),
+            'input_size': config.input_size,
+            'hidden_size': config.hidden_size,
+            'num_layers': config.num_layers,
+            'num_actions': networks[0].action_space_size
+        })
+
+    with open(os.path.join(output_dir, MANIFEST_FILE), 'w') as f:
+        json.dump(manifest, f, indent=2)
+    print(f"[INFO] Exported {len(manifest['groups'])} policy groups to {output_dir}")
+    return manifest
+
+
+def _export_onnx(module: nn.Module, example: tuple, path: str, quantize: bool):
+    with torch.no_grad():
+        torch.onnx.export(
+            module, example, path,
+            input_names=['states', 'h', 'c'],
+            output_names=['logits', 'values', 'h_next', 'c_next'],
+            dynamo=False
+        )
+    if quantize:
+        try:
+            from onnxruntime.quantization import QuantType, quantize_dynamic
+        except ImportError:
+            raise ImportError("Quantized ONNX export needs the onnxruntime package")
+        float_path = path + '.float'
+        os.replace(path, float_path)
+        quantize_dynamic(float_path, path, weight_type=QuantType.QInt8)
+        os.remove(float_path)
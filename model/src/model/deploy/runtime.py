@@ -0,0 +1,97 @@
+import os
+import json
+import torch
+from typing import List, Optional, Tuple
+
+from ..agents.inference_session import InferenceSession
+from .export import MANIFEST_FILE
+
+
+class ExportedPolicyGroup:
+    """
+    A policy group exported by deploy.export, with the interface of
+    BatchedPolicyGroup (agent_ids, index, forward(states, hidden, rows)) so
+    an InferenceSession can drive it. The graph has a fixed group size: a
+    subset of rows runs as a full batch with the other rows zeroed.
+    """
+
+    def __init__(self, directory: str, spec: dict, export_format: str, num_threads: Optional[int] = None):
+        self.agent_ids = list(spec['agent_ids'])
+        self.index = {agent_id: i for i, agent_id in enumerate(self.agent_ids)}
+        self.hidden_size = spec['hidden_size']
+        self.num_layers = spec['num_layers']
+        self.action_space_size = spec['num_actions']
+        self.device = torch.device('cpu')
+
+        path = os.path.join(directory, spec['file'])
+        if export_format == 'torchscript':
+            self._run = torch.jit.load(path, map_location='cpu')
+        else:
+            self._run = _onnx_runner(path, num_threads)
+
+    def __len__(self):
+        return len(self.agent_ids)
+
+    def sync(self):
+        pass
+
+    def zero_hidden(self, num_agents: int) -> Tuple[torch.Tensor, torch.Tensor]:
+        h = torch.zeros(self.num_layers, num_agents, self.hidden_size)
+        return h, h.clone()
+
+    @torch.no_grad()
+    def forward(self, states: torch.Tensor, hidden_state: Optional[Tuple[torch.Tensor, torch.Tensor]] = None,
+                rows: Optional[torch.Tensor] = None):
+        if hidden_state is None:
+            hidden_state = self.zero_hidden(states.size(0))
+        h, c = hidden_state
+        if rows is None:
+            return self._full(states, h, c)
+
+        full_states = states.new_zeros(len(self), states.size(1))
+        full_h, full_c = self.zero_hidden(len(self))
+        full_states[rows] = states
+        full_h[:, rows] = h
+        full_c[:, rows] = c
+        logits, value, (h_next, c_next) = self._full(full_states, full_h, full_c)
+        return logits[rows], value[rows], (h_next[:, rows], c_next[:, rows])
+
+    def _full(self, states, h, c):
+        logits, value, h_next, c_next = self._run(states.contiguous(), h.contiguous(), c.contiguous())
+        return logits, value, (h_next, c_next)
+
+
+def _onnx_runner(path: str, num_threads: Optional[int] = None):
+    try:
+        import onnxruntime as ort
+    except ImportError:
+        raise ImportError("Running ONNX policies needs the onnxruntime package")
+
+    options = ort.SessionOptions()
+    if num_threads:
+        options.intra_op_num_threads = num_threads
+    session = ort.InferenceSession(path, options, providers=['CPUExecutionProvider'])
+
+    def run(states, h, c):
+        outputs = session.run(None, {'states': states.numpy(), 'h': h.numpy(), 'c': c.numpy()})
+        return tuple(torch.from_numpy(output) for output in outputs)
+
+    return run
+
+
+def load_policy_runtime(directory: str, junction_ids: Optional[List[str]] = None,
+                        num_threads: Optional[int] = None) -> InferenceSession:
+    """
+    Load exported policies into an InferenceSession (per-junction hidden
+    state, batched step per group), without the training code paths.
+    """
+    with open(os.path.join(directory, MANIFEST_FILE)) as f:
+        manifest = json.load(f)
+    if num_threads and manifest['format'] == 'torchscript':
+        torch.set_num_threads(num_threads)
+
+    groups = [
+        ExportedPolicyGroup(directory, spec, manifest['format'], num_threads)
+        for spec in manifest['groups']
+    ]
+    return InferenceSession.from_groups(groups, junction_ids)
@@ -1,5 +1,5 @@
 from gym import spaces
-from typing import List, Dict
+from typing import List, Dict, Sequence, Union
 from traffic_phase import TrafficPhase
 import numpy as np
 
@@ -21,7 +21,7 @@ class TrafficActionSpace:
         else:
             self.phase_mapping = phase_mapping
 
-        self.available_phases = list(set(phase_mapping.values()) - {None})
+        self.available_phases = list(set(self.phase_mapping.values()) - {None})
 
         self.actions = {
             0: "KEEP_CURRENT_PHASE",
@@ -35,6 +35,28 @@ class TrafficActionSpace:
         self.num_actions = len(self.actions)
         self.action_space = spaces.Discrete(self.num_actions)
 
+        # Validity only depends on the duration through the min/max thresholds,
+        # so (phase, duration bucket) -> bool mask is a small lookup table
+        self.mask_table = self._build_mask_table()
+
+    # Duration buckets: [0, min), [min, max), [max, inf)
+    DURATION_BUCKETS = 3
+
+    def duration_bucket(self, phase_duration):
+        """Bucket index of a duration (scalar or array)"""
+        return (np.asarray(phase_duration) >= self.min_phase_duration).astype(np.int64) + \
+               (np.asarray(phase_duration) >= self.max_phase_duration).astype(np.int64)
+
+    def _build_mask_table(self) -> np.ndarray:
+        """[len(TrafficPhase), DURATION_BUCKETS, num_actions] bool, rows indexed by phase value"""
+        representative_durations = (0, self.min_phase_duration, self.max_phase_duration)
+        table = np.zeros((len(TrafficPhase), self.DURATION_BUCKETS, self.num_actions), dtype=bool)
+        for phase in TrafficPhase:
+            for bucket, duration in enumerate(representative_durations):
+                for action in self.actions:
+                    table[phase.value, bucket, action] = self.is_valid_action(action, phase, duration)
+        return table
+
     def is_valid_action(self, action: int, current_phase: TrafficPhase, 
                         phase_duration: int) -> bool:
         """
@@ -73,3 +95,24 @@ class TrafficActionSpace:
         """
         return [action for action in self.actions 
                 if self.is_valid_action(action, current_phase, phase_duration)]
+
+
+    def get_valid_action_mask(self, current_phase: TrafficPhase,
+                              phase_duration: int) -> np.ndarray:
+        """
+        Bool mask [num_actions] of the valid actions, read from the lookup table.
+        The returned row is shared: do not modify it in place.
+        """
+        return self.mask_table[current_phase.value, self.duration_bucket(phase_duration)]
+
+    def get_valid_action_masks(self, current_phases: Sequence[Union[TrafficPhase, int]],
+                               phase_durations: Sequence[int]) -> np.ndarray:
+        """
+        Bool masks [batch, num_actions] for many (phase, duration) pairs with a
+        single gather; phases may be TrafficPhase members or their values.
+        """
+        phase_index = np.fromiter(
+            (phase.value if isinstance(phase, TrafficPhase) else phase for phase in current_phases),
+            dtype=np.int64
+        )
+        return self.mask_table[phase_index, self.duration_bucket(phase_durations)]
@@ -11,6 +11,11 @@ from model.utils.collect_traffic_data import collect_traffic_data
 from model.utils.create_demand_file import create_route_file
 from model.utils.create_traffic_light_config import create_traffic_light_config
 from model.utils.create_sumo_config_file import create_sumo_config
+from model.deploy.export import export_policies
+from model.deploy.benchmark import benchmark_policies
+from model.deploy.evaluate import evaluate_compression
+from model.utils.checkpoint_compression import compress_checkpoint
+from model.rollout.sumo_env import RegionSumoEnv
 
 def download_OSM_file_m(args):
     """
@@ -173,6 +178,54 @@ def create_sumo_config_file(args):
     except Exception as e:
         print(f"[ERROR] Failed to create SUMO configuration file: {e}")
 
+def export_policy(args):
+    """
+    Export the policies of a checkpoint for CPU inference (TorchScript/ONNX).
+    """
+    if not os.path.exists(args.checkpoint):
+        print(f"[ERROR] Checkpoint not found at {args.checkpoint}")
+        return
+    try:
+        export_policies(args.checkpoint, args.output_dir, export_format=args.format, quantize=args.quantize)
+    except Exception as e:
+        print(f"[ERROR] Failed to export policies: {e}")
+
+def benchmark_policy(args):
+    """
+    Compare decision latency of the eager policies and an exported runtime.
+    """
+    if not os.path.exists(args.checkpoint):
+        print(f"[ERROR] Checkpoint not found at {args.checkpoint}")
+        return
+    if not os.path.exists(args.export_dir):
+        print(f"[ERROR] Export directory not found at {args.export_dir}")
+        return
+    benchmark_policies(args.checkpoint, args.export_dir, ticks=args.ticks, num_threads=args.num_threads)
+
+def compress_policy(args):
+    """
+    Compress a checkpoint (int8 quantization, pruning, fp16) and evaluate it against the original.
+    """
+    if not os.path.exists(args.checkpoint):
+        print(f"[ERROR] Checkpoint not found at {args.checkpoint}")
+        return
+    try:
+        compress_checkpoint(
+            args.checkpoint, args.output,
+            quantize=args.quantize,
+            prune_amount=args.prune_amount,
+            fp16=args.fp16
+        )
+        print(f"[INFO] Compressed checkpoint written to {args.output}")
+    except Exception as e:
+        print(f"[ERROR] Failed to compress checkpoint: {e}")
+        return
+    evaluate_compression(
+        args.checkpoint, args.output,
+        env_factory=RegionSumoEnv if args.episodes > 0 else None,
+        episodes=args.episodes
+    )
+
 def test(args):
     # test_find_closest_node()
     pass
@@ -361,6 +414,107 @@ def main():
         help="End time for simulation (default: 3600)"
     )
     # ------------------------------------------------
+    # Subparser: export policy command
+    # ------------------------------------------------
+    export_policy_parser = subparser.add_parser(
+        'export_policy', help="Export trained policies for CPU inference"
+    )
+    export_policy_parser.add_argument(
+        '--checkpoint',
+        type=str,
+        required=True,
+        help="Checkpoint written by save_models"
+    )
+    export_policy_parser.add_argument(
+        '--output-dir',
+        type=str,
+        default="src/model/data/exported_policy",
+        help="Directory for the exported graphs and manifest"
+    )
+    export_policy_parser.add_argument(
+        '--format',
+        type=str,
+        choices=['torchscript', 'onnx'],
+        default="torchscript",
+        help="Export format (default: torchscript)"
+    )
+    export_policy_parser.add_argument(
+        '--quantize',
+        action='store_true',
+        help="Dynamic int8 quantization of the Linear/LSTM layers"
+    )
+    # ------------------------------------------------
+    # Subparser: benchmark policy command
+    # ------------------------------------------------
+    benchmark_policy_parser = subparser.add_parser(
+        'benchmark_policy', help="Benchmark exported policies against the eager model"
+    )
+    benchmark_policy_parser.add_argument(
+        '--checkpoint',
+        type=str,
+        required=True,
+        help="Checkpoint written by save_models"
+    )
+    benchmark_policy_parser.add_argument(
+        '--export-dir',
+        type=str,
+        default="src/model/data/exported_policy",
+        help="Directory written by export_policy"
+    )
+    benchmark_policy_parser.add_argument(
+        '--ticks',
+        type=int,
+        default=200,
+        help="Number of timed decision ticks (default: 200)"
+    )
+    benchmark_policy_parser.add_argument(
+        '--num-threads',
+        type=int,
+        default=None,
+        help="CPU threads for inference (default: torch default)"
+    )
+    # ------------------------------------------------
+    # Subparser: compress policy command
+    # ------------------------------------------------
+    compress_policy_parser = subparser.add_parser(
+        'compress_policy', help="Compress a checkpoint and evaluate it against the original"
+    )
+    compress_policy_parser.add_argument(
+        '--checkpoint',
+        type=str,
+        required=True,
+        help="Checkpoint written by save_models"
+    )
+    compress_policy_parser.add_argument(
+        '--output',
+        type=str,
+        required=True,
+        help="Path of the compressed checkpoint"
+    )
+    compress_policy_parser.add_argument(
+        '--quantize',
+        action=argparse.BooleanOptionalAction,
+        default=True,
+        help="Store matrix weights as int8 (default: on)"
+    )
+    compress_policy_parser.add_argument(
+        '--prune-amount',
+        type=float,
+        default=0.0,
+        help="Fraction of smallest-magnitude weights to zero (default: 0)"
+    )
+    compress_policy_parser.add_argument(
+        '--fp16',
+        action='store_true',
+        help="Store the remaining float tensors as float16"
+    )
+    compress_policy_parser.add_argument(
+        '--episodes',
+        type=int,
+        default=0,
+        help="SUMO episodes for the reward comparison (default: 0, skip)"
+    )
+    # ------------------------------------------------
     # Subparser: test command
     # ------------------------------------------------
     test_command = subparser.add_parser(
@@ -384,6 +538,12 @@ def main():
         create_tfl_config(args)
     elif args.command == "create_sumo_config":
         create_sumo_config_file(args)
+    elif args.command == "export_policy":
+        export_policy(args)
+    elif args.command == "benchmark_policy":
+        benchmark_policy(args)
+    elif args.command == "compress_policy":
+        compress_policy(args)
     elif args.command == "test":
         test(args)
     else:
@@ -0,0 +1,98 @@
+import threading
+from typing import Dict, List, Optional
+
+from .rollout_manager import RolloutManager
+
+POLL_SECONDS = 0.5
+
+
+class AsyncLearner:
+    """
+    Learner side of the actor/learner split (IMPALA / Ape-X style).
+
+    Actors (the RolloutManager workers) simulate continuously with
+    read-only policy copies; this loop consumes their segments as they
+    arrive, runs the PPO update on the coordinator and publishes a new
+    weight version every publish_interval updates. Nothing here blocks the
+    actors: they only wait when all of their trajectory slots are queued
+    for the learner. Segments collected under weights more than
+    max_policy_lag versions old are dropped instead of trained on.
+
+    run() learns in the calling thread; start()/stop() run the same loop
+    in a background thread so the caller stays free (e.g. to act with a
+    PolicyActor refreshed from the same weight store).
+    """
+
+    def __init__(self, manager: RolloutManager, epochs: int = 4, publish_interval: int = 1,
+                 max_policy_lag: Optional[int] = None):
+        self.manager = manager
+        self.coordinator = manager.coordinator
+        self.epochs = epochs
+        self.publish_interval = publish_interval
+        self.max_policy_lag = max_policy_lag
+
+        self.updates = 0
+        self.dropped_segments = 0
+        self.history: List[Dict[str, float]] = []
+        self.error: Optional[BaseException] = None
+        self._stop = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+
+    def step(self, timeout: Optional[float] = None) -> Optional[Dict[str, float]]:
+        """Consume one segment; returns its training info, or None if it was dropped"""
+        worker_id, trajectory, last_values, version = self.manager.collect(timeout)
+        policy_lag = self.manager.version - version
+        if self.max_policy_lag is not None and policy_lag > self.max_policy_lag:
+            self.dropped_segments += 1
+            return None
+
+        training_info = self.coordinator.train_on_trajectory(trajectory, last_values, epochs=self.epochs)
+        training_info.update({'worker_id': worker_id, 'policy_lag': policy_lag})
+        self.history.append(training_info)
+
+        self.updates += 1
+        if self.updates % self.publish_interval == 0:
+            self.manager.broadcast_weights()
+        return training_info
+
+    def run(self, num_updates: Optional[int] = None, timeout: Optional[float] = None) -> List[Dict[str, float]]:
+        """Learn until num_updates updates (or stop()); returns their training info"""
+        start = len(self.history)
+        target = None if num_updates is None else self.updates + num_updates
+        while not self._stop.is_set() and (target is None or self.updates < target):
+            try:
+                self.step(POLL_SECONDS if timeout is None else timeout)
+            except TimeoutError:
+                if timeout is not None:
+                    raise
+        return self.history[start:]
+
+    def start(self, num_updates: Optional[int] = None):
+        """Run the learner loop in a background thread"""
+        if self._thread is not None and self._thread.is_alive():
+            raise RuntimeError("Learner is already running")
+        self._stop.clear()
+        self.error = None
+
+        def loop():
+            try:
+                self.run(num_updates)
+            except BaseException as e:
+                self.error = e
+
+        self._thread = threading.Thread(target=loop, name='async-learner', daemon=True)
+        self._thread.start()
+
+    @property
+    def running(self) -> bool:
+        return self._thread is not None and self._thread.is_alive()
+
+    def join(self, timeout: Optional[float] = None):
+        if self._thread is not None:
+            self._thread.join(timeout)
+        if self.error is not None:
+            raise RuntimeError("Learner loop failed") from self.error
+
+    def stop(self, timeout: Optional[float] = None):
+        self._stop.set()
+        self.join(timeout)
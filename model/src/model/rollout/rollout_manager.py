@@ -0,0 +1,149 @@
+import queue
+import multiprocessing as mp
+from typing import Callable, List, Optional, Sequence
+
+from ..utils.trajectory_buffer import TrajectoryBuffer
+from .shared_trajectory import SharedTrajectory
+from .sumo_env import RegionSumoEnv
+from .weight_store import SharedWeightStore
+from .worker import rollout_worker
+
+DEMAND_HOURS = (7, 9, 12, 17, 19, 22)
+
+
+def default_scenarios(num_workers: int, hours: Sequence[int] = DEMAND_HOURS, base_seed: int = 0) -> List[dict]:
+    """One region_1 scenario per worker: demand hours round-robin, distinct seeds"""
+    return [
+        {'demand_hour': hours[i % len(hours)], 'seed': base_seed + i}
+        for i in range(num_workers)
+    ]
+
+
+class RolloutManager:
+    """
+    Parallel rollouts for a MultiAgentCoordinatorAdvanced learner.
+
+    Each scenario gets a worker process with its own SUMO instance and a
+    CPU copy of the policies. Workers write fixed-horizon [time, agent]
+    segments straight into shared memory slots (slots_per_worker each, so a
+    worker keeps simulating while the learner trains on its previous
+    segment); the learner copies a ready slot into a TrajectoryBuffer and
+    hands the slot back. The learner publishes weights to a versioned weight
+    store (shared memory by default, or a FileWeightStore of save_models
+    checkpoints) with broadcast_weights(); workers pick up the newest
+    version at the start of each segment.
+    """
+
+    def __init__(self, coordinator, scenarios: List[dict], horizon: int = 128, slots_per_worker: int = 2,
+                 env_factory: Callable = RegionSumoEnv, env_kwargs: Optional[dict] = None,
+                 weight_store=None):
+        self.coordinator = coordinator
+        self.scenarios = list(scenarios)
+        self.horizon = horizon
+        self.env_factory = env_factory
+        self.env_kwargs = env_kwargs or {}
+
+        agent_ids = coordinator.agent_ids
+        input_sizes = {coordinator.agent_configs[agent_id].input_size for agent_id in agent_ids}
+        action_sizes = {coordinator.action_space_sizes[agent_id] for agent_id in agent_ids}
+        if len(input_sizes) != 1 or len(action_sizes) != 1:
+            raise ValueError("Rollout workers need one state size and one action space size for all agents")
+        self.state_size = input_sizes.pop()
+        self.num_actions = action_sizes.pop()
+
+        self.context = mp.get_context('spawn')
+        self.ready = self.context.Queue()
+        self.stop_event = self.context.Event()
+        self.owns_weight_store = weight_store is None
+        self.weight_store = weight_store or SharedWeightStore.for_networks(coordinator.policy_networks)
+        self.version = self.weight_store.version
+
+        self.slots: List[List[SharedTrajectory]] = []
+        self.free_slots = []
+        self.trajectories = []
+        for _ in self.scenarios:
+            self.slots.append([
+                SharedTrajectory(horizon, len(agent_ids), self.state_size, self.num_actions)
+                for _ in range(slots_per_worker)
+            ])
+            self.free_slots.append(self.context.Queue())
+            self.trajectories.append(TrajectoryBuffer(
+                horizon, len(agent_ids), (self.state_size,), self.num_actions,
+                gamma=coordinator.coordination_config.get('gamma', 0.99),
+                gae_lambda=coordinator.coordination_config.get('gae_lambda', 0.95)
+            ))
+
+        self.workers = []
+
+    @property
+    def num_workers(self) -> int:
+        return len(self.scenarios)
+
+    def start(self):
+        self.broadcast_weights()
+        agent_configs = {agent_id: self.coordinator.agent_configs[agent_id] for agent_id in self.coordinator.agent_ids}
+        for worker_id, scenario in enumerate(self.scenarios):
+            for slot_index in range(len(self.slots[worker_id])):
+                self.free_slots[worker_id].put(slot_index)
+            process = self.context.Process(
+                target=rollout_worker,
+                args=(worker_id, self.env_factory, {**self.env_kwargs, **scenario},
+                      self.coordinator.agent_ids, agent_configs, self.coordinator.action_space_sizes,
+                      {'parameter_sharing': self.coordinator.parameter_sharing,
+                       'agent_embedding_dim': self.coordinator.agent_embedding_dim},
+                      [slot.spec() for slot in self.slots[worker_id]],
+                      self.free_slots[worker_id], self.ready, self.weight_store.spec(), self.stop_event),
+                daemon=True
+            )
+            process.start()
+            self.workers.append(process)
+        print(f"[INFO] Started {self.num_workers} rollout workers")
+
+    def broadcast_weights(self) -> int:
+        """Publish the learner's current policy weights as a new version"""
+        self.version = self.weight_store.publish(self.coordinator)
+        return self.version
+
+    def collect(self, timeout: Optional[float] = None):
+        """
+        Wait for the next finished segment; returns (worker_id, trajectory,
+        last_values, weights version). The trajectory stays valid until the
+        same worker's next segment is collected.
+        """
+        try:
+            worker_id, slot_index, steps, version = self.ready.get(timeout=timeout)
+        except queue.Empty:
+            raise TimeoutError(f"No rollout segment within {timeout}s")
+        if slot_index is None:
+            raise RuntimeError(f"Rollout worker {worker_id} failed:\n{steps}")
+
+        trajectory = self.trajectories[worker_id]
+        last_values = self.slots[worker_id][slot_index].copy_to(trajectory, steps)
+        self.free_slots[worker_id].put(slot_index)
+        return worker_id, trajectory, last_values, version
+
+    def stop(self, timeout: float = 10.0):
+        self.stop_event.set()
+        for process in self.workers:
+            process.join(timeout)
+            if process.is_alive():
+                process.terminate()
+        self.workers = []
+        # Undelivered slot tokens are of no use any more
+        for pending in self.free_slots:
+            pending.cancel_join_thread()
+        if self.owns_weight_store:
+            self.weight_store.close()
+        for worker_slots in self.slots:
+            for slot in worker_slots:
+                slot.close()
+        self.slots = []
+        # End of training: make the learner's on-disk replay durable
+        self.coordinator.close()
+
+    def __enter__(self):
+        self.start()
+        return self
+
+    def __exit__(self, *exc):
+        self.stop()
@@ -0,0 +1,75 @@
+import numpy as np
+from multiprocessing import shared_memory
+from typing import Dict, Optional
+
+from ..utils.trajectory_buffer import TrajectoryBuffer
+
+
+def _layout(horizon: int, num_agents: int, state_size: int, num_actions: int):
+    """(name, shape, dtype) of every array in a slot, in memory order"""
+    return [
+        ('states', (horizon, num_agents, state_size), np.float32),
+        ('actions', (horizon, num_agents), np.int64),
+        ('rewards', (horizon, num_agents), np.float32),
+        ('values', (horizon, num_agents), np.float32),
+        ('log_probs', (horizon, num_agents), np.float32),
+        ('dones', (horizon, num_agents), np.bool_),
+        ('valid_masks', (horizon, num_agents, num_actions), np.bool_),
+        ('last_values', (num_agents,), np.float32),
+    ]
+
+
+class SharedTrajectory:
+    """
+    One rollout segment in a shared memory block, written by a worker and
+    read by the learner without pickling.
+
+    The block holds [horizon, agent] arrays laid out back to back (8-byte
+    aligned). The creating process owns the block and unlinks it; workers
+    attach by name through spec().
+    """
+
+    def __init__(self, horizon: int, num_agents: int, state_size: int, num_actions: int,
+                 name: Optional[str] = None):
+        self.dims = (horizon, num_agents, state_size, num_actions)
+        layout = _layout(*self.dims)
+
+        offsets, size = [], 0
+        for _, shape, dtype in layout:
+            offsets.append(size)
+            size += -(-int(np.prod(shape)) * np.dtype(dtype).itemsize // 8) * 8
+
+        self.owner = name is None
+        self.memory = shared_memory.SharedMemory(name=name, create=self.owner, size=size)
+        self.arrays: Dict[str, np.ndarray] = {
+            field: np.ndarray(shape, dtype=dtype, buffer=self.memory.buf, offset=offset)
+            for (field, shape, dtype), offset in zip(layout, offsets)
+        }
+
+    def spec(self) -> dict:
+        """Picklable description for attach() in another process"""
+        horizon, num_agents, state_size, num_actions = self.dims
+        return {'name': self.memory.name, 'horizon': horizon, 'num_agents': num_agents,
+                'state_size': state_size, 'num_actions': num_actions}
+
+    @classmethod
+    def attach(cls, spec: dict) -> 'SharedTrajectory':
+        return cls(spec['horizon'], spec['num_agents'], spec['state_size'], spec['num_actions'],
+                   name=spec['name'])
+
+    def copy_to(self, trajectory: TrajectoryBuffer, steps: int) -> np.ndarray:
+        """Copy the first `steps` rows into a learner-side buffer; returns last_values"""
+        trajectory.reset()
+        for field in ('states', 'actions', 'rewards', 'values', 'log_probs', 'dones'):
+            getattr(trajectory, field)[:steps] = self.arrays[field][:steps]
+        if trajectory.valid_masks is not None:
+            trajectory.valid_masks[:steps] = self.arrays['valid_masks'][:steps]
+        trajectory.step = steps
+        return self.arrays['last_values'].copy()
+
+    def close(self):
+        # Views must go before the buffer can be released
+        self.arrays = {}
+        self.memory.close()
+        if self.owner:
+            self.memory.unlink()
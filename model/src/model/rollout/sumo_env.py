@@ -0,0 +1,235 @@
+import numpy as np
+import sumolib
+import traci
+from typing import List, Optional
+
+from ..config import DISTRICT_1_NET, DISTRICT_1_ROUTES
+
+LANE_VARIABLES = (
+    traci.constants.LAST_STEP_VEHICLE_HALTING_NUMBER,
+    traci.constants.LAST_STEP_OCCUPANCY,
+    traci.constants.VAR_WAITING_TIME,
+)
+
+
+def load_sim_backend(backend: str = 'traci'):
+    """traci (SUMO in a child process) or libsumo (in-process, faster, headless)"""
+    if backend == 'libsumo':
+        try:
+            import libsumo
+            return libsumo
+        except ImportError:
+            print("[WARN] libsumo is not installed, using the traci backend")
+    return traci
+
+
+class RegionSumoEnv:
+    """
+    Multi-agent SUMO environment: one agent per traffic light of the network.
+
+    Observations follow TrafficStateSpace: per controlled incoming lane
+    (padded/truncated to num_lanes) the normalized queue, occupancy and
+    waiting time, then current green index, phase duration and time since
+    the last change; shape [num_agents, 3 * num_lanes + 3].
+
+    Actions follow TrafficActionSpace: 0 keep, 1 extend, 2 early
+    termination, 3 + k switch to the k-th green phase of the light. All
+    agents share num_actions = 3 + max greens; switches a light does not
+    have are masked out in the valid action masks returned with each
+    observation. Rewards mirror TrafficRewardFunction's queue/waiting terms.
+    """
+
+    def __init__(self, net_file: str = DISTRICT_1_NET, route_file: str = DISTRICT_1_ROUTES,
+                 agent_ids: Optional[List[str]] = None, demand_hour: int = 7, episode_seconds: int = 3600,
+                 decision_interval: int = 5, seed: int = 0, num_lanes: int = 4,
+                 min_phase_duration: int = 15, max_phase_duration: int = 120,
+                 max_queue_length: int = 50, max_waiting_time: float = 300.0,
+                 queue_weight: float = 0.4, waiting_weight: float = 0.38,
+                 soft_queue_penalty_weight: float = 0.02,
+                 sumo_binary: str = 'sumo', backend: str = 'traci'):
+        self.net_file = net_file
+        self.route_file = route_file
+        self.begin = demand_hour * 3600
+        self.end = self.begin + episode_seconds
+        self.decision_interval = decision_interval
+        self.seed = seed
+        self.num_lanes = num_lanes
+        self.min_phase_duration = min_phase_duration
+        self.max_phase_duration = max_phase_duration
+        self.max_queue_length = max_queue_length
+        self.max_waiting_time = max_waiting_time
+        self.queue_weight = queue_weight
+        self.waiting_weight = waiting_weight
+        self.soft_queue_penalty_weight = soft_queue_penalty_weight
+        self.sumo_binary = sumo_binary
+        self.sim = load_sim_backend(backend)
+
+        net = sumolib.net.readNet(net_file, withPrograms=True)
+        tls_ids = sorted(tls.getID() for tls in net.getTrafficLights())
+        self.agent_ids = list(agent_ids) if agent_ids is not None else tls_ids
+        missing = set(self.agent_ids) - set(tls_ids)
+        if missing:
+            raise ValueError(f"Agents without a traffic light in {net_file}: {sorted(missing)}")
+
+        self.lanes = []  # per agent: up to num_lanes controlled incoming lanes
+        self.green_phases = []  # per agent: SUMO phase indices of its green phases
+        max_phases = 1
+        for agent_id in self.agent_ids:
+            tls = net.getTLS(agent_id)
+            lanes = list(dict.fromkeys(in_lane.getID() for in_lane, _, _ in tls.getConnections()))
+            self.lanes.append(lanes[:num_lanes])
+            program = next(iter(tls.getPrograms().values()))
+            max_phases = max(max_phases, len(program.getPhases()))
+            self.green_phases.append([
+                i for i, phase in enumerate(program.getPhases())
+                if ('G' in phase.state or 'g' in phase.state) and 'y' not in phase.state.lower()
+            ])
+
+        self.num_agents = len(self.agent_ids)
+        self.max_greens = max(len(greens) for greens in self.green_phases)
+        self.num_actions = 3 + self.max_greens
+        self.state_size = 3 * num_lanes + 3
+
+        # green_index[agent, sumo phase] -> k (or -1 when not a green phase)
+        self.green_index = np.full((self.num_agents, max_phases), -1, dtype=np.int64)
+        self.has_green = np.zeros((self.num_agents, self.max_greens), dtype=np.bool_)
+        for i, greens in enumerate(self.green_phases):
+            self.green_index[i, greens] = np.arange(len(greens))
+            self.has_green[i, :len(greens)] = True
+
+        self.running = False
+        self._reset_tracking()
+
+    def _reset_tracking(self):
+        self.current_phase = np.zeros(self.num_agents, dtype=np.int64)
+        self.phase_start = np.full(self.num_agents, float(self.begin))
+        self.last_change = np.full(self.num_agents, float(self.begin))
+        self.prev_queue = np.zeros(self.num_agents)
+        self.prev_wait = np.zeros(self.num_agents)
+        self.now = float(self.begin)
+
+    def _start(self):
+        self.sim.start([
+            self.sumo_binary,
+            '-n', self.net_file,
+            '-r', self.route_file,
+            '--begin', str(self.begin),
+            '--end', str(self.end),
+            '--seed', str(self.seed),
+            '--time-to-teleport', '300',
+            '--no-step-log', 'true',
+            '--no-warnings', 'true'
+        ])
+        self.running = True
+        for lanes in self.lanes:
+            for lane_id in lanes:
+                self.sim.lane.subscribe(lane_id, LANE_VARIABLES)
+        for agent_id in self.agent_ids:
+            self.sim.trafficlight.subscribe(agent_id, [traci.constants.TL_CURRENT_PHASE])
+
+    def reset(self):
+        """Restart the scenario; returns (observations [A, S], valid masks [A, num_actions])"""
+        self.close()
+        self._start()
+        self._reset_tracking()
+        raw = self._read()
+        self.prev_queue, self.prev_wait = raw['queue'].sum(axis=1), raw['wait'].sum(axis=1)
+        return self._observe(raw), self.valid_action_masks()
+
+    def step(self, actions):
+        """Apply one action per agent and run decision_interval seconds"""
+        self._apply(np.asarray(actions, dtype=np.int64))
+        self.sim.simulationStep(self.sim.simulation.getTime() + self.decision_interval)
+
+        raw = self._read()
+        queue, wait = raw['queue'].sum(axis=1), raw['wait'].sum(axis=1)
+        lane_capacity = self.max_queue_length * self.num_lanes
+        rewards = (self.queue_weight * (self.prev_queue - queue) / lane_capacity
+                   + self.waiting_weight * (self.prev_wait - wait) / self.max_waiting_time / self.num_lanes
+                   - self.soft_queue_penalty_weight * queue / lane_capacity)
+        self.prev_queue, self.prev_wait = queue, wait
+
+        done = (self.sim.simulation.getTime() >= self.end
+                or self.sim.simulation.getMinExpectedNumber() <= 0)
+        return self._observe(raw), rewards.astype(np.float32), bool(done), self.valid_action_masks()
+
+    def _apply(self, actions: np.ndarray):
+        now = self.sim.simulation.getTime()
+        for i, agent_id in enumerate(self.agent_ids):
+            action = actions[i]
+            if action == 1:
+                remaining = self.sim.trafficlight.getNextSwitch(agent_id) - now
+                self.sim.trafficlight.setPhaseDuration(agent_id, remaining + self.decision_interval)
+            elif action == 2:
+                # Move on through the program (keeps the yellow transition)
+                self.sim.trafficlight.setPhaseDuration(agent_id, 0)
+            elif action >= 3:
+                self.sim.trafficlight.setPhase(agent_id, self.green_phases[i][action - 3])
+
+    def _read(self) -> dict:
+        now = self.sim.simulation.getTime()
+        lane_results = self.sim.lane.getAllSubscriptionResults()
+        queue = np.zeros((self.num_agents, self.num_lanes))
+        occupancy = np.zeros((self.num_agents, self.num_lanes))
+        wait = np.zeros((self.num_agents, self.num_lanes))
+        for i, lanes in enumerate(self.lanes):
+            for j, lane_id in enumerate(lanes):
+                values = lane_results.get(lane_id, {})
+                queue[i, j] = values.get(traci.constants.LAST_STEP_VEHICLE_HALTING_NUMBER, 0)
+                occupancy[i, j] = values.get(traci.constants.LAST_STEP_OCCUPANCY, 0.0) / 100.0
+                wait[i, j] = values.get(traci.constants.VAR_WAITING_TIME, 0.0)
+
+        tls_results = self.sim.trafficlight.getAllSubscriptionResults()
+        phases = np.array([
+            tls_results.get(agent_id, {}).get(traci.constants.TL_CURRENT_PHASE, 0) for agent_id in self.agent_ids
+        ], dtype=np.int64)
+        changed = phases != self.current_phase
+        self.phase_start[changed] = now
+        self.last_change[changed] = now
+        self.current_phase = phases
+        self.now = now
+        return {'queue': queue, 'occupancy': occupancy, 'wait': wait}
+
+    @property
+    def phase_duration(self) -> np.ndarray:
+        return self.now - self.phase_start
+
+    def _observe(self, raw: dict) -> np.ndarray:
+        green = self.green_index[np.arange(self.num_agents), self.current_phase]
+        green_count = np.maximum(self.has_green.sum(axis=1) - 1, 1)
+        observation = np.concatenate([
+            np.clip(raw['queue'] / self.max_queue_length, 0, 1),
+            np.clip(raw['occupancy'], 0, 1),
+            np.clip(raw['wait'] / self.max_waiting_time, 0, 1),
+            (np.maximum(green, 0) / green_count)[:, np.newaxis],
+            (np.minimum(self.phase_duration, self.max_waiting_time) / self.max_waiting_time)[:, np.newaxis],
+            (np.minimum(self.now - self.last_change, 300.0) / 300.0)[:, np.newaxis],
+        ], axis=1)
+        return observation.astype(np.float32)
+
+    def valid_action_masks(self) -> np.ndarray:
+        """[num_agents, num_actions] bool, same rules as TrafficActionSpace.is_valid_action"""
+        duration = self.phase_duration
+        in_green = self.green_index[np.arange(self.num_agents), self.current_phase] >= 0
+        below_max = duration < self.max_phase_duration
+        above_min = duration >= self.min_phase_duration
+
+        masks = np.zeros((self.num_agents, self.num_actions), dtype=np.bool_)
+        masks[:, 0] = below_max | ~in_green
+        masks[:, 1] = below_max & in_green
+        masks[:, 2] = above_min & in_green
+        current_green = self.green_index[np.arange(self.num_agents), self.current_phase]
+        switch = self.has_green & (above_min & in_green)[:, np.newaxis]
+        switch &= np.arange(self.max_greens)[np.newaxis, :] != current_green[:, np.newaxis]
+        masks[:, 3:] = switch
+        # Keep at least one action available
+        masks[~masks.any(axis=1), 0] = True
+        return masks
+
+    def close(self):
+        if self.running:
+            try:
+                self.sim.close()
+            except Exception as e:
+                print(f"[WARN] SUMO close: {e}")
+            self.running = False
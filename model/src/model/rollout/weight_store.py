@@ -0,0 +1,171 @@
+import os
+import glob
+import json
+import numpy as np
+import torch
+from multiprocessing import shared_memory
+from typing import Dict, List, Optional, Tuple
+
+from ..agents.lstm_policy import unique_policy_networks
+
+LATEST_FILE = 'latest.json'
+
+# (version, {agent_id: state_dict}) as returned by read()
+Weights = Tuple[int, Dict[str, Dict[str, torch.Tensor]]]
+
+
+def _parameter_layout(policy_networks) -> List[tuple]:
+    """(agent_id, name, shape, offset) of every state_dict entry in one flat vector"""
+    layout, offset = [], 0
+    for agent_id, network in unique_policy_networks(policy_networks).items():
+        for name, value in network.state_dict().items():
+            layout.append((agent_id, name, tuple(value.shape), offset))
+            offset += value.numel()
+    return layout
+
+
+class SharedWeightStore:
+    """
+    Versioned policy weights in one shared memory block.
+
+    The learner publishes every policy network as a flat float32 vector;
+    actors copy it out whenever the version moved. A sequence counter in
+    the header (odd while a write is in progress) lets readers detect torn
+    copies and retry, so neither side ever takes a lock or waits on the
+    other.
+    """
+
+    kind = 'shared'
+
+    def __init__(self, layout: List[tuple], name: Optional[str] = None):
+        self.layout = layout
+        _, _, shape, offset = layout[-1]
+        self.size = offset + int(np.prod(shape))
+
+        self.owner = name is None
+        self.memory = shared_memory.SharedMemory(name=name, create=self.owner, size=16 + 4 * self.size)
+        self.header = np.ndarray(2, dtype=np.int64, buffer=self.memory.buf)  # sequence, version
+        self.flat = np.ndarray(self.size, dtype=np.float32, buffer=self.memory.buf, offset=16)
+        if self.owner:
+            self.header[:] = 0
+
+    @classmethod
+    def for_networks(cls, policy_networks) -> 'SharedWeightStore':
+        return cls(_parameter_layout(policy_networks))
+
+    def spec(self) -> dict:
+        return {'kind': self.kind, 'name': self.memory.name, 'layout': self.layout}
+
+    @property
+    def version(self) -> int:
+        return int(self.header[1])
+
+    def publish(self, coordinator) -> int:
+        """Write the coordinator's current policy weights as the next version"""
+        coordinator.load_pending_policies()
+        networks = unique_policy_networks(coordinator.policy_networks)
+        state_dicts = {agent_id: network.state_dict() for agent_id, network in networks.items()}
+
+        self.header[0] += 1
+        for agent_id, name, shape, offset in self.layout:
+            value = state_dicts[agent_id][name]
+            self.flat[offset:offset + value.numel()] = value.detach().reshape(-1).cpu().numpy()
+        self.header[1] += 1
+        self.header[0] += 1
+        return self.version
+
+    def read(self, after_version: int = 0) -> Optional[Weights]:
+        """Newest weights if newer than after_version, else None"""
+        sequence = int(self.header[0])
+        version = int(self.header[1])
+        if sequence % 2 or version <= after_version:
+            return None
+        flat = self.flat.copy()
+        if int(self.header[0]) != sequence:
+            return None  # written meanwhile; the caller retries later
+
+        state_dicts = {}
+        for agent_id, name, shape, offset in self.layout:
+            size = int(np.prod(shape))
+            state_dicts.setdefault(agent_id, {})[name] = torch.from_numpy(flat[offset:offset + size].reshape(shape))
+        return version, state_dicts
+
+    def close(self):
+        self.header = self.flat = None
+        self.memory.close()
+        if self.owner:
+            self.memory.unlink()
+
+
+class FileWeightStore:
+    """
+    Versioned weights as save_models checkpoints in a directory.
+
+    publish() writes policy-{version}.pt with the coordinator's save_models
+    and then atomically repoints latest.json at it; actors on this or other
+    machines load the policy networks of the newest checkpoint. The `keep`
+    most recent checkpoints are retained, so a reader never loses the file
+    it is loading to cleanup.
+    """
+
+    kind = 'files'
+
+    def __init__(self, directory: str, keep: int = 3):
+        self.directory = directory
+        self.keep = keep
+        os.makedirs(directory, exist_ok=True)
+
+    def spec(self) -> dict:
+        return {'kind': self.kind, 'directory': self.directory, 'keep': self.keep}
+
+    @property
+    def latest_path(self) -> str:
+        return os.path.join(self.directory, LATEST_FILE)
+
+    def _latest(self) -> Optional[dict]:
+        try:
+            with open(self.latest_path) as f:
+                return json.load(f)
+        except (OSError, ValueError):
+            return None
+
+    @property
+    def version(self) -> int:
+        latest = self._latest()
+        return latest['version'] if latest else 0
+
+    def publish(self, coordinator) -> int:
+        version = self.version + 1
+        filename = f"policy-{version:08d}.pt"
+        coordinator.save_models(os.path.join(self.directory, filename))
+
+        tmp_path = self.latest_path + '.tmp'
+        with open(tmp_path, 'w') as f:
+            json.dump({'version': version, 'file': filename}, f)
+        os.replace(tmp_path, self.latest_path)
+
+        for old in sorted(glob.glob(os.path.join(self.directory, 'policy-*.pt')))[:-self.keep]:
+            os.remove(old)
+        return version
+
+    def read(self, after_version: int = 0) -> Optional[Weights]:
+        latest = self._latest()
+        if latest is None or latest['version'] <= after_version:
+            return None
+        try:
+            checkpoint = torch.load(os.path.join(self.directory, latest['file']), map_location='cpu')
+        except (OSError, RuntimeError, EOFError):
+            return None
+        return latest['version'], checkpoint['policy_networks']
+
+    def close(self):
+        pass
+
+
+def open_weight_store(spec: dict):
+    """Reader side of a store from its spec() (e.g. in an actor process)"""
+    if spec['kind'] == SharedWeightStore.kind:
+        return SharedWeightStore(spec['layout'], name=spec['name'])
+    if spec['kind'] == FileWeightStore.kind:
+        return FileWeightStore(spec['directory'], keep=spec['keep'])
+    raise ValueError(f"Unknown weight store: {spec['kind']}")
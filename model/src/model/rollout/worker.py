@@ -0,0 +1,147 @@
+import queue
+import traceback
+import dataclasses
+import numpy as np
+import torch
+from typing import Callable, Dict, List
+
+from ..agents.lstm_policy import build_policy_networks
+from ..agents.batched_policy import build_policy_groups
+from .shared_trajectory import SharedTrajectory
+from .weight_store import open_weight_store
+
+POLL_SECONDS = 0.5
+
+
+class PolicyActor:
+    """
+    CPU copy of the policy networks acting for all agents of one environment.
+
+    Agents follow the order of agent_ids (the coordinator's order), so an
+    environment step is one [num_agents] row. Each architecture group runs
+    one batched forward pass and keeps its LSTM state as stacked tensors.
+    The copy is read-only: refresh() pulls newer weights from a weight store.
+    """
+
+    def __init__(self, agent_ids: List[str], agent_configs: Dict, action_space_sizes: Dict[str, int],
+                 parameter_sharing: bool = False, agent_embedding_dim: int = 16):
+        self.agent_ids = list(agent_ids)
+        self.networks = build_policy_networks(
+            {agent_id: dataclasses.replace(agent_configs[agent_id], device='cpu') for agent_id in self.agent_ids},
+            action_space_sizes, parameter_sharing, agent_embedding_dim
+        )
+        for network in self.networks.values():
+            network.eval()
+        self.groups = build_policy_groups(self.networks)
+        self.version = 0
+        index = {agent_id: i for i, agent_id in enumerate(self.agent_ids)}
+        self.group_positions = [
+            torch.tensor([index[agent_id] for agent_id in group.agent_ids]) for group in self.groups
+        ]
+        self.reset_hidden()
+
+    def load_state_dicts(self, state_dicts: Dict[str, dict]):
+        for agent_id, state_dict in state_dicts.items():
+            self.networks[agent_id].load_state_dict(state_dict)
+        for group in self.groups:
+            group.sync()
+
+    def refresh(self, weight_store) -> bool:
+        """Load the store's newest weights if they are newer than ours"""
+        weights = weight_store.read(self.version)
+        if weights is None:
+            return False
+        self.version, state_dicts = weights
+        self.load_state_dicts(state_dicts)
+        return True
+
+    def reset_hidden(self):
+        self.hidden = [group.zero_hidden(len(group)) for group in self.groups]
+
+    @torch.no_grad()
+    def act(self, observations: np.ndarray, valid_masks: np.ndarray, advance: bool = True):
+        """Sample actions for [num_agents, state] observations; returns actions, log_probs, values"""
+        observations = torch.from_numpy(observations)
+        valid_masks = torch.from_numpy(valid_masks)
+        num_agents = len(self.agent_ids)
+        actions = torch.zeros(num_agents, dtype=torch.long)
+        log_probs = torch.zeros(num_agents)
+        values = torch.zeros(num_agents)
+
+        for g, (group, positions) in enumerate(zip(self.groups, self.group_positions)):
+            logits, value, hidden = group.forward(observations[positions], self.hidden[g])
+            logits = logits.masked_fill(~valid_masks[positions, :group.action_space_size], -1e8)
+            dist = torch.distributions.Categorical(logits=logits)
+            action = dist.sample()
+            actions[positions] = action
+            log_probs[positions] = dist.log_prob(action)
+            values[positions] = value.squeeze(-1)
+            if advance:
+                self.hidden[g] = hidden
+
+        return actions.numpy(), log_probs.numpy(), values.numpy()
+
+
+def rollout_worker(worker_id: int, env_factory: Callable, env_kwargs: dict,
+                   agent_ids: List[str], agent_configs: Dict, action_space_sizes: Dict[str, int],
+                   policy_options: dict, slot_specs: List[dict], free_slots, ready, weight_store_spec: dict, stop):
+    """
+    Worker process main: step one environment and fill shared trajectory slots.
+
+    Loop: take a free slot, refresh to the newest published weights, write `horizon` steps (plus the bootstrap values of the state after the
+    last one) and announce (worker_id, slot, steps, weights version) on the
+    ready queue. Episodes restart inside a segment; dones mark the cut.
+    Failures are reported on the ready queue instead of dying silently.
+    """
+    env = None
+    weight_store = None
+    slots = []
+    try:
+        torch.set_num_threads(1)
+        slots = [SharedTrajectory.attach(spec) for spec in slot_specs]
+        weight_store = open_weight_store(weight_store_spec)
+        actor = PolicyActor(agent_ids, agent_configs, action_space_sizes, **policy_options)
+        while not actor.refresh(weight_store):
+            if stop.wait(POLL_SECONDS):
+                return
+
+        env = env_factory(agent_ids=agent_ids, **env_kwargs)
+        observations, valid_masks = env.reset()
+
+        while not stop.is_set():
+            try:
+                slot_index = free_slots.get(timeout=POLL_SECONDS)
+            except queue.Empty:
+                continue
+
+            actor.refresh(weight_store)
+            arrays = slots[slot_index].arrays
+            horizon = arrays['actions'].shape[0]
+            for t in range(horizon):
+                actions, log_probs, values = actor.act(observations, valid_masks)
+                next_observations, rewards, done, next_masks = env.step(actions)
+
+                arrays['states'][t] = observations
+                arrays['actions'][t] = actions
+                arrays['rewards'][t] = rewards
+                arrays['values'][t] = values
+                arrays['log_probs'][t] = log_probs
+                arrays['dones'][t] = done
+                arrays['valid_masks'][t] = valid_masks
+
+                if done:
+                    next_observations, next_masks = env.reset()
+                    actor.reset_hidden()
+                observations, valid_masks = next_observations, next_masks
+
+            _, _, arrays['last_values'][:] = actor.act(observations, valid_masks, advance=False)
+            ready.put((worker_id, slot_index, horizon, actor.version))
+    except Exception:
+        ready.put((worker_id, None, traceback.format_exc(), None))
+    finally:
+        if env is not None:
+            env.close()
+        if weight_store is not None:
+            weight_store.close()
+        for slot in slots:
+            slot.close()
@@ -0,0 +1,121 @@
+import os
+import torch
+from typing import Dict, Optional
+
+from .sharded_checkpoint import ShardedCheckpoint
+
+# Checkpoint entries holding network state_dicts (per agent, or one network)
+POLICY_KEY = 'policy_networks'
+CRITIC_KEY = 'shared_critic'
+
+
+def _is_matrix_weight(name: str, value: torch.Tensor) -> bool:
+    """Weights of Linear/LSTM/Embedding layers (LayerNorm weights are 1-D)"""
+    return value.dim() == 2 and 'weight' in name.rsplit('.', 1)[-1] and value.is_floating_point()
+
+
+def prune_magnitude(value: torch.Tensor, amount: float) -> torch.Tensor:
+    """Zero the `amount` fraction of entries with the smallest magnitude"""
+    k = int(amount * value.numel())
+    if k < 1:
+        return value
+    threshold = value.abs().flatten().kthvalue(k).values
+    return value.masked_fill(value.abs() <= threshold, 0.0)
+
+
+def quantize_int8(value: torch.Tensor) -> Dict[str, torch.Tensor]:
+    """Symmetric per-output-row int8 with float scales"""
+    scale = value.abs().amax(dim=1).clamp(min=1e-12) / 127.0
+    quantized = torch.round(value / scale.unsqueeze(1)).clamp(-127, 127).to(torch.int8)
+    return {'int8': quantized, 'scale': scale.float()}
+
+
+def compress_state_dict(state_dict: Dict[str, torch.Tensor], quantize: bool = True, prune_amount: float = 0.0,
+                        fp16: bool = False) -> dict:
+    """
+    Compress one network state_dict: optionally magnitude-prune and int8
+    quantize the matrix weights, and store the remaining float tensors
+    (all of them without quantize) as float16.
+    """
+    compressed = {}
+    for name, value in state_dict.items():
+        value = value.detach().cpu()
+        if _is_matrix_weight(name, value):
+            if prune_amount > 0:
+                value = prune_magnitude(value, prune_amount)
+            if quantize:
+                compressed[name] = quantize_int8(value)
+                continue
+        if fp16 and value.is_floating_point():
+            value = value.half()
+        compressed[name] = value
+    return compressed
+
+
+def decompress_state_dict(state_dict: dict, map_location=None) -> Dict[str, torch.Tensor]:
+    """float32 state_dict from compress_state_dict output"""
+    decompressed = {}
+    for name, value in state_dict.items():
+        if isinstance(value, dict):
+            value = value['int8'].float() * value['scale'].unsqueeze(1)
+        elif value.is_floating_point():
+            value = value.float()
+        decompressed[name] = value.to(map_location) if map_location is not None else value
+    return decompressed
+
+
+def compress_checkpoint(checkpoint_path: str, output_path: str, quantize: bool = True,
+                        prune_amount: float = 0.0, fp16: bool = False) -> dict:
+    """
+    Post-training compression of a save_models checkpoint (policies and the
+    shared critic). The result loads with load_models / load_checkpoint,
+    which restore float32 weights.
+    """
+    checkpoint = load_checkpoint(checkpoint_path)
+    if 'compression' in checkpoint:
+        raise ValueError(f"{checkpoint_path} is already compressed")
+
+    options = {'quantize': quantize, 'prune_amount': prune_amount, 'fp16': fp16}
+    checkpoint[POLICY_KEY] = {
+        agent_id: compress_state_dict(state_dict, **options)
+        for agent_id, state_dict in checkpoint[POLICY_KEY].items()
+    }
+    checkpoint[CRITIC_KEY] = compress_state_dict(checkpoint[CRITIC_KEY], **options)
+    checkpoint['compression'] = options
+    torch.save(checkpoint, output_path)
+    return checkpoint
+
+
+def load_checkpoint(filepath: str, map_location=None) -> dict:
+    """torch.load a save_models checkpoint (file or sharded directory), decompressing it if needed"""
+    if os.path.isdir(filepath):
+        return ShardedCheckpoint(filepath, map_location).to_checkpoint()
+    checkpoint = torch.load(filepath, map_location='cpu' if map_location is None else map_location)
+    if 'compression' not in checkpoint:
+        return checkpoint
+
+    checkpoint[POLICY_KEY] = {
+        agent_id: decompress_state_dict(state_dict, map_location)
+        for agent_id, state_dict in checkpoint[POLICY_KEY].items()
+    }
+    checkpoint[CRITIC_KEY] = decompress_state_dict(checkpoint[CRITIC_KEY], map_location)
+    return checkpoint
+
+
+def state_dict_nbytes(state_dict: dict) -> int:
+    """Storage of a (possibly compressed) state_dict"""
+    total = 0
+    for value in state_dict.values():
+        if isinstance(value, dict):
+            total += state_dict_nbytes(value)
+        else:
+            total += value.numel() * value.element_size()
+    return total
+
+
+def sparsity(state_dict: Dict[str, torch.Tensor]) -> Optional[float]:
+    """Fraction of zero entries over the matrix weights"""
+    weights = [value for name, value in state_dict.items() if _is_matrix_weight(name, value)]
+    if not weights:
+        return None
+    return sum(int((value == 0).sum()) for value in weights) / sum(value.numel() for value in weights)
@@ -0,0 +1,436 @@
+import os
+import glob
+import json
+import time
+import zlib
+import threading
+import numpy as np
+import torch
+from typing import Dict, Optional
+
+from .experience_buffer import Experience, _to_numpy
+
+INDEX_SUFFIX = '.index.json'
+SEGMENT_SUFFIX = '.seg'
+STEP_INDEX_SUFFIX = '.steps'
+STORE_VERSION = 4
+# Stored decision steps: writer id in the high bits, run-offset step below
+STEP_BITS = 40
+
+
+def writer_step_base(writer: str) -> int:
+    """Step namespace of a writer, so rows of different writers never share a step"""
+    return (zlib.crc32(writer.encode()) & 0x7FFFFF) << STEP_BITS
+
+
+def record_dtype(state_shape, num_actions: Optional[int] = None) -> np.dtype:
+    """One transition as a fixed-size record; field names match ExperienceBuffer columns"""
+    fields = [
+        ('states', np.float32, tuple(state_shape)),
+        ('actions', np.int64),
+        ('rewards', np.float32),
+        ('values', np.float32),
+        ('log_probs', np.float32),
+        ('dones', np.bool_),
+        ('agent_indices', np.int32),
+        ('steps', np.int64),
+    ]
+    if num_actions:
+        fields.append(('valid_masks', np.bool_, (num_actions,)))
+    return np.dtype(fields)
+
+
+class DiskReplayStore:
+    """
+    Disk-backed replay store for runs that outgrow RAM or must survive restarts.
+
+    Transitions are appended to fixed-size segment files opened with
+    np.memmap; each writer (e.g. one per rollout worker process) owns its
+    segments and a small JSON index header listing them with their
+    committed row counts. Readers map every writer's segments and sample
+    rows by random access, so only the sampled pages are read from disk.
+
+    The header is rewritten (atomically) on flush(), which happens every
+    flush_interval rows and when a segment fills up. After a crash, rows
+    written after the last flush are ignored and overwritten; everything
+    committed before is reused when the store is reopened.
+
+    Same push/sample/gather_global interface as ExperienceBuffer, so the
+    coordinator can use either. Decision steps are stored namespaced by
+    writer and offset past the last step of the writer's previous runs, so
+    gather_global() never merges rows of different writers or of a resumed
+    run into one joint state. Each writer also appends a (step, agent) ->
+    row index to memmapped files of index_steps steps each; gather_global()
+    looks steps up there, so nothing is scanned or held in RAM per step.
+    """
+
+    def __init__(self, directory: str, writer: str = 'main', segment_size: int = 1_000_000,
+                 flush_interval: int = 10_000, refresh_interval: float = 5.0, num_agents: int = 1,
+                 index_steps: int = 65_536):
+        self.directory = directory
+        self.writer = writer
+        self.num_agents = num_agents
+        self.index_steps = index_steps
+        self.segment_size = segment_size
+        self.flush_interval = flush_interval
+        self.refresh_interval = refresh_interval
+        self.lock = threading.Lock()
+        os.makedirs(directory, exist_ok=True)
+
+        self.state_shape = None
+        self.num_actions = None
+        self.dtype = None
+        self.segments = []  # this writer's segments: [{"file", "count"}]
+        self._write_map = None
+        self._unflushed = 0
+        # Steps of this run start after every step stored by earlier runs
+        self.step_base = writer_step_base(writer)
+        self.step_offset = 0
+        self._next_step = 0
+
+        self._readers: Dict[str, np.memmap] = {}
+        self._other_segments = []
+        self._read_paths = []
+        self._offsets = np.zeros(1, dtype=np.int64)
+        self._last_refresh = 0.0
+
+        # Step namespace -> writer whose step index and segments to read
+        self._writers: Dict[int, dict] = {}
+        self._step_index_maps: Dict[str, np.memmap] = {}
+
+        self._load_header()
+        self.refresh()
+
+    # ------------------------------------------------------------------
+    # Header
+    # ------------------------------------------------------------------
+
+    @property
+    def header_path(self) -> str:
+        return os.path.join(self.directory, f"{self.writer}{INDEX_SUFFIX}")
+
+    def _load_header(self):
+        if not os.path.exists(self.header_path):
+            return
+        with open(self.header_path) as f:
+            header = json.load(f)
+        if header.get('version') != STORE_VERSION:
+            raise ValueError(f"Unsupported replay store version in {self.header_path}")
+        if header['num_agents'] != self.num_agents:
+            raise ValueError(f"Replay store {self.header_path} was written for {header['num_agents']} agents")
+        self._set_schema(header['state_shape'], header['num_actions'])
+        self.segment_size = header['segment_size']
+        self.index_steps = header['index_steps']
+        self.segments = header['segments']
+        self.step_offset = self._next_step = header['next_step']
+
+    def _write_header(self):
+        header = {
+            'version': STORE_VERSION,
+            'state_shape': list(self.state_shape),
+            'num_actions': self.num_actions,
+            'segment_size': self.segment_size,
+            'num_agents': self.num_agents,
+            'index_steps': self.index_steps,
+            'segments': self.segments,
+            'next_step': self._next_step
+        }
+        tmp_path = self.header_path + '.tmp'
+        with open(tmp_path, 'w') as f:
+            json.dump(header, f)
+        os.replace(tmp_path, self.header_path)
+
+    def _set_schema(self, state_shape, num_actions):
+        self.state_shape = tuple(state_shape)
+        self.num_actions = num_actions
+        self.dtype = record_dtype(self.state_shape, num_actions)
+
+    # ------------------------------------------------------------------
+    # Writing
+    # ------------------------------------------------------------------
+
+    def push(self, experience: Experience, agent_index: int = 0, step: int = -1):
+        """Append one experience"""
+        valid_mask = None if experience.valid_mask is None else _to_numpy(experience.valid_mask)[np.newaxis]
+        self.push_batch(
+            states=_to_numpy(experience.state)[np.newaxis],
+            actions=_to_numpy(experience.action).reshape(1),
+            rewards=_to_numpy(experience.reward).reshape(1),
+            values=_to_numpy(experience.value).reshape(1),
+            log_probs=_to_numpy(experience.log_prob).reshape(1),
+            dones=_to_numpy(experience.done).reshape(1),
+            agent_indices=np.array([agent_index]),
+            valid_masks=valid_mask,
+            steps=np.array([step])
+        )
+
+    def push_batch(self, states, actions, rewards, values, log_probs, dones, agent_indices,
+                   valid_masks=None, steps=None):
+        """Append N transitions (arrays with a leading dimension N)"""
+        batch = {
+            'states': _to_numpy(states), 'actions': _to_numpy(actions), 'rewards': _to_numpy(rewards),
+            'values': _to_numpy(values), 'log_probs': _to_numpy(log_probs), 'dones': _to_numpy(dones),
+            'agent_indices': _to_numpy(agent_indices)
+        }
+        if valid_masks is not None:
+            batch['valid_masks'] = _to_numpy(valid_masks)
+        with self.lock:
+            local_steps = None
+            if steps is not None:
+                steps = _to_numpy(steps).astype(np.int64)
+                indexed = steps >= 0
+                if indexed.any():
+                    self._next_step = max(self._next_step, self.step_offset + int(steps[indexed].max()) + 1)
+                local_steps = np.where(indexed, self.step_offset + steps, -1)
+                batch['steps'] = np.where(indexed, self.step_base + local_steps, -1)
+
+            if self.dtype is None:
+                num_actions = batch['valid_masks'].shape[-1] if valid_masks is not None else None
+                self._set_schema(batch['states'].shape[1:], num_actions)
+
+            records = np.zeros(len(batch['states']), dtype=self.dtype)
+            for name in self.dtype.names:
+                if name in batch:
+                    records[name] = batch[name]
+                else:
+                    records[name] = -1 if name == 'steps' else True
+
+            written = 0
+            while written < len(records):
+                segment = self._writable_segment()
+                start = segment['count']
+                count = min(self.segment_size - start, len(records) - written)
+                self._write_map[start:start + count] = records[written:written + count]
+                if local_steps is not None:
+                    self._index_rows(
+                        local_steps[written:written + count],
+                        batch['agent_indices'][written:written + count],
+                        ((len(self.segments) - 1) << 32) | np.arange(start, start + count, dtype=np.int64)
+                    )
+                segment['count'] += count
+                written += count
+                if segment['count'] == self.segment_size:
+                    self._flush()
+
+            self._unflushed += len(records)
+            if self._unflushed >= self.flush_interval:
+                self._flush()
+            self._refresh_offsets()
+
+    def _writable_segment(self) -> dict:
+        """Current segment with free rows, opening or creating its file as needed"""
+        if self.segments and self.segments[-1]['count'] < self.segment_size:
+            segment = self.segments[-1]
+            if self._write_map is None:
+                path = os.path.join(self.directory, segment['file'])
+                self._write_map = np.memmap(path, dtype=self.dtype, mode='r+', shape=(self.segment_size,))
+                self._readers[path] = self._write_map
+            return segment
+
+        segment = {'file': f"{self.writer}-{len(self.segments):05d}{SEGMENT_SUFFIX}", 'count': 0}
+        path = os.path.join(self.directory, segment['file'])
+        self._write_map = np.memmap(path, dtype=self.dtype, mode='w+', shape=(self.segment_size,))
+        self._readers[path] = self._write_map
+        self.segments.append(segment)
+        return segment
+
+    def _index_rows(self, local_steps: np.ndarray, agent_indices: np.ndarray, locations: np.ndarray):
+        """Record where each (step, agent) row went; 0 marks a missing row, so locations are stored + 1"""
+        agents = agent_indices.astype(np.int64)
+        keep = (local_steps >= 0) & (agents >= 0) & (agents < self.num_agents)
+        local_steps, agents, locations = local_steps[keep], agents[keep], locations[keep]
+        files = local_steps // self.index_steps
+        for file_number in np.unique(files):
+            selected = files == file_number
+            step_index = self._step_index(self.writer, int(file_number), self.index_steps, create=True)
+            step_index[local_steps[selected] % self.index_steps, agents[selected]] = locations[selected] + 1
+
+    def _step_index(self, writer: str, file_number: int, index_steps: int,
+                    create: bool = False) -> Optional[np.memmap]:
+        """[index_steps, num_agents] row locations of a writer's steps, mapped on first use"""
+        path = os.path.join(self.directory, f"{writer}-{file_number:05d}{STEP_INDEX_SUFFIX}")
+        step_index = self._step_index_maps.get(path)
+        if step_index is None:
+            if create:
+                mode = 'r+' if os.path.exists(path) else 'w+'
+            elif os.path.exists(path) and os.path.getsize(path) >= index_steps * self.num_agents * 8:
+                mode = 'r'
+            else:
+                return None  # not written yet (or still being created by its writer)
+            step_index = np.memmap(path, dtype=np.int64, mode=mode, shape=(index_steps, self.num_agents))
+            self._step_index_maps[path] = step_index
+        return step_index
+
+    def flush(self):
+        """Make every appended row durable and visible to other processes"""
+        with self.lock:
+            self._flush()
+
+    def _flush(self):
+        if self._write_map is not None:
+            self._write_map.flush()
+            if self.segments[-1]['count'] == self.segment_size:
+                self._write_map = None
+        for step_index in self._step_index_maps.values():
+            if step_index.mode != 'r':
+                step_index.flush()
+        if self.dtype is not None:
+            self._write_header()
+        self._unflushed = 0
+
+    def close(self):
+        self.flush()
+        with self.lock:
+            self._readers.clear()
+            self._step_index_maps.clear()
+            self._write_map = None
+
+    # ------------------------------------------------------------------
+    # Reading
+    # ------------------------------------------------------------------
+
+    def refresh(self):
+        """Pick up segments committed by other writers since the last refresh"""
+        with self.lock:
+            self._refresh_offsets(reload=True)
+
+    def _refresh_offsets(self, reload: bool = False):
+        segments = []
+        if reload:
+            self._last_refresh = time.monotonic()
+            for header_path in sorted(glob.glob(os.path.join(self.directory, f"*{INDEX_SUFFIX}"))):
+                if header_path == self.header_path:
+                    continue
+                with open(header_path) as f:
+                    header = json.load(f)
+                if self.dtype is None:
+                    self._set_schema(header['state_shape'], header['num_actions'])
+                writer = os.path.basename(header_path)[:-len(INDEX_SUFFIX)]
+                self._writers[writer_step_base(writer) >> STEP_BITS] = self._writer_entry(writer, header)
+                segments.extend(
+                    (os.path.join(self.directory, s['file']), s['count'], header['segment_size'])
+                    for s in header['segments']
+                )
+            self._other_segments = segments
+        else:
+            segments = list(self._other_segments)
+
+        # This writer's own rows are visible before they are flushed
+        self._writers[self.step_base >> STEP_BITS] = self._writer_entry(self.writer, {
+            'segment_size': self.segment_size, 'num_agents': self.num_agents,
+            'index_steps': self.index_steps, 'segments': self.segments
+        })
+        segments.extend(
+            (os.path.join(self.directory, s['file']), s['count'], self.segment_size) for s in self.segments
+        )
+        segments = [segment for segment in segments if segment[1] > 0]
+        self._read_paths = [(path, size) for path, _, size in segments]
+        self._offsets = np.concatenate([[0], np.cumsum([count for _, count, _ in segments])]).astype(np.int64)
+
+    def _writer_entry(self, writer: str, header: dict) -> dict:
+        """What gather_global needs to resolve a writer's steps to committed rows"""
+        return {
+            'writer': writer,
+            'segment_size': header['segment_size'],
+            'index_steps': header['index_steps'],
+            'usable': header['num_agents'] == self.num_agents,
+            'files': [os.path.join(self.directory, s['file']) for s in header['segments']],
+            'counts': np.array([s['count'] for s in header['segments']], dtype=np.int64)
+        }
+
+    def _reader(self, path: str, size: int) -> np.memmap:
+        reader = self._readers.get(path)
+        if reader is None:
+            reader = np.memmap(path, dtype=self.dtype, mode='r', shape=(size,))
+            self._readers[path] = reader
+        return reader
+
+    def gather(self, indices: np.ndarray) -> Dict[str, torch.Tensor]:
+        """Rows at global `indices`, read segment by segment"""
+        indices = np.asarray(indices, dtype=np.int64)
+        with self.lock:
+            records = np.empty(len(indices), dtype=self.dtype)
+            segment_ids = np.searchsorted(self._offsets, indices, side='right') - 1
+            for segment_id in np.unique(segment_ids):
+                selected = np.flatnonzero(segment_ids == segment_id)
+                path, size = self._read_paths[segment_id]
+                rows = indices[selected] - self._offsets[segment_id]
+                records[selected] = self._reader(path, size)[rows]
+
+        batch = {name: torch.from_numpy(np.ascontiguousarray(records[name])) for name in self.dtype.names}
+        batch['indices'] = torch.from_numpy(indices)
+        return batch
+
+    def gather_global(self, steps) -> Dict[str, torch.Tensor]:
+        """
+        Joint transitions of all agents at the given (stored) decision steps,
+        as ExperienceBuffer.gather_global: states [B, num_agents * state],
+        rewards [B, num_agents], steps [B]. Steps missing any agent's
+        committed row are dropped.
+        """
+        steps = np.unique(_to_numpy(steps).astype(np.int64))
+        steps = steps[steps >= 0]
+        with self.lock:
+            records = np.zeros((len(steps), self.num_agents), dtype=self.dtype) if self.dtype is not None else None
+            found = np.zeros((len(steps), self.num_agents), dtype=np.bool_)
+            namespaces = steps >> STEP_BITS
+            for namespace in np.unique(namespaces):
+                writer = self._writers.get(int(namespace))
+                if writer is None or not writer['usable']:
+                    continue
+                selected = np.flatnonzero(namespaces == namespace)
+                local_steps = steps[selected] - (int(namespace) << STEP_BITS)
+                self._read_steps(writer, local_steps, records, found, selected)
+
+            # Rows the index points at must be committed and still hold that step
+            # (uncommitted rows of a crashed run are overwritten after resuming)
+            complete = found.all(axis=1)
+            if records is not None:
+                complete &= (records['steps'] == steps[:, None]).all(axis=1)
+                complete &= (records['agent_indices'] == np.arange(self.num_agents)).all(axis=1)
+            if not complete.any():
+                return {'states': torch.zeros(0), 'rewards': torch.zeros(0, self.num_agents),
+                        'steps': torch.zeros(0, dtype=torch.int64)}
+            steps, records = steps[complete], records[complete]
+
+        return {
+            'states': torch.from_numpy(np.ascontiguousarray(records['states']).reshape(len(steps), -1)),
+            'rewards': torch.from_numpy(np.ascontiguousarray(records['rewards'])),
+            'steps': torch.from_numpy(steps)
+        }
+
+    def _read_steps(self, writer: dict, local_steps: np.ndarray, records: np.ndarray,
+                    found: np.ndarray, selected: np.ndarray):
+        """Fill records[selected] with the committed rows the writer's step index points at"""
+        locations = np.zeros((len(local_steps), self.num_agents), dtype=np.int64)
+        files = local_steps // writer['index_steps']
+        for file_number in np.unique(files):
+            step_index = self._step_index(writer['writer'], int(file_number), writer['index_steps'])
+            if step_index is not None:
+                in_file = files == file_number
+                locations[in_file] = step_index[local_steps[in_file] % writer['index_steps']]
+
+        segment_numbers, rows = (locations - 1) >> 32, (locations - 1) & 0xFFFFFFFF
+        valid = (locations > 0) & (segment_numbers < len(writer['counts']))
+        valid[valid] = rows[valid] < writer['counts'][segment_numbers[valid]]
+        for segment_number in np.unique(segment_numbers[valid]):
+            in_segment = valid & (segment_numbers == segment_number)
+            reader = self._reader(writer['files'][segment_number], writer['segment_size'])
+            step_rows, agents = np.nonzero(in_segment)
+            records[selected[step_rows], agents] = reader[rows[in_segment]]
+        found[selected] = valid
+
+    def sample_indices(self, batch_size: int) -> np.ndarray:
+        size = len(self)
+        if size <= batch_size:
+            return np.arange(size)
+        return np.random.randint(0, size, size=batch_size)
+
+    def sample(self, batch_size: int) -> Dict[str, torch.Tensor]:
+        """Uniform sample over every writer's committed rows"""
+        if time.monotonic() - self._last_refresh > self.refresh_interval:
+            self.refresh()
+        return self.gather(self.sample_indices(batch_size))
+
+    def __len__(self):
+        return int(self._offsets[-1])
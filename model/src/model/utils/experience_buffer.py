@@ -1,45 +1,198 @@
 import numpy as np
-from typing import List
-from collections import deque, namedtuple
+import torch
+from typing import Dict, Optional
 import threading
 from collections import namedtuple
 
 Experience = namedtuple('Experience', [
     'state', 'action', 'reward', 'next_state', 'done',
-    'hidden_state', 'cell_state', 'log_prob', 'value'
-])
+    'hidden_state', 'cell_state', 'log_prob', 'value', 'valid_mask'
+], defaults=(None,))  # valid_mask: optional bool [num_actions] of the allowed actions
+
+
+def _to_numpy(value) -> np.ndarray:
+    if isinstance(value, torch.Tensor):
+        return value.detach().cpu().numpy()
+    return np.asarray(value)
+
 
 class ExperienceBuffer:
-    """Experience buffer cho multi-agent training"""
-    
-    def __init__(self, capacity: int = 10000):
+    """
+    Experience buffer cho multi-agent training.
+
+    Fixed-capacity ring buffer of preallocated column arrays (one row per
+    transition). Columns are allocated on the first push, when the state
+    size is known; after that memory stays at `nbytes` whatever the fill
+    level. Sampling gathers rows by index and returns torch tensors sharing
+    the gathered arrays' memory.
+
+    Transitions pushed with a decision step are also indexed by
+    (step, agent), so gather_global() can assemble the joint state of all
+    agents at the sampled steps for the shared critic.
+    """
+
+    def __init__(self, capacity: int = 10000, num_agents: int = 1):
         self.capacity = capacity
-        self.buffer = deque(maxlen=capacity)
+        self.num_agents = num_agents
         self.lock = threading.Lock()
-    
-    def push(self, experience: Experience):
+        self.position = 0  # next row to write
+        self.size = 0
+        self.columns: Dict[str, np.ndarray] = {}
+
+        # (step % step_slots, agent) -> row; enough slots for every step still in the ring
+        self.step_slots = capacity // num_agents + 2
+        self.step_rows = np.full((self.step_slots, num_agents), -1, dtype=np.int64)
+        self.slot_steps = np.full(self.step_slots, -1, dtype=np.int64)
+
+    def _allocate(self, state_shape, num_actions: Optional[int] = None):
+        self.columns = {
+            'states': np.zeros((self.capacity, *state_shape), dtype=np.float32),
+            'actions': np.zeros(self.capacity, dtype=np.int64),
+            'rewards': np.zeros(self.capacity, dtype=np.float32),
+            'values': np.zeros(self.capacity, dtype=np.float32),
+            'log_probs': np.zeros(self.capacity, dtype=np.float32),
+            'dones': np.zeros(self.capacity, dtype=np.bool_),
+            'agent_indices': np.zeros(self.capacity, dtype=np.int32),
+            'steps': np.full(self.capacity, -1, dtype=np.int64),
+        }
+        if num_actions is not None:
+            self.columns['valid_masks'] = np.ones((self.capacity, num_actions), dtype=np.bool_)
+
+    @property
+    def nbytes(self) -> int:
+        return sum(column.nbytes for column in self.columns.values())
+
+    def push(self, experience: Experience, agent_index: int = 0, step: int = -1):
         """Add experience to buffer"""
+        valid_mask = None if experience.valid_mask is None else _to_numpy(experience.valid_mask)[np.newaxis]
+        self.push_batch(
+            states=_to_numpy(experience.state)[np.newaxis],
+            actions=_to_numpy(experience.action).reshape(1),
+            rewards=_to_numpy(experience.reward).reshape(1),
+            values=_to_numpy(experience.value).reshape(1),
+            log_probs=_to_numpy(experience.log_prob).reshape(1),
+            dones=_to_numpy(experience.done).reshape(1),
+            agent_indices=np.array([agent_index]),
+            valid_masks=valid_mask,
+            steps=np.array([step])
+        )
+
+    def push_batch(self, states, actions, rewards, values, log_probs, dones, agent_indices,
+                   valid_masks=None, steps=None):
+        """Add N transitions (arrays with a leading dimension N) in one copy per column.
+        Returns the rows written."""
+        batch = {
+            'states': _to_numpy(states), 'actions': _to_numpy(actions), 'rewards': _to_numpy(rewards),
+            'values': _to_numpy(values), 'log_probs': _to_numpy(log_probs), 'dones': _to_numpy(dones),
+            'agent_indices': _to_numpy(agent_indices)
+        }
+        if valid_masks is not None:
+            batch['valid_masks'] = _to_numpy(valid_masks)
+        if steps is not None:
+            batch['steps'] = _to_numpy(steps)
+        count = len(batch['states'])
+
         with self.lock:
-            self.buffer.append(experience)
-    
-    def sample(self, batch_size: int) -> List[Experience]:
-        """Sample batch of experiences"""
+            if not self.columns:
+                num_actions = batch['valid_masks'].shape[-1] if valid_masks is not None else None
+                self._allocate(batch['states'].shape[1:], num_actions)
+            elif valid_masks is not None and 'valid_masks' not in self.columns:
+                # First masked push: earlier rows allowed every action
+                self.columns['valid_masks'] = np.ones((self.capacity, batch['valid_masks'].shape[-1]), dtype=np.bool_)
+
+            # Keep only what fits; older rows of the batch would be overwritten anyway
+            if count > self.capacity:
+                batch = {name: values[-self.capacity:] for name, values in batch.items()}
+                count = self.capacity
+            rows = (self.position + np.arange(count)) % self.capacity
+            for name, column in self.columns.items():
+                if name in batch:
+                    column[rows] = batch[name]
+                elif name == 'valid_masks':
+                    column[rows] = True
+                elif name == 'steps':
+                    column[rows] = -1
+
+            self.position = (self.position + count) % self.capacity
+            self.size = min(self.size + count, self.capacity)
+            if steps is not None:
+                self._index_steps(rows, batch['steps'], batch['agent_indices'])
+            self._on_write(rows)
+        return rows
+
+    def _index_steps(self, rows: np.ndarray, steps: np.ndarray, agent_indices: np.ndarray):
+        indexed = steps >= 0
+        rows, steps, agent_indices = rows[indexed], steps[indexed], agent_indices[indexed]
+        slots = steps % self.step_slots
+        # A slot reused by a newer step drops the rows of the old one
+        stale = np.unique(slots[self.slot_steps[slots] != steps])
+        self.step_rows[stale] = -1
+        self.slot_steps[slots] = steps
+        self.step_rows[slots, agent_indices] = rows
+
+    def _on_write(self, rows: np.ndarray):
+        """Hook for subclasses, called under the lock after rows are written"""
+
+    def sample_indices(self, batch_size: int) -> np.ndarray:
+        """Uniform row indices, without replacement while the buffer is small"""
+        if self.size <= batch_size:
+            return np.arange(self.size)
+        if batch_size * 4 < self.size:
+            # Duplicates are rare here, and randint is O(batch) where choice(replace=False) is O(size)
+            return np.random.randint(0, self.size, size=batch_size)
+        return np.random.choice(self.size, batch_size, replace=False)
+
+    def gather(self, indices: np.ndarray) -> Dict[str, torch.Tensor]:
+        """Rows at `indices` as tensors (one gather per column, no further copies)"""
+        with self.lock:
+            batch = {name: torch.from_numpy(column[indices]) for name, column in self.columns.items()}
+        batch['indices'] = torch.from_numpy(np.asarray(indices))
+        return batch
+
+    def gather_global(self, steps) -> Dict[str, torch.Tensor]:
+        """
+        Joint transitions of all agents at the given decision steps:
+        states [B, num_agents * state], rewards [B, num_agents], steps [B].
+        Duplicate steps are merged; steps missing any agent's row are dropped.
+        """
+        steps = np.unique(_to_numpy(steps))
+        steps = steps[steps >= 0]
         with self.lock:
-            if len(self.buffer) < batch_size:
-                return list(self.buffer)
-            
-            indices = np.random.choice(len(self.buffer), batch_size, replace=False)
-            return [self.buffer[i] for i in indices]
-    
-    def get_all(self) -> List[Experience]:
-        """Get all experiences"""
+            if not self.columns or not len(steps):
+                return {'states': torch.zeros(0), 'rewards': torch.zeros(0, self.num_agents),
+                        'steps': torch.zeros(0, dtype=torch.int64)}
+            slots = steps % self.step_slots
+            rows = self.step_rows[slots]  # [B, num_agents]
+            complete = (self.slot_steps[slots] == steps) & (rows >= 0).all(axis=1)
+            steps, rows = steps[complete], rows[complete]
+            # Rows overwritten by the ring since they were indexed
+            current = (self.columns['steps'][rows] == steps[:, np.newaxis]).all(axis=1)
+            steps, rows = steps[current], rows[current]
+
+            states = self.columns['states'][rows]  # [B, num_agents, *state]
+            rewards = self.columns['rewards'][rows]
+        return {
+            'states': torch.from_numpy(states.reshape(len(rows), int(np.prod(states.shape[1:])))),
+            'rewards': torch.from_numpy(rewards),
+            'steps': torch.from_numpy(steps)
+        }
+
+    def sample(self, batch_size: int) -> Dict[str, torch.Tensor]:
+        """Sample batch of experiences as a dict of column tensors"""
+        return self.gather(self.sample_indices(batch_size))
+
+    def get_all(self) -> Dict[str, torch.Tensor]:
+        """All stored rows as tensor views of the buffer (storage order, not time order)"""
         with self.lock:
-            return list(self.buffer)
-    
+            return {name: torch.from_numpy(column[:self.size]) for name, column in self.columns.items()}
+
     def clear(self):
         """Clear buffer"""
         with self.lock:
-            self.buffer.clear()
-    
+            self.position = 0
+            self.size = 0
+            self.step_rows[:] = -1
+            self.slot_steps[:] = -1
+
     def __len__(self):
-        return len(self.buffer)
\ No newline at end of file
+        return self.size
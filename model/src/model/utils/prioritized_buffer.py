@@ -0,0 +1,108 @@
+import numpy as np
+import torch
+from typing import Dict
+
+from .experience_buffer import ExperienceBuffer
+
+
+class SumTree:
+    """
+    Array-based sum tree over `capacity` leaf priorities.
+
+    Node i has children 2i and 2i+1; leaves start at `self.leaves` (capacity
+    rounded up to a power of two). Updates and prefix-sum lookups walk one
+    root-to-leaf path, O(log n), and both are vectorized over a batch.
+    """
+
+    def __init__(self, capacity: int):
+        self.leaves = 1
+        while self.leaves < capacity:
+            self.leaves *= 2
+        self.depth = self.leaves.bit_length() - 1
+        self.tree = np.zeros(2 * self.leaves, dtype=np.float64)
+
+    @property
+    def total(self) -> float:
+        return float(self.tree[1])
+
+    def get(self, indices: np.ndarray) -> np.ndarray:
+        return self.tree[np.asarray(indices) + self.leaves]
+
+    def update(self, indices: np.ndarray, priorities: np.ndarray):
+        nodes = np.asarray(indices, dtype=np.int64) + self.leaves
+        self.tree[nodes] = priorities
+        for _ in range(self.depth):
+            nodes = np.unique(nodes // 2)
+            self.tree[nodes] = self.tree[2 * nodes] + self.tree[2 * nodes + 1]
+
+    def find(self, values: np.ndarray) -> np.ndarray:
+        """Leaf index whose cumulative priority range contains each value"""
+        values = np.array(values, dtype=np.float64)
+        nodes = np.ones(len(values), dtype=np.int64)
+        for _ in range(self.depth):
+            left = self.tree[2 * nodes]
+            go_right = values > left
+            values -= left * go_right
+            nodes = 2 * nodes + go_right
+        return nodes - self.leaves
+
+
+class PrioritizedExperienceBuffer(ExperienceBuffer):
+    """
+    Prioritized replay: rows are sampled with probability p_i^alpha / sum p^alpha.
+
+    New rows get the current maximum priority so they are seen at least
+    once; the trainer reports |TD error| or |advantage| for the sampled rows
+    through update_priorities(). Samples carry importance-sampling weights
+    (N * P(i))^-beta normalized by their maximum; beta anneals towards 1.
+    """
+
+    def __init__(self, capacity: int = 10000, num_agents: int = 1, alpha: float = 0.6, beta: float = 0.4,
+                 beta_increment: float = 1e-4, epsilon: float = 1e-5):
+        super().__init__(capacity, num_agents)
+        self.alpha = alpha
+        self.beta = beta
+        self.beta_increment = beta_increment
+        self.epsilon = epsilon
+        self.max_priority = 1.0
+        self.sum_tree = SumTree(capacity)
+
+    def _on_write(self, rows: np.ndarray):
+        self.sum_tree.update(rows, np.full(len(rows), self.max_priority ** self.alpha))
+
+    def sample(self, batch_size: int) -> Dict[str, torch.Tensor]:
+        """Stratified proportional sample with importance-sampling weights"""
+        with self.lock:
+            size = self.size
+            total = self.sum_tree.total
+            if size == 0 or total <= 0:
+                indices = np.arange(0)
+                probabilities = np.zeros(0)
+            else:
+                segment = total / batch_size
+                values = (np.arange(batch_size) + np.random.uniform(size=batch_size)) * segment
+                indices = np.minimum(self.sum_tree.find(values), size - 1)
+                probabilities = self.sum_tree.get(indices) / total
+            self.beta = min(1.0, self.beta + self.beta_increment)
+            beta = self.beta
+
+        batch = self.gather(indices)
+        weights = (size * np.maximum(probabilities, 1e-12)) ** -beta
+        if len(weights):
+            weights /= weights.max()
+        batch['weights'] = torch.from_numpy(weights.astype(np.float32))
+        return batch
+
+    def update_priorities(self, indices, priorities):
+        """Set the priority of sampled rows from |TD error| or |advantage|"""
+        indices = np.asarray(indices, dtype=np.int64)
+        priorities = np.abs(np.asarray(priorities, dtype=np.float64)) + self.epsilon
+        with self.lock:
+            self.max_priority = max(self.max_priority, float(priorities.max(initial=0.0)))
+            self.sum_tree.update(indices, priorities ** self.alpha)
+
+    def clear(self):
+        super().clear()
+        with self.lock:
+            self.sum_tree.tree[:] = 0.0
+            self.max_priority = 1.0
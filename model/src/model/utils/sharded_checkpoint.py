@@ -0,0 +1,160 @@
+import os
+import json
+import hashlib
+import threading
+import torch
+from typing import Dict, List, Optional
+
+MANIFEST_FILE = 'manifest.json'
+CRITIC_FILE = 'shared_critic.pt'
+COMMON_FILE = 'common.pt'
+FORMAT_VERSION = 1
+
+
+def is_sharded_checkpoint(path: str) -> bool:
+    return os.path.isfile(os.path.join(path, MANIFEST_FILE))
+
+
+def state_dict_digest(state_dict: Dict[str, torch.Tensor]) -> str:
+    """Content hash of a state_dict (names, dtypes, shapes and bytes)"""
+    digest = hashlib.blake2b(digest_size=16)
+    for name, value in state_dict.items():
+        value = value.detach().cpu().contiguous()
+        digest.update(f"{name}:{value.dtype}:{tuple(value.shape)};".encode())
+        digest.update(value.reshape(-1).view(torch.uint8).numpy())
+    return digest.hexdigest()
+
+
+def _shard_file(agent_id: str) -> str:
+    # Junction ids are not always valid file names (e.g. '#' or ':' in SUMO ids)
+    return f"policy-{hashlib.sha1(agent_id.encode()).hexdigest()[:16]}.pt"
+
+
+def _atomic_save(obj, path: str):
+    tmp_path = path + '.tmp'
+    torch.save(obj, tmp_path)
+    os.replace(tmp_path, path)
+
+
+def _read_manifest(directory: str) -> Optional[dict]:
+    try:
+        with open(os.path.join(directory, MANIFEST_FILE)) as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return None
+
+
+def save_sharded_checkpoint(directory: str, policies: Dict[str, Dict[str, torch.Tensor]],
+                            shared_critic: Dict[str, torch.Tensor], common: dict,
+                            policy_agent_ids: Optional[Dict[str, List[str]]] = None) -> List[str]:
+    """
+    Write a checkpoint as a directory: one shard per policy network (keyed
+    by its first agent, like save_models), one for the shared critic, a
+    small common file (coordination matrix, training stats) and a
+    manifest.json with each shard's file and content digest.
+
+    Saving into an existing checkpoint directory only rewrites the shards
+    whose weights changed. Shards are replaced atomically and the manifest
+    is written last, so a reader sees either the old or the new entry of an
+    agent. Returns the names of the shards written.
+    """
+    os.makedirs(directory, exist_ok=True)
+    previous = _read_manifest(directory) or {}
+    policy_agent_ids = policy_agent_ids or {}
+    written = []
+
+    def save_shard(name: str, filename: str, state_dict: dict, entry: Optional[dict]) -> dict:
+        digest = state_dict_digest(state_dict)
+        path = os.path.join(directory, filename)
+        if entry is None or entry['digest'] != digest or not os.path.exists(path):
+            _atomic_save({key: value.detach().cpu() for key, value in state_dict.items()}, path)
+            written.append(name)
+        return {'file': filename, 'digest': digest}
+
+    shards = {}
+    for agent_id, state_dict in policies.items():
+        shards[agent_id] = save_shard(agent_id, _shard_file(agent_id), state_dict,
+                                      previous.get('shards', {}).get(agent_id))
+        shards[agent_id]['agent_ids'] = policy_agent_ids.get(agent_id)
+    critic = save_shard('shared_critic', CRITIC_FILE, shared_critic, previous.get('shared_critic'))
+    _atomic_save(common, os.path.join(directory, COMMON_FILE))
+
+    manifest = {'format_version': FORMAT_VERSION, 'shards': shards, 'shared_critic': critic, 'common': COMMON_FILE}
+    tmp_path = os.path.join(directory, MANIFEST_FILE + '.tmp')
+    with open(tmp_path, 'w') as f:
+        json.dump(manifest, f, indent=2)
+    os.replace(tmp_path, os.path.join(directory, MANIFEST_FILE))
+
+    # Agents no longer in the checkpoint
+    for agent_id, entry in previous.get('shards', {}).items():
+        if agent_id not in shards and os.path.exists(os.path.join(directory, entry['file'])):
+            os.remove(os.path.join(directory, entry['file']))
+    return written
+
+
+class ShardedCheckpoint:
+    """
+    Read side of a checkpoint directory written by save_sharded_checkpoint.
+
+    Nothing but the manifest is read up front: each shard is loaded on
+    first request and cached. Shards are opened with torch.load(mmap=True),
+    so on the CPU their tensors are views of the page cache rather than
+    copies; pages are read from disk when the weights are first touched.
+    """
+
+    def __init__(self, directory: str, map_location=None):
+        self.directory = directory
+        self.map_location = map_location
+        self.manifest = _read_manifest(directory)
+        if self.manifest is None:
+            raise FileNotFoundError(f"No sharded checkpoint manifest in {directory}")
+        self._cache = {}
+        self._lock = threading.Lock()
+
+    @property
+    def owners(self) -> List[str]:
+        """Agents a policy network is stored under"""
+        return list(self.manifest['shards'])
+
+    @property
+    def policy_agent_ids(self) -> Dict[str, List[str]]:
+        """Agents (embedding rows) of each shared network"""
+        return {
+            agent_id: entry['agent_ids']
+            for agent_id, entry in self.manifest['shards'].items() if entry.get('agent_ids') is not None
+        }
+
+    def _load(self, filename: str):
+        with self._lock:
+            if filename not in self._cache:
+                self._cache[filename] = torch.load(
+                    os.path.join(self.directory, filename),
+                    map_location=self.map_location, mmap=True
+                )
+            return self._cache[filename]
+
+    def policy_state_dict(self, agent_id: str) -> Dict[str, torch.Tensor]:
+        return self._load(self.manifest['shards'][agent_id]['file'])
+
+    def critic_state_dict(self) -> Dict[str, torch.Tensor]:
+        return self._load(self.manifest['shared_critic']['file'])
+
+    def common(self) -> dict:
+        return self._load(self.manifest['common'])
+
+    def to_checkpoint(self) -> dict:
+        """Every shard, in the layout of a single-file save_models checkpoint"""
+        checkpoint = {
+            'policy_networks': {agent_id: self.policy_state_dict(agent_id) for agent_id in self.owners},
+            'policy_agent_ids': self.policy_agent_ids,
+            'shared_critic': self.critic_state_dict()
+        }
+        checkpoint.update(self.common())
+        return checkpoint
+
+
+def checkpoint_nbytes(path: str) -> int:
+    """Size on disk of a checkpoint file or directory"""
+    if not os.path.isdir(path):
+        return os.path.getsize(path)
+    return sum(os.path.getsize(os.path.join(path, name)) for name in os.listdir(path))
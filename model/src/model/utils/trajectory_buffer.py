@@ -0,0 +1,104 @@
+import numpy as np
+import torch
+from typing import Dict, Optional
+
+
+class TrajectoryBuffer:
+    """
+    On-policy rollout segment stored as [time, agent] arrays.
+
+    Every step writes one row for all agents at once. When the segment is
+    complete, compute_returns_and_advantages() runs GAE(lambda) as a single
+    reverse scan over time, vectorized across agents, with done masks
+    cutting the bootstrap at episode ends. batch() flattens the segment to
+    [time * agent] tensors for a fully batched PPO update.
+    """
+
+    def __init__(self, horizon: int, num_agents: int, state_shape, num_actions: Optional[int] = None,
+                 gamma: float = 0.99, gae_lambda: float = 0.95):
+        self.horizon = horizon
+        self.num_agents = num_agents
+        self.gamma = gamma
+        self.gae_lambda = gae_lambda
+
+        shape = (horizon, num_agents)
+        self.states = np.zeros((*shape, *state_shape), dtype=np.float32)
+        self.actions = np.zeros(shape, dtype=np.int64)
+        self.rewards = np.zeros(shape, dtype=np.float32)
+        self.values = np.zeros(shape, dtype=np.float32)
+        self.log_probs = np.zeros(shape, dtype=np.float32)
+        self.dones = np.zeros(shape, dtype=np.bool_)
+        self.advantages = np.zeros(shape, dtype=np.float32)
+        self.returns = np.zeros(shape, dtype=np.float32)
+        self.valid_masks = np.ones((*shape, num_actions), dtype=np.bool_) if num_actions else None
+        self.agent_indices = np.broadcast_to(np.arange(num_agents, dtype=np.int32), shape)
+        self.step = 0
+
+    @property
+    def full(self) -> bool:
+        return self.step >= self.horizon
+
+    def add(self, states, actions, rewards, values, log_probs, dones, valid_masks=None):
+        """Store one step for every agent (arrays with a leading agent dimension)"""
+        if self.full:
+            raise ValueError(f"Trajectory segment is full ({self.horizon} steps)")
+        t = self.step
+        self.states[t] = states
+        self.actions[t] = actions
+        self.rewards[t] = rewards
+        self.values[t] = values
+        self.log_probs[t] = log_probs
+        self.dones[t] = dones
+        if self.valid_masks is not None and valid_masks is not None:
+            self.valid_masks[t] = valid_masks
+        self.step += 1
+
+    def compute_returns_and_advantages(self, last_values):
+        """
+        GAE over the stored steps. dones[t] marks that the episode ended with
+        step t (no bootstrap past it); last_values [agent] is the value of the
+        state following the segment.
+        """
+        steps = self.step
+        if steps == 0:
+            raise ValueError("Trajectory segment is empty, nothing to compute returns for")
+        non_terminal = 1.0 - self.dones[:steps].astype(np.float32)
+        next_values = np.empty((steps, self.num_agents), dtype=np.float32)
+        next_values[:-1] = self.values[1:steps]
+        next_values[-1] = np.asarray(last_values, dtype=np.float32)
+        deltas = self.rewards[:steps] + self.gamma * next_values * non_terminal - self.values[:steps]
+
+        gae = np.zeros(self.num_agents, dtype=np.float32)
+        for t in reversed(range(steps)):
+            gae = deltas[t] + self.gamma * self.gae_lambda * non_terminal[t] * gae
+            self.advantages[t] = gae
+
+        self.returns[:steps] = self.advantages[:steps] + self.values[:steps]
+
+    def batch(self) -> Dict[str, torch.Tensor]:
+        """Flattened [steps * agent] tensors (views of the segment where possible)"""
+        steps = self.step
+        columns = {
+            'states': self.states, 'actions': self.actions, 'rewards': self.rewards,
+            'values': self.values, 'log_probs': self.log_probs, 'advantages': self.advantages,
+            'returns': self.returns, 'agent_indices': self.agent_indices
+        }
+        if self.valid_masks is not None:
+            columns['valid_masks'] = self.valid_masks
+        batch = {
+            name: torch.from_numpy(np.ascontiguousarray(values[:steps]).reshape(steps * self.num_agents, *values.shape[2:]))
+            for name, values in columns.items()
+        }
+        batch['indices'] = torch.arange(steps * self.num_agents)
+        return batch
+
+    def global_batch(self) -> Dict[str, torch.Tensor]:
+        """Per-step tensors for the shared critic: states [steps, agent * state], returns [steps, agent]"""
+        steps = self.step
+        return {
+            'global_states': torch.from_numpy(self.states[:steps].reshape(steps, -1)),
+            'returns': torch.from_numpy(self.returns[:steps])
+        }
+
+    def reset(self):
+        self.step = 0
@@ -0,0 +1,59 @@
+import pytest
+import torch
+
+from model.configs.network_config import NetworkConfig
+from model.coordinators.multiagent_coordinator_advance import MultiAgentCoordinatorAdvanced
+
+AGENT_IDS = ['J0', 'J1', 'J2', 'J3']
+
+
+def make_coordinator(**coordination_config) -> MultiAgentCoordinatorAdvanced:
+    torch.manual_seed(0)
+    return MultiAgentCoordinatorAdvanced(
+        {agent_id: NetworkConfig(input_size=6, hidden_size=16, device='cpu') for agent_id in AGENT_IDS},
+        {agent_id: 4 for agent_id in AGENT_IDS},
+        {'enable_coordination': True, **coordination_config}
+    )
+
+
+@pytest.mark.parametrize('training', [True, False])
+def test_coordinated_actions_respect_valid_actions(training):
+    coordinator = make_coordinator()
+    valid_actions = {'J0': [0, 1], 'J1': [2], 'J2': [1, 3], 'J3': [0, 1, 2, 3]}
+
+    for _ in range(50):
+        observations = {agent_id: torch.rand(6) for agent_id in AGENT_IDS}
+        actions_info = coordinator.get_actions(observations, valid_actions, training=training)
+        for agent_id, info in actions_info.items():
+            assert info['coordinated']
+            assert int(info['action']) in valid_actions[agent_id]
+            assert torch.isfinite(info['log_prob']).all()
+        assert int(actions_info['J1']['log_prob']) == 0  # the only valid action
+
+
+def test_coordinated_log_prob_is_consistent_with_the_masked_policy():
+    coordinator = make_coordinator()
+    valid_actions = {agent_id: [0, 1] for agent_id in AGENT_IDS}
+    observations = {agent_id: torch.rand(6) for agent_id in AGENT_IDS}
+    actions_info = coordinator.get_actions(observations, valid_actions, training=False)
+
+    # The action the buffer stores has non-zero probability under evaluate_actions' mask
+    for agent_id, info in actions_info.items():
+        network = coordinator.policy_networks[agent_id]
+        log_probs, _, _ = network.evaluate_actions(
+            observations[agent_id].reshape(1, -1), info['action'], valid_actions=[valid_actions[agent_id]]
+        )
+        assert log_probs.item() > -1e4
+
+
+def test_sparse_coordination_respects_valid_actions():
+    coordinator = make_coordinator()
+    # Same masking path for the CSR operator
+    edges = torch.tensor([[0, 1, 1, 2, 2, 3], [1, 0, 2, 1, 3, 2]])
+    coordinator.neighbour_edges = edges
+    coordinator.coordination_values = torch.full((edges.size(1),), 0.5)
+    coordinator.coordination_matrix = coordinator._sparse_coordination_matrix()
+
+    valid_actions = {agent_id: [3] for agent_id in AGENT_IDS}
+    actions_info = coordinator.get_actions({agent_id: torch.rand(6) for agent_id in AGENT_IDS}, valid_actions)
+    assert all(int(info['action']) == 3 for info in actions_info.values())
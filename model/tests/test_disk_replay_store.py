@@ -0,0 +1,101 @@
+import numpy as np
+
+from model.utils.disk_replay_store import STEP_BITS, DiskReplayStore, writer_step_base
+
+
+def push_steps(store: DiskReplayStore, steps, agents):
+    """One row per agent and step; the state encodes (step, agent)"""
+    for step in steps:
+        count = len(agents)
+        store.push_batch(
+            states=np.array([[step, agent] for agent in agents], dtype=np.float32),
+            actions=np.zeros(count), rewards=np.full(count, float(step)), values=np.zeros(count),
+            log_probs=np.zeros(count), dones=np.zeros(count, dtype=np.bool_),
+            agent_indices=np.array(agents), steps=np.full(count, step)
+        )
+
+
+def test_gather_global_returns_whole_steps(tmp_path):
+    store = DiskReplayStore(str(tmp_path), segment_size=8, num_agents=3)
+    push_steps(store, range(5), agents=[0, 1, 2])  # spans two segments
+    push_steps(store, [5], agents=[0, 2])
+
+    stored_steps = np.unique(store.sample(100)['steps'].numpy())
+    joint = store.gather_global(stored_steps)
+    assert len(joint['steps']) == 5
+    assert joint['states'].shape == (5, 3 * 2)
+    states = joint['states'].reshape(5, 3, 2)
+    assert (states[:, :, 1] == np.arange(3)).all()
+    assert (states[:, :, 0] == joint['rewards']).all()
+
+    # Stored steps are namespaced by writer
+    assert ((joint['steps'].numpy() >> STEP_BITS) << STEP_BITS == writer_step_base('main')).all()
+
+
+def test_writers_and_resumed_runs_do_not_share_steps(tmp_path):
+    first = DiskReplayStore(str(tmp_path), writer='learner', num_agents=2)
+    push_steps(first, range(3), agents=[0, 1])
+    first.close()
+
+    # A second process writes the same decision steps for one agent only
+    other = DiskReplayStore(str(tmp_path), writer='actor', num_agents=2)
+    push_steps(other, range(3), agents=[0])
+    other.flush()
+
+    # The resumed learner restarts its decision steps at 0
+    resumed = DiskReplayStore(str(tmp_path), writer='learner', num_agents=2)
+    assert resumed.step_offset == 3
+    assert len(resumed) == 3 * 2 + 3
+    push_steps(resumed, range(2), agents=[0, 1])
+
+    joint = resumed.gather_global(resumed.gather(np.arange(len(resumed)))['steps'])
+    # 3 steps from the first run, 2 from the resumed one; the actor's partial steps never merge in
+    assert len(joint['steps']) == 5
+    local_steps = joint['steps'].numpy() - writer_step_base('learner')
+    assert local_steps.tolist() == [0, 1, 2, 3, 4]
+    assert joint['rewards'][:, 0].tolist() == [0.0, 1.0, 2.0, 0.0, 1.0]
+
+
+def test_unflushed_rows_are_lost_but_flushed_rows_resume(tmp_path):
+    store = DiskReplayStore(str(tmp_path), flush_interval=1000, num_agents=1)
+    push_steps(store, range(4), agents=[0])
+    store.flush()
+    push_steps(store, range(4, 6), agents=[0])  # never flushed
+
+    resumed = DiskReplayStore(str(tmp_path), flush_interval=1000, num_agents=1)
+    assert len(resumed) == 4
+    assert resumed.step_offset == 4
+
+
+def test_step_index_lives_on_disk(tmp_path):
+    store = DiskReplayStore(str(tmp_path), writer='learner', segment_size=8, num_agents=2, index_steps=4)
+    push_steps(store, range(10), agents=[1, 0])  # 3 index files, 3 segments
+    store.close()
+    assert len(list(tmp_path.glob('learner-*.steps'))) == 3
+
+    # A reader in another process resolves steps through the index files alone
+    reader = DiskReplayStore(str(tmp_path), writer='reader', num_agents=2)
+    steps = writer_step_base('learner') + np.array([9, 0, 5, 42])
+    joint = reader.gather_global(steps)
+    assert (joint['steps'].numpy() - writer_step_base('learner')).tolist() == [0, 5, 9]
+    assert (joint['states'].reshape(3, 2, 2)[:, :, 1] == np.arange(2)).all()
+    assert not hasattr(reader, '_step_rows')
+
+
+def test_index_entries_of_uncommitted_rows_are_ignored(tmp_path):
+    store = DiskReplayStore(str(tmp_path), flush_interval=1000, num_agents=2)
+    push_steps(store, range(4), agents=[0, 1])
+    store.flush()
+    push_steps(store, range(4, 6), agents=[0, 1])  # indexed but never committed
+
+    # The resumed run reuses local steps 4 and 5 for agent 0 only
+    resumed = DiskReplayStore(str(tmp_path), flush_interval=1000, num_agents=2)
+    assert resumed.step_offset == 4
+    push_steps(resumed, range(2), agents=[0])
+    joint = resumed.gather_global(writer_step_base('main') + np.arange(6))
+    assert (joint['steps'].numpy() - writer_step_base('main')).tolist() == [0, 1, 2, 3]
+
+    # Agent 1 completes local step 4 in new rows
+    push_steps(resumed, [0], agents=[1])
+    joint = resumed.gather_global(writer_step_base('main') + np.arange(6))
+    assert (joint['steps'].numpy() - writer_step_base('main')).tolist() == [0, 1, 2, 3, 4]
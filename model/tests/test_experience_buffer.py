@@ -0,0 +1,98 @@
+import numpy as np
+
+from model.utils.experience_buffer import ExperienceBuffer
+
+
+def push_steps(buffer: ExperienceBuffer, steps, num_agents: int, state_size: int = 3):
+    """One row per agent and step; the state encodes (step, agent) for checking"""
+    for step in steps:
+        states = np.array([[step, agent, 0.0][:state_size] for agent in range(num_agents)], dtype=np.float32)
+        buffer.push_batch(
+            states=states,
+            actions=np.full(num_agents, step % 4),
+            rewards=np.arange(num_agents, dtype=np.float32) + step,
+            values=np.zeros(num_agents),
+            log_probs=np.zeros(num_agents),
+            dones=np.zeros(num_agents, dtype=np.bool_),
+            agent_indices=np.arange(num_agents),
+            steps=np.full(num_agents, step)
+        )
+
+
+def test_ring_wraps_around_and_keeps_newest_rows():
+    buffer = ExperienceBuffer(capacity=10, num_agents=2)
+    push_steps(buffer, range(8), num_agents=2)  # 16 rows into 10 slots
+
+    assert len(buffer) == 10
+    assert buffer.position == 16 % 10
+    stored = buffer.get_all()
+    assert sorted(stored['steps'].tolist()) == sorted([3, 3, 4, 4, 5, 5, 6, 6, 7, 7])
+    # Rows stay consistent across columns after wrapping
+    assert (stored['states'][:, 0] == stored['steps'].float()).all()
+    assert (stored['states'][:, 1] == stored['agent_indices'].float()).all()
+
+
+def test_oversized_batch_keeps_its_last_rows():
+    buffer = ExperienceBuffer(capacity=4, num_agents=1)
+    push_steps(buffer, [0], num_agents=1)
+    buffer.push_batch(
+        states=np.arange(18, dtype=np.float32).reshape(6, 3), actions=np.zeros(6), rewards=np.arange(6),
+        values=np.zeros(6), log_probs=np.zeros(6), dones=np.zeros(6, dtype=np.bool_),
+        agent_indices=np.zeros(6)
+    )
+    assert len(buffer) == 4
+    assert sorted(buffer.get_all()['rewards'].tolist()) == [2.0, 3.0, 4.0, 5.0]
+
+
+def test_gather_global_assembles_every_agent_at_a_step():
+    buffer = ExperienceBuffer(capacity=100, num_agents=3)
+    push_steps(buffer, range(5), num_agents=3)
+
+    joint = buffer.gather_global(np.array([4, 1, 1, -1]))
+    assert joint['steps'].tolist() == [1, 4]
+    assert joint['states'].shape == (2, 3 * 3)
+    states = joint['states'].reshape(2, 3, 3)
+    assert (states[:, :, 0] == joint['steps'][:, None].float()).all()
+    assert (states[:, :, 1] == np.arange(3)).all()
+    assert joint['rewards'].tolist() == [[1.0, 2.0, 3.0], [4.0, 5.0, 6.0]]
+
+
+def test_gather_global_drops_incomplete_and_overwritten_steps():
+    buffer = ExperienceBuffer(capacity=6, num_agents=2)
+    push_steps(buffer, range(5), num_agents=2)  # steps 0 and 1 were overwritten by the ring
+
+    # Step 5 only has agent 0
+    buffer.push_batch(
+        states=np.zeros((1, 3), dtype=np.float32), actions=np.zeros(1), rewards=np.zeros(1),
+        values=np.zeros(1), log_probs=np.zeros(1), dones=np.zeros(1, dtype=np.bool_),
+        agent_indices=np.array([0]), steps=np.array([5])
+    )
+
+    joint = buffer.gather_global(np.arange(6))
+    # Step 2 lost agent 0's row to step 5
+    assert joint['steps'].tolist() == [3, 4]
+    assert (joint['states'].reshape(2, 2, 3)[:, :, 0] == joint['steps'][:, None].float()).all()
+
+
+def test_clear_resets_the_step_index():
+    buffer = ExperienceBuffer(capacity=20, num_agents=2)
+    push_steps(buffer, range(3), num_agents=2)
+    buffer.clear()
+    assert len(buffer) == 0
+    assert len(buffer.gather_global(np.arange(3))['steps']) == 0
+
+
+def test_masks_after_unmasked_pushes_are_kept():
+    buffer = ExperienceBuffer(capacity=8, num_agents=1)
+    push_steps(buffer, range(2), num_agents=1)
+    masks = np.array([[True, False, True, False]])
+    buffer.push_batch(
+        states=np.zeros((1, 3), dtype=np.float32), actions=np.zeros(1), rewards=np.zeros(1),
+        values=np.zeros(1), log_probs=np.zeros(1), dones=np.zeros(1, dtype=np.bool_),
+        agent_indices=np.zeros(1), valid_masks=masks
+    )
+
+    stored = buffer.get_all()['valid_masks']
+    assert stored[:2].all()
+    assert stored[2].tolist() == masks[0].tolist()
+    assert buffer.gather(np.array([2]))['valid_masks'].tolist() == masks.tolist()
@@ -0,0 +1,80 @@
+import numpy as np
+
+from model.utils.prioritized_buffer import PrioritizedExperienceBuffer, SumTree
+
+
+def push_rows(buffer, count: int):
+    buffer.push_batch(
+        states=np.arange(count, dtype=np.float32).reshape(count, 1),
+        actions=np.zeros(count), rewards=np.zeros(count), values=np.zeros(count),
+        log_probs=np.zeros(count), dones=np.zeros(count, dtype=np.bool_),
+        agent_indices=np.zeros(count)
+    )
+
+
+def test_sum_tree_totals_and_prefix_search():
+    tree = SumTree(5)  # padded to 8 leaves
+    tree.update(np.arange(5), np.array([1.0, 2.0, 3.0, 4.0, 0.0]))
+    assert tree.total == 10.0
+    assert tree.get([2]).tolist() == [3.0]
+
+    # Cumulative ranges: [0,1] -> 0, (1,3] -> 1, (3,6] -> 2, (6,10] -> 3
+    values = np.array([0.0, 0.5, 1.0, 1.5, 3.0, 3.1, 6.0, 6.5, 10.0])
+    assert tree.find(values).tolist() == [0, 0, 0, 1, 1, 2, 2, 3, 3]
+
+
+def test_sum_tree_update_propagates_to_the_root():
+    tree = SumTree(4)
+    tree.update(np.arange(4), np.ones(4))
+    tree.update(np.array([1, 1, 3]), np.array([5.0, 5.0, 0.0]))
+    assert tree.total == 1.0 + 5.0 + 1.0
+    assert tree.find(np.array([1.5, 6.5])).tolist() == [1, 2]
+
+
+def test_sum_tree_sampling_is_proportional():
+    rng = np.random.default_rng(0)
+    priorities = np.array([1.0, 2.0, 3.0, 4.0])
+    tree = SumTree(4)
+    tree.update(np.arange(4), priorities)
+
+    leaves = tree.find(rng.uniform(0, tree.total, size=100_000))
+    frequencies = np.bincount(leaves, minlength=4) / len(leaves)
+    np.testing.assert_allclose(frequencies, priorities / priorities.sum(), atol=0.01)
+
+
+def test_new_rows_get_the_maximum_priority():
+    buffer = PrioritizedExperienceBuffer(capacity=8, alpha=1.0)
+    push_rows(buffer, 4)
+    buffer.update_priorities([0], [3.0])
+    push_rows(buffer, 1)
+    np.testing.assert_allclose(buffer.sum_tree.get([4]), buffer.max_priority)
+    assert buffer.max_priority == 3.0 + buffer.epsilon
+
+
+def test_update_priorities_shifts_sampling_and_weights():
+    np.random.seed(0)
+    buffer = PrioritizedExperienceBuffer(capacity=4, alpha=1.0, beta=1.0, beta_increment=0.0)
+    push_rows(buffer, 4)
+    buffer.update_priorities(np.arange(4), np.array([1.0, 1.0, 1.0, 97.0]))
+
+    counts = np.zeros(4)
+    for _ in range(200):
+        batch = buffer.sample(8)
+        counts += np.bincount(batch['indices'].numpy(), minlength=4)
+        # The most likely row gets the smallest importance weight, the max weight is 1
+        weights = batch['weights'].numpy()
+        assert np.isclose(weights.max(), 1.0)
+        assert weights[batch['indices'].numpy() == 3].max(initial=0.0) <= weights.min() + 1e-6
+
+    frequencies = counts / counts.sum()
+    assert abs(frequencies[3] - 0.97) < 0.02
+
+
+def test_clear_resets_priorities():
+    buffer = PrioritizedExperienceBuffer(capacity=4)
+    push_rows(buffer, 4)
+    buffer.update_priorities([0], [10.0])
+    buffer.clear()
+    assert buffer.sum_tree.total == 0.0
+    assert buffer.max_priority == 1.0
+    assert len(buffer.sample(4)['weights']) == 0
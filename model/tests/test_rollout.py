@@ -0,0 +1,243 @@
+import numpy as np
+import pytest
+import torch
+
+from model.configs.network_config import NetworkConfig
+from model.coordinators.multiagent_coordinator_advance import MultiAgentCoordinatorAdvanced
+from model.rollout.async_learner import AsyncLearner
+from model.rollout.rollout_manager import RolloutManager
+from model.rollout.shared_trajectory import SharedTrajectory, _layout
+from model.rollout.weight_store import FileWeightStore, SharedWeightStore, open_weight_store
+from model.rollout.worker import PolicyActor
+from model.utils.trajectory_buffer import TrajectoryBuffer
+
+AGENT_IDS = ['J0', 'J1', 'J2']
+STATE_SIZE = 5
+NUM_ACTIONS = 4
+
+
+class FakeRegionEnv:
+    """RegionSumoEnv interface without SUMO; importable by spawned workers"""
+
+    def __init__(self, agent_ids, seed: int = 0, episode_steps: int = 5, **kwargs):
+        self.num_agents = len(agent_ids)
+        self.episode_steps = episode_steps
+        self.rng = np.random.default_rng(seed)
+        # Actions 0 and 1 everywhere, 2 for even agents only, 3 never
+        self.valid_masks = np.zeros((self.num_agents, NUM_ACTIONS), dtype=np.bool_)
+        self.valid_masks[:, :2] = True
+        self.valid_masks[::2, 2] = True
+        self.t = 0
+
+    def _observe(self):
+        return self.rng.normal(size=(self.num_agents, STATE_SIZE)).astype(np.float32), self.valid_masks.copy()
+
+    def reset(self):
+        self.t = 0
+        return self._observe()
+
+    def step(self, actions):
+        if not self.valid_masks[np.arange(self.num_agents), actions].all():
+            raise ValueError(f"Invalid actions {actions}")
+        self.t += 1
+        observations, valid_masks = self._observe()
+        return observations, -np.asarray(actions, dtype=np.float32), self.t >= self.episode_steps, valid_masks
+
+    def close(self):
+        pass
+
+
+def make_coordinator(parameter_sharing: bool = False) -> MultiAgentCoordinatorAdvanced:
+    torch.manual_seed(0)
+    return MultiAgentCoordinatorAdvanced(
+        {agent_id: NetworkConfig(input_size=STATE_SIZE, hidden_size=16, device='cpu') for agent_id in AGENT_IDS},
+        {agent_id: NUM_ACTIONS for agent_id in AGENT_IDS},
+        {'enable_coordination': False, 'parameter_sharing': parameter_sharing}
+    )
+
+
+def test_shared_trajectory_layout_and_round_trip():
+    horizon, num_agents = 6, len(AGENT_IDS)
+    slot = SharedTrajectory(horizon, num_agents, STATE_SIZE, NUM_ACTIONS)
+    try:
+        # Arrays are 8-byte aligned, back to back and inside the block
+        spans = sorted((array.ctypes.data, array.nbytes) for array in slot.arrays.values())
+        base = np.frombuffer(slot.memory.buf, dtype=np.uint8).ctypes.data
+        assert [name for name, _, _ in _layout(*slot.dims)] == list(slot.arrays)
+        for (start, size), (next_start, _) in zip(spans, spans[1:]):
+            assert (start - base) % 8 == 0
+            assert start + size <= next_start
+        assert spans[-1][0] + spans[-1][1] <= base + slot.memory.size
+
+        # A worker attaches by name and writes; the learner copies the written steps
+        rng = np.random.default_rng(0)
+        worker_slot = SharedTrajectory.attach(slot.spec())
+        written = {
+            'states': rng.normal(size=(horizon, num_agents, STATE_SIZE)).astype(np.float32),
+            'actions': rng.integers(0, NUM_ACTIONS, size=(horizon, num_agents)),
+            'rewards': rng.normal(size=(horizon, num_agents)).astype(np.float32),
+            'values': rng.normal(size=(horizon, num_agents)).astype(np.float32),
+            'log_probs': rng.normal(size=(horizon, num_agents)).astype(np.float32),
+            'dones': rng.random((horizon, num_agents)) < 0.3,
+            'valid_masks': rng.random((horizon, num_agents, NUM_ACTIONS)) < 0.5,
+            'last_values': rng.normal(size=num_agents).astype(np.float32),
+        }
+        for field, value in written.items():
+            worker_slot.arrays[field][:] = value
+        worker_slot.close()
+
+        trajectory = TrajectoryBuffer(horizon, num_agents, (STATE_SIZE,), NUM_ACTIONS)
+        last_values = slot.copy_to(trajectory, steps=4)
+        assert trajectory.step == 4
+        for field in ('states', 'actions', 'rewards', 'values', 'log_probs', 'dones', 'valid_masks'):
+            assert np.array_equal(getattr(trajectory, field)[:4], written[field][:4]), field
+        assert np.array_equal(last_values, written['last_values'])
+        last_values[:] = 0  # a copy, not a view of the slot
+        assert np.array_equal(slot.arrays['last_values'], written['last_values'])
+    finally:
+        slot.close()
+
+
+@pytest.mark.parametrize('parameter_sharing', [False, True])
+def test_shared_weight_store_publishes_versions(parameter_sharing):
+    coordinator = make_coordinator(parameter_sharing)
+    store = SharedWeightStore.for_networks(coordinator.policy_networks)
+    reader = open_weight_store(store.spec())
+    try:
+        assert reader.read() is None
+        assert store.publish(coordinator) == 1
+
+        version, state_dicts = reader.read()
+        assert version == 1
+        assert len(state_dicts) == (1 if parameter_sharing else len(AGENT_IDS))
+        actor = PolicyActor(AGENT_IDS, coordinator.agent_configs, coordinator.action_space_sizes,
+                            parameter_sharing=parameter_sharing)
+        actor.load_state_dicts(state_dicts)
+        for agent_id in AGENT_IDS:
+            expected = coordinator.policy_networks[agent_id].state_dict()
+            for name, value in actor.networks[agent_id].state_dict().items():
+                assert torch.equal(value, expected[name]), (agent_id, name)
+
+        assert reader.read(after_version=1) is None
+        with torch.no_grad():
+            coordinator.policy_networks['J0'].input_fc.bias.add_(1.0)
+        assert store.publish(coordinator) == 2
+        version, state_dicts = reader.read(after_version=1)
+        assert version == 2
+        assert torch.equal(state_dicts['J0']['input_fc.bias'], coordinator.policy_networks['J0'].input_fc.bias)
+    finally:
+        reader.close()
+        store.close()
+
+
+def test_shared_weight_store_read_rejects_torn_copies():
+    coordinator = make_coordinator()
+    store = SharedWeightStore.for_networks(coordinator.policy_networks)
+    reader = open_weight_store(store.spec())
+    try:
+        store.publish(coordinator)
+
+        # Odd sequence: a write is in progress
+        store.header[0] += 1
+        assert reader.read() is None
+        store.header[0] += 1
+        assert reader.read()[0] == 1
+
+        # A write that starts and ends while the reader copies
+        class WrittenDuringCopy:
+            def __init__(self, flat):
+                self.flat = flat
+
+            def copy(self):
+                store.header[0] += 2
+                return self.flat.copy()
+
+        flat = reader.flat
+        reader.flat = WrittenDuringCopy(flat)
+        assert reader.read() is None
+        reader.flat = flat
+        assert reader.read()[0] == 1
+    finally:
+        reader.close()
+        store.close()
+
+
+def test_file_weight_store_publishes_and_keeps_recent_checkpoints(tmp_path):
+    coordinator = make_coordinator(parameter_sharing=True)
+    store = FileWeightStore(str(tmp_path / 'weights'), keep=2)
+    reader = open_weight_store(store.spec())
+    assert reader.read() is None
+
+    for expected in range(1, 5):
+        assert store.publish(coordinator) == expected
+    assert sorted(path.name for path in (tmp_path / 'weights').glob('policy-*.pt')) == [
+        'policy-00000003.pt', 'policy-00000004.pt'
+    ]
+
+    version, state_dicts = reader.read()
+    assert version == reader.version == 4
+    assert list(state_dicts) == ['J0']  # shared network stored once
+    assert reader.read(after_version=4) is None
+
+
+class FakeManager:
+    """collect() hands out segments recorded under the given weight versions"""
+
+    def __init__(self, versions, version: int):
+        self.segment_versions = list(versions)
+        self.version = version
+        self.coordinator = self
+
+    def collect(self, timeout=None):
+        if not self.segment_versions:
+            raise TimeoutError("No rollout segment")
+        return 0, None, None, self.segment_versions.pop(0)
+
+    def broadcast_weights(self):
+        self.version += 1
+        return self.version
+
+    def train_on_trajectory(self, trajectory, last_values, epochs=4):
+        return {'policy_loss': 0.0}
+
+
+def test_async_learner_drops_segments_past_max_policy_lag():
+    manager = FakeManager([5, 4, 5, 6, 1], version=5)
+    learner = AsyncLearner(manager, max_policy_lag=1)
+
+    assert learner.step()['policy_lag'] == 0  # publishes version 6
+    assert learner.step() is None  # lag 2
+    assert [info['policy_lag'] for info in learner.run(num_updates=2, timeout=1)] == [1, 1]
+    assert learner.step() is None
+    assert learner.updates == 3
+    assert learner.dropped_segments == 2
+    assert manager.version == 8
+
+
+@pytest.mark.parametrize('parameter_sharing, weight_store', [
+    (False, 'shared'),
+    (True, 'shared'),
+    (False, 'files'),
+])
+def test_rollout_end_to_end_with_spawned_workers(tmp_path, parameter_sharing, weight_store):
+    coordinator = make_coordinator(parameter_sharing)
+    store = FileWeightStore(str(tmp_path / 'weights')) if weight_store == 'files' else None
+    manager = RolloutManager(coordinator, [{'seed': 0}, {'seed': 1}], horizon=8,
+                             env_factory=FakeRegionEnv, weight_store=store)
+    with manager:
+        learner = AsyncLearner(manager, epochs=1)
+        history = learner.run(num_updates=4, timeout=120)
+        assert len(history) == 4
+        assert all(np.isfinite(info['policy_loss']) for info in history)
+
+        # Workers move to the published weights and keep to the valid actions
+        for _ in range(2 * manager.num_workers + 1):
+            worker_id, trajectory, _, version = manager.collect(timeout=120)
+            assert worker_id in (0, 1)
+            chosen = np.take_along_axis(trajectory.valid_masks, trajectory.actions[..., None], axis=-1)
+            assert chosen.all()
+            assert trajectory.dones.any(axis=1).sum() >= 1  # episodes restart inside segments
+            if version > 1:
+                break
+        assert version > 1
+    assert not manager.workers
@@ -0,0 +1,145 @@
+import os
+
+import pytest
+import torch
+
+from model.configs.network_config import NetworkConfig
+from model.coordinators.multiagent_coordinator_advance import MultiAgentCoordinatorAdvanced
+from model.utils.checkpoint_compression import load_checkpoint
+from model.utils.sharded_checkpoint import (
+    MANIFEST_FILE,
+    ShardedCheckpoint,
+    is_sharded_checkpoint,
+    save_sharded_checkpoint,
+    state_dict_digest,
+)
+
+AGENT_IDS = ['J0', 'J1', 'J2']
+
+
+def make_coordinator(parameter_sharing: bool = False) -> MultiAgentCoordinatorAdvanced:
+    torch.manual_seed(len(AGENT_IDS))
+    return MultiAgentCoordinatorAdvanced(
+        {agent_id: NetworkConfig(input_size=6, hidden_size=16, device='cpu') for agent_id in AGENT_IDS},
+        {agent_id: 4 for agent_id in AGENT_IDS},
+        {'enable_coordination': False, 'parameter_sharing': parameter_sharing}
+    )
+
+
+def randomize(coordinator: MultiAgentCoordinatorAdvanced):
+    with torch.no_grad():
+        for network in coordinator.policy_networks.values():
+            for parameter in network.parameters():
+                parameter.normal_()
+    coordinator._sync_policy_groups()
+
+
+def assert_same_weights(left: MultiAgentCoordinatorAdvanced, right: MultiAgentCoordinatorAdvanced):
+    for agent_id in AGENT_IDS:
+        expected = left.policy_networks[agent_id].state_dict()
+        for name, value in right.policy_networks[agent_id].state_dict().items():
+            assert torch.equal(value, expected[name]), (agent_id, name)
+
+
+def test_digest_tracks_content():
+    state_dict = {'weight': torch.arange(6.0).reshape(2, 3)}
+    assert state_dict_digest(state_dict) == state_dict_digest({'weight': torch.arange(6.0).reshape(2, 3)})
+    assert state_dict_digest(state_dict) != state_dict_digest({'weight': torch.arange(6.0).reshape(3, 2)})
+    assert state_dict_digest(state_dict) != state_dict_digest({'weight': torch.arange(6.0).reshape(2, 3) + 1})
+
+
+def test_incremental_save_rewrites_only_changed_shards(tmp_path):
+    directory = str(tmp_path / 'checkpoint')
+    policies = {agent_id: {'weight': torch.full((2, 2), float(i))} for i, agent_id in enumerate(AGENT_IDS)}
+    critic = {'weight': torch.ones(3)}
+
+    assert sorted(save_sharded_checkpoint(directory, policies, critic, {})) == sorted(AGENT_IDS + ['shared_critic'])
+    assert is_sharded_checkpoint(directory)
+    assert save_sharded_checkpoint(directory, policies, critic, {}) == []
+
+    policies['J1'] = {'weight': torch.full((2, 2), 9.0)}
+    assert save_sharded_checkpoint(directory, policies, critic, {}) == ['J1']
+
+    # Agents dropped from the checkpoint lose their shard
+    removed_file = ShardedCheckpoint(directory).manifest['shards']['J2']['file']
+    del policies['J2']
+    save_sharded_checkpoint(directory, policies, critic, {})
+    assert not os.path.exists(os.path.join(directory, removed_file))
+    assert ShardedCheckpoint(directory).owners == ['J0', 'J1']
+
+
+def test_shards_load_lazily_and_memory_mapped(tmp_path):
+    directory = str(tmp_path / 'checkpoint')
+    policies = {agent_id: {'weight': torch.randn(4, 4)} for agent_id in AGENT_IDS}
+    save_sharded_checkpoint(directory, policies, {'weight': torch.ones(3)}, {'training_stats': {}})
+
+    checkpoint = ShardedCheckpoint(directory)
+    assert checkpoint._cache == {}
+    weight = checkpoint.policy_state_dict('J1')['weight']
+    assert torch.equal(weight, policies['J1']['weight'])
+    assert len(checkpoint._cache) == 1
+    assert checkpoint.policy_state_dict('J1')['weight'] is weight
+
+    # The shard file is mapped into memory, not read into a copy
+    if os.path.exists('/proc/self/maps'):
+        shard = os.path.join(directory, checkpoint.manifest['shards']['J1']['file'])
+        with open('/proc/self/maps') as f:
+            assert shard in f.read()
+
+
+def test_missing_manifest_raises(tmp_path):
+    with pytest.raises(FileNotFoundError):
+        ShardedCheckpoint(str(tmp_path))
+
+
+@pytest.mark.parametrize('parameter_sharing', [False, True])
+def test_coordinator_save_lazy_load_and_partial_resave(tmp_path, parameter_sharing):
+    directory = str(tmp_path / 'checkpoint')
+    source = make_coordinator(parameter_sharing)
+    randomize(source)
+    written = source.save_models(directory, sharded=True)
+    assert os.path.exists(os.path.join(directory, MANIFEST_FILE))
+    assert len(written) == (1 if parameter_sharing else len(AGENT_IDS)) + 1
+
+    restored = make_coordinator(parameter_sharing)
+    restored.load_models(directory)
+    assert restored.pending_owners == set(ShardedCheckpoint(directory).owners)
+
+    # First use of one agent loads only its network
+    observations = {'J1': torch.rand(6)}
+    restored.get_actions(observations, training=False)
+    owner = restored.agent_ids[restored.policy_owners[restored.agent_index['J1']]]
+    assert owner not in restored.pending_owners
+    restored.reset_hidden_states()
+    assert torch.equal(
+        restored.get_actions(observations, training=False)['J1']['value'],
+        source.get_actions(observations, training=False)['J1']['value']
+    )
+
+    # Saving loads the rest first; nothing changed, so nothing is written
+    assert restored.save_models(directory) == []
+    assert not restored.pending_owners
+    assert_same_weights(source, restored)
+
+    # Changing one agent rewrites only its network's shard
+    with torch.no_grad():
+        restored.policy_networks['J2'].input_fc.bias.add_(1.0)
+    owner = restored.agent_ids[restored.policy_owners[restored.agent_index['J2']]]
+    assert restored.save_models(directory) == [owner]
+
+    reloaded = make_coordinator(parameter_sharing)
+    reloaded.load_models(directory)
+    reloaded.load_pending_policies()
+    assert_same_weights(restored, reloaded)
+
+
+def test_load_checkpoint_reads_a_directory(tmp_path):
+    directory = str(tmp_path / 'checkpoint')
+    source = make_coordinator()
+    source.save_models(directory, sharded=True)
+
+    checkpoint = load_checkpoint(directory)
+    assert sorted(checkpoint['policy_networks']) == AGENT_IDS
+    for name, value in checkpoint['shared_critic'].items():
+        assert torch.equal(value, source.shared_critic.state_dict()[name])
+    assert set(checkpoint['training_stats']) == set(source.training_stats)
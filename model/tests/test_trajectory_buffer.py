@@ -0,0 +1,87 @@
+import numpy as np
+import pytest
+
+from model.utils.trajectory_buffer import TrajectoryBuffer
+
+
+def reference_gae(rewards, values, dones, last_values, gamma, gae_lambda):
+    """Textbook per-agent GAE loop"""
+    steps, num_agents = rewards.shape
+    advantages = np.zeros((steps, num_agents))
+    for agent in range(num_agents):
+        gae = 0.0
+        for t in reversed(range(steps)):
+            next_value = last_values[agent] if t == steps - 1 else values[t + 1, agent]
+            non_terminal = 0.0 if dones[t, agent] else 1.0
+            delta = rewards[t, agent] + gamma * next_value * non_terminal - values[t, agent]
+            gae = delta + gamma * gae_lambda * non_terminal * gae
+            advantages[t, agent] = gae
+    return advantages, advantages + values
+
+
+def fill(buffer: TrajectoryBuffer, steps: int, rng):
+    num_agents = buffer.num_agents
+    for _ in range(steps):
+        buffer.add(
+            states=rng.normal(size=(num_agents, 2)),
+            actions=rng.integers(0, 3, size=num_agents),
+            rewards=rng.normal(size=num_agents),
+            values=rng.normal(size=num_agents),
+            log_probs=rng.normal(size=num_agents),
+            dones=rng.random(num_agents) < 0.2
+        )
+
+
+@pytest.mark.parametrize('steps', [1, 7, 16])
+def test_gae_matches_reference_loop(steps):
+    rng = np.random.default_rng(steps)
+    buffer = TrajectoryBuffer(horizon=16, num_agents=3, state_shape=(2,), gamma=0.9, gae_lambda=0.8)
+    fill(buffer, steps, rng)
+    last_values = rng.normal(size=3)
+
+    buffer.compute_returns_and_advantages(last_values)
+    advantages, returns = reference_gae(
+        buffer.rewards[:steps].astype(np.float64), buffer.values[:steps].astype(np.float64),
+        buffer.dones[:steps], last_values, 0.9, 0.8
+    )
+    np.testing.assert_allclose(buffer.advantages[:steps], advantages, rtol=1e-5, atol=1e-5)
+    np.testing.assert_allclose(buffer.returns[:steps], returns, rtol=1e-5, atol=1e-5)
+
+
+def test_done_cuts_the_bootstrap():
+    buffer = TrajectoryBuffer(horizon=2, num_agents=1, state_shape=(1,), gamma=0.5, gae_lambda=1.0)
+    buffer.add(np.zeros((1, 1)), [0], [1.0], [0.0], [0.0], [True])
+    buffer.add(np.zeros((1, 1)), [0], [2.0], [10.0], [0.0], [False])
+    buffer.compute_returns_and_advantages([4.0])
+
+    # Step 0 ends its episode: no value from step 1 flows back
+    assert buffer.returns[0, 0] == pytest.approx(1.0)
+    assert buffer.returns[1, 0] == pytest.approx(2.0 + 0.5 * 4.0)
+
+
+def test_batch_flattens_time_and_agents():
+    buffer = TrajectoryBuffer(horizon=8, num_agents=3, state_shape=(2,), num_actions=4)
+    fill(buffer, 5, np.random.default_rng(0))
+    buffer.compute_returns_and_advantages(np.zeros(3))
+
+    batch = buffer.batch()
+    assert batch['states'].shape == (15, 2)
+    assert batch['valid_masks'].shape == (15, 4)
+    assert batch['agent_indices'].tolist() == [0, 1, 2] * 5
+    np.testing.assert_allclose(batch['returns'].numpy(), buffer.returns[:5].reshape(-1))
+
+    global_batch = buffer.global_batch()
+    assert global_batch['global_states'].shape == (5, 6)
+    assert global_batch['returns'].shape == (5, 3)
+
+
+def test_full_and_empty_segments_raise():
+    buffer = TrajectoryBuffer(horizon=1, num_agents=1, state_shape=(2,))
+    with pytest.raises(ValueError):
+        buffer.compute_returns_and_advantages([0.0])
+    fill(buffer, 1, np.random.default_rng(0))
+    assert buffer.full
+    with pytest.raises(ValueError):
+        fill(buffer, 1, np.random.default_rng(0))
+    buffer.reset()
+    assert not buffer.full